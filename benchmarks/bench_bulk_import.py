@@ -0,0 +1,74 @@
+"""
+Benchmark POST /inventory/products/bulk data path: NDJSON parsing, validation and Redis writes.
+
+Needs a reachable Redis (REDIS_HOST / REDIS_PORT / REDIS_PASSWORD from .env, same as the apps).
+Products are written under a throw-away `bench` key prefix and removed afterwards.
+
+    python -m benchmarks.bench_bulk_import
+    python -m benchmarks.bench_bulk_import --sizes 10000 --chunk-size 2000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import redis.asyncio
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+
+from benchmarks.bench_catalog_listing import BENCH_GLOBAL_PREFIX, BENCH_MODEL_PREFIX
+from inventory.app.db.redis import CustomJsonCoder, params
+from inventory.app.db.repository import product_repository
+from inventory.app.models.models import Product
+from inventory.app.services.bulk_import import BULK_IMPORT_CHUNK_SIZE, parse_import
+from inventory.app.services.service import Service
+
+
+def ndjson(size: int) -> bytes:
+    return b"".join(
+        json.dumps({"name": f"bench product {i}", "price": 9.99, "quantity": 100}).encode() + b"\n" for i in range(size)
+    )
+
+
+async def stream(data: bytes, chunk_size: int = 64 * 1024):
+    # request bodies arrive in chunks, like Starlette's request.stream()
+    for start in range(0, len(data), chunk_size):
+        end = start + chunk_size
+        yield data[start:end]
+
+
+async def cleanup(client: redis.asyncio.Redis) -> None:
+    async for key in client.scan_iter(match=f"{BENCH_GLOBAL_PREFIX}:*", count=5000):
+        await client.unlink(key)
+
+
+async def main(sizes: list[int], chunk_size: int) -> None:
+    client = redis.asyncio.Redis(**params)
+    product_repository._redis = client
+    Product.set_prefix(global_key_prefix=BENCH_GLOBAL_PREFIX, model_key_prefix=BENCH_MODEL_PREFIX)
+    FastAPICache.init(RedisBackend(client), prefix=f"{BENCH_GLOBAL_PREFIX}:cache", coder=CustomJsonCoder)
+    service = Service()
+
+    for size in sizes:
+        await cleanup(client)
+        data = ndjson(size)
+        start = time.perf_counter()
+        report = await service.bulk_add_products(parse_import(stream(data), "application/x-ndjson"), chunk_size)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  products={size:<8} imported={report.imported:<8} chunk={chunk_size:<6} "
+            f"{elapsed * 1000:10.1f} ms {report.imported / elapsed:12.0f} products/s"
+        )
+
+    await cleanup(client)
+    await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 200_000])
+    parser.add_argument("--chunk-size", type=int, default=BULK_IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes, args.chunk_size))
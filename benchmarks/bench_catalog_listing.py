@@ -0,0 +1,105 @@
+"""
+Benchmark GET /inventory/products data access: per-product round trips vs pipelined pages.
+
+Needs a reachable Redis (REDIS_HOST / REDIS_PORT / REDIS_PASSWORD from .env, same as the apps).
+Products are seeded under a throw-away `bench` key prefix and removed afterwards.
+
+    python -m benchmarks.bench_catalog_listing
+    python -m benchmarks.bench_catalog_listing --sizes 1000 10000
+"""
+
+import argparse
+import asyncio
+import time
+
+import redis.asyncio
+from redis.asyncio.connection import Connection
+
+from inventory.app.db.redis import params
+from inventory.app.db.repository import ProductRepository
+from inventory.app.models.models import Product
+from inventory.app.services.utils import PRODUCTS_PAGE_LIMIT
+
+BENCH_GLOBAL_PREFIX = "bench"
+BENCH_MODEL_PREFIX = "inventory.Product"
+
+
+class CountingConnection(Connection):
+    """
+    Connection that counts round trips: one per command, one per pipeline execute.
+    """
+
+    round_trips = 0
+
+    async def send_packed_command(self, command, check_health=True):
+        CountingConnection.round_trips += 1
+        await super().send_packed_command(command, check_health)
+
+
+async def seed(repository: ProductRepository, size: int) -> None:
+    for start in range(0, size, 5000):
+        async with repository.redis.pipeline(transaction=False) as pipe:
+            for i in range(start, min(start + 5000, size)):
+                product = Product(name=f"bench product {i}", price=9.99, quantity=100)
+                pipe.hset(repository.key(product.pk), mapping=repository.to_document(product))
+            await pipe.execute()
+
+
+async def cleanup(repository: ProductRepository) -> None:
+    async for key in repository.redis.scan_iter(match=f"{BENCH_GLOBAL_PREFIX}:*", count=5000):
+        await repository.redis.unlink(key)
+
+
+async def measure(label: str, func, repository: ProductRepository) -> None:
+    CountingConnection.round_trips = 0
+    start = time.perf_counter()
+    count = await func(repository)
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {label:<28} products={count:<7} round_trips={CountingConnection.round_trips:<7} {elapsed * 1000:10.1f} ms"
+    )
+
+
+async def legacy_listing(repository: ProductRepository) -> int:
+    # what GET /inventory/products did before: all_pks() then one HGETALL per product
+    products = [await repository.get(pk) async for pk in repository.all_pks()]
+    return len(products)
+
+
+async def first_page(repository: ProductRepository) -> int:
+    products, _ = await repository.page(cursor=0, limit=PRODUCTS_PAGE_LIMIT)
+    return len(products)
+
+
+async def all_pages(repository: ProductRepository) -> int:
+    count, cursor = 0, 0
+    while True:
+        products, cursor = await repository.page(cursor=cursor, limit=PRODUCTS_PAGE_LIMIT)
+        count += len(products)
+        if cursor == 0:
+            return count
+
+
+async def main(sizes: list[int]) -> None:
+    pool = redis.asyncio.ConnectionPool(connection_class=CountingConnection, **params)
+    repository = ProductRepository(redis.asyncio.Redis(connection_pool=pool))
+    Product.set_prefix(global_key_prefix=BENCH_GLOBAL_PREFIX, model_key_prefix=BENCH_MODEL_PREFIX)
+
+    for size in sizes:
+        await cleanup(repository)
+        await seed(repository, size)
+        print(f"catalog size {size}:")
+        await measure("legacy per-product", legacy_listing, repository)
+        await measure(f"first page (limit={PRODUCTS_PAGE_LIMIT})", first_page, repository)
+        await measure("all pages", all_pages, repository)
+
+    await cleanup(repository)
+    await pool.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes))
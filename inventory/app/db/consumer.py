@@ -1,98 +1,188 @@
 import asyncio
 
-import redis
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from loguru import logger
-from redis_om.model.model import NotFoundError
 
-from inventory.app.db.redis import CustomJsonCoder, get_redis_cache_client, get_redis_om_client
-from inventory.app.main import app
+from inventory.app.db.l1_cache import L1RedisBackend
+from inventory.app.db.redis import CustomJsonCoder, get_redis_async_client, get_redis_cache_client, get_redis_om_client
+from inventory.app.db.repository import DECREMENT_NOT_FOUND, DECREMENT_OK, product_repository
+from inventory.app.db.stream_runtime import (
+    ORDER_COMPLETED_SHARDS,
+    StreamConsumer,
+    StreamEntry,
+    run_workers,
+    shard_streams,
+)
 from inventory.app.models.models import Product
 from inventory.app.services.stream_service import StreamService
-from inventory.app.services.utils import clear_cache_by_pk
+from inventory.app.services.utils import versioned_key_builder, write_through_products
 
 
-def get_redis_stream_client():
+class CoalescingStats:
     """
-    Retrieves the Redis stream client initialized in the FastAPI app.
-    """
-    try:
-        logger.debug("using app.state.redis")
-        return app.state.redis  # Reuse the existing Redis connection
-    except AttributeError:
-        logger.debug("app.state.redis not found. using fresh get_redis_om_client")
-        return get_redis_om_client()  # Fallback to the default Redis connection
+    Counters showing how much work per-batch coalescing saved in the order_completed consumer.
 
+    `cache_write_throughs` counts product cache entries rewritten, `catalog_updates` the batches
+    that patched (or, failing that, invalidated) the cached catalog pages.
+    """
 
-async def consume_order_completed(redis_stream_client: redis.client.Redis, key: str, group: str, block_: int = 3000):
+    def __init__(self) -> None:
+        self.batches = 0
+        self.messages = 0
+        self.product_writes = 0
+        self.cache_write_throughs = 0
+        self.catalog_updates = 0
+        self.refunds = 0
+
+    def record(self, messages: int, product_writes: int, cache_write_throughs: int, refunds: int) -> None:
+        self.batches += 1
+        self.messages += messages
+        self.product_writes += product_writes
+        self.cache_write_throughs += cache_write_throughs
+        self.catalog_updates += 1 if cache_write_throughs else 0
+        self.refunds += refunds
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """
+        Messages applied per product write (and per product cache write-through).
+        """
+        return self.messages / self.product_writes if self.product_writes else 0.0
+
+    def as_dict(self) -> dict[str, int | float]:
+        return {
+            "batches": self.batches,
+            "messages": self.messages,
+            "product_writes": self.product_writes,
+            "cache_write_throughs": self.cache_write_throughs,
+            "catalog_updates": self.catalog_updates,
+            "refunds": self.refunds,
+            "coalescing_ratio": round(self.coalescing_ratio, 2),
+        }
+
+
+coalescing_stats = CoalescingStats()
+
+
+async def consume_order_completed(entries: list[StreamEntry]) -> list[str]:
     """
-    Continuously listens to the Redis stream for completed order events.
+    Applies a batch of completed order events to the inventory.
+
+    Orders are grouped per product: each product gets one atomic script call (all pipelined
+    together) that checks every order against the remaining stock and writes the hash once.
+    The script skips orders it already applied, so a redelivered event never takes the stock twice.
+    Affected product cache entries and catalog pages are rewritten with the new stock once per batch;
+    a failure there is only logged, the entries are acknowledged anyway.
+
+    Returns:
+        list[str]: IDs of the entries that were handled and can be acknowledged.
     """
-    Product.set_meta_attr(redis_stream_client, global_key_prefix="fastcart", model_key_prefix="inventory.Product")
-    while True:
+    ack_ids = []
+    orders: dict[str, list[tuple[str, dict]]] = {}
+    for entry_id, obj in entries:
         try:
-            # * Read new messages from Redis stream (blocking for 5 sec if no messages)
-            messages = redis_stream_client.xreadgroup(group, key, {key: ">"}, block=block_)
-            logger.info(f"Received messages: {messages}")
-
-            # for stream, message_list in messages:
-            #     for message_id, message_data in message_list:
-            #         logger.info(f"Received order completed event: {message_data}")
-            # Process the message (e.g., update inventory, trigger further workflows)
-
-            if messages != []:
-                message_list = messages[0][1]
-                for message in message_list:
-                    obj = message[1]
-
-                    try:
-                        product = Product.get(obj["product_id"])
-
-                        logger.info(f"Product: {product}")
-                        logger.debug(product.key())
-
-                        product.quantity -= int(obj["order_quantity"])
-                        product.save()
-                        await FastAPICache.clear(namespace="inventory.products")
-                        await clear_cache_by_pk(pk=obj["product_id"], namespace="inventory.product")
-
-                        logger.success("Updated product quantity successfully")
-                    except NotFoundError:
-                        # logger.error(f"Product with ID {obj['product_id']} not found.")
-                        logger.warning(
-                            f"⚠️ Product not found in inventory for ID: {obj['product_id']}. Triggering refund."
-                        )
-                        StreamService.stream_order_refund(obj)
-                        logger.success(f"Refund event streamed for order ID: {obj['order_id']}")
-
+            str(obj["order_id"])
+            if int(obj["order_quantity"]) <= 0:
+                # the decrement script would add the stock back, or record a no-op as applied
+                raise ValueError("order_quantity must be positive")
+            orders.setdefault(obj["product_id"], []).append((entry_id, obj))
+        except (KeyError, ValueError):
+            # * malformed event, retrying won't help
+            logger.error(f"Dropping malformed order completed event {entry_id}: {obj}")
+            ack_ids.append(entry_id)
+
+    # * existence check, stock check and decrement in a single atomic script per product
+    results = await product_repository.decrement_quantities(
+        {
+            pk: [(str(obj["order_id"]), int(obj["order_quantity"])) for _, obj in product_orders]
+            for pk, product_orders in orders.items()
+        }
+    )
+
+    updated_pks = []
+    to_refund: list[tuple[str, dict]] = []
+    for pk, product_orders in orders.items():
+        statuses, quantity = results[pk]
+        if DECREMENT_OK in statuses:
+            updated_pks.append(pk)
+            logger.success(f"Updated product {pk} quantity successfully, {quantity} left in stock")
+
+        for (entry_id, obj), status in zip(product_orders, statuses):
+            if status == DECREMENT_OK:
+                ack_ids.append(entry_id)
+                continue
+
+            if status == DECREMENT_NOT_FOUND:
+                logger.warning(f"⚠️ Product not found in inventory for ID: {pk}. Triggering refund.")
+            else:
+                logger.warning(
+                    f"⚠️ Insufficient stock ({quantity}) for product ID: {pk}, "
+                    f"requested {obj['order_quantity']}. Triggering refund."
+                )
+            to_refund.append((entry_id, obj))
+
+    # * refunds of the batch are published concurrently, the stream producer pipelines them together
+    refunds = 0
+    published = await asyncio.gather(
+        *(StreamService.stream_order_refund(obj) for _, obj in to_refund), return_exceptions=True
+    )
+    for (entry_id, obj), result in zip(to_refund, published):
+        if isinstance(result, Exception):
+            # * left pending, reclaimed and retried once idle for STREAM_RECLAIM_IDLE_MS
+            logger.error(f"Error streaming refund for order completed event {entry_id}: {result}")
+            continue
+        logger.success(f"Refund event streamed for order ID: {obj['order_id']}")
+        ack_ids.append(entry_id)
+        refunds += 1
+
+    if updated_pks:
+        # * write-through: re-read the updated products once and replace their cache entries
+        try:
+            products = await product_repository.get_many(updated_pks)
+            await write_through_products([product for product in products if product is not None])
         except Exception as e:
-            logger.exception(f"Error consuming Redis stream: {e}")
+            # * the stock is already taken: leaving the batch pending would only redeliver it, while a
+            # stale cache entry is replaced by the next write or expires
+            logger.error(f"Error writing through products {updated_pks} after order completed events: {e}")
+
+    coalescing_stats.record(
+        messages=len(entries), product_writes=len(orders), cache_write_throughs=len(updated_pks), refunds=refunds
+    )
+    logger.info(
+        f"Coalesced {len(entries)} order events into {len(orders)} product writes: {coalescing_stats.as_dict()}"
+    )
 
-        await asyncio.sleep(1)  # Prevent busy-waiting
+    return ack_ids
 
 
-# * Initialize Redis OM client for data operations
-redis_stream_client = get_redis_stream_client()
-# logger.debug(f"Redis client used in consumer: {redis_stream_client.connection_pool.connection_kwargs}")
+# * Set model Redis database and prefix in meta
+Product.set_meta_attr(get_redis_om_client(), global_key_prefix="fastcart", model_key_prefix="inventory.Product")
 
 # * Initialize Redis client for caching, set coder for reading from cache
 global redis_cache
 redis_cache = get_redis_cache_client()
-FastAPICache.init(RedisBackend(redis_cache), prefix="fastapi-cache", coder=CustomJsonCoder)
+# L1RedisBackend publishes the invalidations so API workers evict their in-process copies
+FastAPICache.init(
+    L1RedisBackend(redis_cache), prefix="fastapi-cache", coder=CustomJsonCoder, key_builder=versioned_key_builder
+)
 
 key = "order_completed"
 group = "inventory_group"
 
-try:
-    redis_stream_client.xgroup_create(key, group)
-except redis.exceptions.RedisError as e:
-    logger.info(f"Group '{group}' already exists for stream '{key}'. Error: {e}")
+
+def build_consumer(stream: str, consumer: str) -> StreamConsumer:
+    """
+    Consumer of one `order_completed` shard for one worker.
+    """
+    return StreamConsumer(
+        get_redis_async_client(), stream, group, consume_order_completed, consumer=consumer, ordered=True
+    )
 
 
-async def consume():
-    await consume_order_completed(redis_stream_client, key, group)
+def consume():
+    # each shard is owned by a single worker so stock updates of a product stay in order
+    run_workers(build_consumer, shard_streams(key, ORDER_COMPLETED_SHARDS), ordered=True)
 
 
 if __name__ == "__main__":
-    asyncio.run(consume())
+    consume()
@@ -0,0 +1,310 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import redis.asyncio
+from dotenv import load_dotenv
+from fastapi_cache.backends.redis import RedisBackend
+from loguru import logger
+
+load_dotenv()
+
+# * in-process L1 cache settings, per uvicorn worker
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", 10000))
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", 64 * 1024 * 1024))
+# upper bound on how long an entry is served from memory, also bounds staleness if an invalidation is missed
+CACHE_L1_TTL = float(os.getenv("CACHE_L1_TTL", 30))
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "fastapi-cache:invalidate")
+
+
+class LRUCache:
+    """
+    Bounded in-memory LRU cache with per-entry TTL and entry count / byte size limits.
+    """
+
+    def __init__(
+        self, max_entries: int = CACHE_L1_MAX_ENTRIES, max_bytes: int = CACHE_L1_MAX_BYTES, ttl: float = CACHE_L1_TTL
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (expires at, value)
+        self._entries: OrderedDict[str, tuple[float, bytes | str]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Tuple[float, bytes | str] | None:
+        """
+        Get `(expires at, value)` of a live entry and mark it as recently used.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.monotonic():
+            self._pop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, value: bytes | str, ttl: float | None = None) -> None:
+        """
+        Store a value for `ttl` seconds, capped by the cache TTL, evicting least recently used entries.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or len(value) > self.max_bytes:
+            return
+
+        self._pop(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._bytes += len(value)
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._pop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        if self._pop(key):
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+
+    def _pop(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= len(entry[1])
+        return True
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class L1RedisBackend(RedisBackend):
+    """
+    fastapi-cache Redis backend with an in-process `LRUCache` in front of it.
+
+    Reads are served from memory when possible and fill it on a miss. Invalidations
+    (`clear`, `invalidate`) evict locally and are published on `CACHE_INVALIDATION_CHANNEL`,
+    so every worker subscribed with `start()` evicts the same keys. Write-through updates
+    (`publish_writes`) keep the new value locally and evict it everywhere else.
+    """
+
+    def __init__(
+        self, redis_client: redis.asyncio.Redis, l1: LRUCache | None = None, channel: str = CACHE_INVALIDATION_CHANNEL
+    ) -> None:
+        super().__init__(redis_client)
+        self.l1 = l1 or LRUCache()
+        self.channel = channel
+        # tags published invalidations, a worker skips its own since it already applied them locally
+        self.origin = uuid.uuid4().hex
+        # bumped on every invalidation, a Redis read racing with one must not fill the L1
+        self._generation = 0
+        self._listener: asyncio.Task | None = None
+        # lookups that missed the L1 and went to Redis
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        entry = self.l1.get(key)
+        if entry is not None:
+            return max(int(entry[0] - time.monotonic()), 0), entry[1]  # type: ignore[return-value]
+
+        generation = self._generation
+        ttl, value = await super().get_with_ttl(key)
+        self._count_redis_lookup(value is not None)
+        if value is not None and generation == self._generation:
+            self.l1.set(key, value, ttl if ttl > 0 else None)
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.l1.get(key)
+        if entry is not None:
+            return entry[1]  # type: ignore[return-value]
+
+        generation = self._generation
+        value = await super().get(key)
+        self._count_redis_lookup(value is not None)
+        if value is not None and generation == self._generation:
+            self.l1.set(key, value)
+        return value
+
+    async def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        """
+        Get several keys, from the L1 where possible and the rest with a single MGET.
+        """
+        values: dict[str, Optional[bytes]] = {}
+        for key in keys:
+            entry = self.l1.get(key)
+            if entry is not None:
+                values[key] = entry[1]  # type: ignore[assignment]
+
+        missing = [key for key in keys if key not in values]
+        if missing:
+            generation = self._generation
+            for key, value in zip(missing, await self.redis.mget(missing)):
+                values[key] = value
+                self._count_redis_lookup(value is not None)
+                if value is not None and generation == self._generation:
+                    self.l1.set(key, value)
+        return [values[key] for key in keys]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await super().set(key, value, expire)
+        self.l1.set(key, value, expire)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        cleared = await super().clear(namespace=namespace, key=key)
+        if namespace:
+            # the L1 isn't indexed by namespace, drop everything
+            await self.invalidate_all()
+        elif key:
+            await self.invalidate(key)
+        return cleared
+
+    @property
+    def generation(self) -> int:
+        """
+        Invalidation counter, taken before a Redis read whose result is later handed to `fill`.
+        """
+        return self._generation
+
+    def fill(self, items: dict[str, bytes | None], expire: Optional[int], generation: int) -> None:
+        """
+        Keep values read from (or written to) Redis by the caller in this worker's L1, unless an
+        invalidation happened since `generation` was taken. Nothing is published.
+        """
+        if generation != self._generation:
+            return
+        for key, value in items.items():
+            if value is not None:
+                self.l1.set(key, value, expire)
+
+    async def publish_writes(self, items: dict[str, bytes | None], expire: Optional[int] = None) -> None:
+        """
+        Record entries the caller just wrote to Redis (or deleted, `None`): keep them in this
+        worker's L1 and have the other workers evict their copies.
+
+        Args:
+            items (dict[str, bytes | None]): Encoded values by cache key, `None` for deleted keys.
+            expire (Optional[int]): TTL of the written entries in seconds.
+        """
+        if not items:
+            return
+        self._generation += 1
+        for key, value in items.items():
+            if value is None:
+                self.l1.invalidate(key)
+            else:
+                self.l1.set(key, value, expire)
+        await self._publish(list(items))
+
+    async def invalidate(self, *keys: str) -> None:
+        """
+        Evict keys from this worker's L1 and publish the invalidation to the other workers.
+        """
+        self._evict(list(keys))
+        await self._publish(list(keys))
+
+    async def invalidate_all(self) -> None:
+        """
+        Empty the L1 of every worker.
+        """
+        self._evict(None)
+        await self._publish(None)
+
+    async def _publish(self, keys: list[str] | None) -> None:
+        await self.redis.publish(self.channel, json.dumps({"origin": self.origin, "keys": keys}))
+
+    def _evict(self, keys: list[str] | None) -> None:
+        self._generation += 1
+        if keys is None:
+            self.l1.clear()
+            return
+        for key in keys:
+            self.l1.invalidate(key)
+
+    async def start(self) -> None:
+        """
+        Subscribe to invalidations published by other workers.
+        """
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # invalidations published while we weren't subscribed are lost, start clean
+                    self._evict(None)
+                    logger.debug(f"Listening for cache invalidations on {self.channel}")
+
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            invalidation = json.loads(message["data"])
+                            if invalidation["origin"] != self.origin:
+                                self._evict(invalidation["keys"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener failed, resubscribing: {e}")
+                self._evict(None)
+                await asyncio.sleep(1)
+
+    def _count_redis_lookup(self, hit: bool) -> None:
+        if hit:
+            self.redis_hits += 1
+        else:
+            self.redis_misses += 1
+
+    def stats(self) -> dict[str, int | float]:
+        return self.l1.stats()
+
+    def lookups(self) -> dict[tuple[str, str], float]:
+        """
+        Cache lookups by `(layer, result)`, for the `fastapi_cache_lookups_total` metric.
+        """
+        return {
+            ("l1", "hit"): self.l1.hits,
+            ("l1", "miss"): self.l1.misses,
+            ("redis", "hit"): self.redis_hits,
+            ("redis", "miss"): self.redis_misses,
+        }
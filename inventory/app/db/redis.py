@@ -6,12 +6,17 @@ from fastapi_cache.coder import JsonCoder
 from loguru import logger
 from redis_om import get_redis_connection
 
+from inventory.app.middleware.metrics import InstrumentedRedis
+
 load_dotenv()
 
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
 # weirdly .env stores/reads int as str
 REDIS_PORT = int(os.getenv("REDIS_PORT", 12538))
+# size of the shared redis.asyncio pool, callers wait for a free connection beyond this
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5))
 
 params = {
     "host": REDIS_HOST,
@@ -35,13 +40,47 @@ def get_redis_om_client():
     return get_redis_connection(**params)
 
 
+# * shared asyncio pool, created lazily so it binds to the running event loop
+_redis_async_pool: redis.asyncio.BlockingConnectionPool | None = None
+
+
+def get_redis_async_pool() -> redis.asyncio.BlockingConnectionPool:
+    """
+    Get the process wide redis.asyncio connection pool, creating it on first use.
+    """
+    global _redis_async_pool
+    if _redis_async_pool is None:
+        _redis_async_pool = redis.asyncio.BlockingConnectionPool(
+            **params,
+            encoding="utf8",
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+        )
+    return _redis_async_pool
+
+
+async def close_redis_async_pool() -> None:
+    """
+    Disconnect every connection of the shared redis.asyncio pool.
+    """
+    global _redis_async_pool
+    if _redis_async_pool is not None:
+        await _redis_async_pool.disconnect()
+        _redis_async_pool = None
+
+
+def get_redis_async_client() -> redis.asyncio.Redis:
+    """
+    Get an asyncio Redis client on the shared connection pool, timing its commands for GET /metrics.
+    """
+    return InstrumentedRedis(connection_pool=get_redis_async_pool())
+
+
 def get_redis_cache_client():
     """
     Get the Redis cache client connection.
     """
-    return redis.asyncio.from_url(
-        f"redis://{REDIS_HOST}:{REDIS_PORT}", password=REDIS_PASSWORD, encoding="utf8", decode_responses=True
-    )
+    return get_redis_async_client()
 
 
 def get_redis_stream_client():
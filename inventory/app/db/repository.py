@@ -0,0 +1,399 @@
+import json
+import os
+from typing import AsyncIterator
+
+import redis.asyncio
+from dotenv import load_dotenv
+from loguru import logger
+from redis.asyncio.client import Pipeline
+from redis.commands.core import AsyncScript
+from redis_om.model.model import NotFoundError
+
+from inventory.app.db.redis import get_redis_async_client
+from inventory.app.models.models import Product
+
+load_dotenv()
+
+# * change stream of product upserts / deletes, read by the payment product snapshot
+PRODUCT_CHANGES_STREAM = os.getenv("PRODUCT_CHANGES_STREAM", "product_changes")
+# approximate length the stream is trimmed to, a reader further behind than this has to bootstrap again
+PRODUCT_CHANGES_MAXLEN = int(os.getenv("PRODUCT_CHANGES_MAXLEN", 100000))
+
+# * outcomes of DECREMENT_QUANTITY_SCRIPT
+DECREMENT_OK = "ok"
+DECREMENT_NOT_FOUND = "not_found"
+DECREMENT_INSUFFICIENT = "insufficient"
+
+# * every applied order leaves a marker for this long, a redelivered event (reclaimed after a failed batch,
+# republished by the payment outbox relay) finds it and doesn't take the stock a second time
+APPLIED_ORDER_TTL_S = int(os.getenv("APPLIED_ORDER_TTL_S", 7 * 24 * 3600))
+
+# KEYS[1]: product hash, KEYS[2..n + 1]: applied markers of successive orders
+# ARGV[1]: marker TTL in seconds, ARGV[2..n + 1]: quantities of the orders to take out of stock
+# each new order is checked against the stock left by the previous ones, the total is applied with one HINCRBY;
+# an order whose marker exists gets the status it was given the first time and takes nothing
+# returns {stock, status of order 1, status of order 2, ...}, stock is -1 when the product doesn't exist
+DECREMENT_QUANTITY_SCRIPT = """
+local result = {}
+local quantity = redis.call('HGET', KEYS[1], 'quantity')
+if not quantity then
+    result[1] = -1
+    for i = 2, #KEYS do
+        result[i] = 'not_found'
+    end
+    return result
+end
+quantity = tonumber(quantity)
+local taken = 0
+for i = 2, #KEYS do
+    local applied = redis.call('GET', KEYS[i])
+    if applied then
+        result[i] = applied
+    else
+        local requested = tonumber(ARGV[i])
+        if quantity - taken >= requested then
+            taken = taken + requested
+            result[i] = 'ok'
+        else
+            result[i] = 'insufficient'
+        end
+        redis.call('SET', KEYS[i], result[i], 'EX', ARGV[1])
+    end
+end
+if taken > 0 then
+    quantity = redis.call('HINCRBY', KEYS[1], 'quantity', -taken)
+end
+result[1] = quantity
+return result
+"""
+
+
+# KEYS[1]: product hash, ARGV: field, value, field, value, ...
+# writes only the given fields of an existing product (a concurrent decrement of a field it doesn't
+# get is kept) and returns the whole hash as it is after the write, {} if the product doesn't exist
+UPDATE_FIELDS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {}
+end
+if #ARGV > 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV))
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# KEYS: product hashes, ARGV[1]: JSON array of their field -> value mappings, in the same order
+SAVE_DOCUMENTS_SCRIPT = """
+local documents = cjson.decode(ARGV[1])
+for i, document in ipairs(documents) do
+    local fields = {}
+    for field, value in pairs(document) do
+        fields[#fields + 1] = field
+        fields[#fields + 1] = value
+    end
+    redis.call('HSET', KEYS[i], unpack(fields))
+end
+return #documents
+"""
+
+# KEYS[1..n]: product hashes, KEYS[n + 1]: change stream, ARGV[1]: stream max length, ARGV[2..n + 1]: pks
+# * runs in the same MULTI as the write it follows and publishes the state it reads then, so the
+# last entry of a product always carries its current state, whatever order concurrent writes ran in
+PUBLISH_CHANGES_SCRIPT = """
+local stream = KEYS[#KEYS]
+for i = 1, #KEYS - 1 do
+    local fields = redis.call('HMGET', KEYS[i], 'name', 'price', 'quantity')
+    if fields[1] then
+        redis.call('XADD', stream, 'MAXLEN', '~', ARGV[1], '*', 'op', 'upsert', 'pk', ARGV[i + 1],
+            'name', fields[1], 'price', fields[2] or '', 'quantity', fields[3] or '')
+    else
+        redis.call('XADD', stream, 'MAXLEN', '~', ARGV[1], '*', 'op', 'delete', 'pk', ARGV[i + 1])
+    end
+end
+return #KEYS - 1
+"""
+
+
+class ProductRepository:
+    """
+    Async persistence for `Product` on the shared redis.asyncio pool.
+
+    Keys and hash layout are the same as redis-om's (`Product.make_primary_key`), so data
+    written here is readable by `Product.get` and vice versa. Every write also publishes the
+    products it touched to `PRODUCT_CHANGES_STREAM`, atomically with the write.
+    """
+
+    def __init__(self, redis_client: redis.asyncio.Redis | None = None) -> None:
+        """
+        Initialize the repository.
+
+        Args:
+            redis_client (redis.asyncio.Redis | None): Client to use, defaults to one on the shared pool.
+        """
+        self._redis = redis_client
+        self._decrement_quantity_script: AsyncScript | None = None
+        self._save_documents_script: AsyncScript | None = None
+        self._update_fields_script: AsyncScript | None = None
+        self._publish_changes_script: AsyncScript | None = None
+
+    @property
+    def redis(self) -> redis.asyncio.Redis:
+        if self._redis is None:
+            self._redis = get_redis_async_client()
+        return self._redis
+
+    @property
+    def decrement_quantity_script(self) -> AsyncScript:
+        # registered once, runs as EVALSHA and falls back to EVAL if the script cache was flushed
+        if self._decrement_quantity_script is None:
+            self._decrement_quantity_script = self.redis.register_script(DECREMENT_QUANTITY_SCRIPT)
+        return self._decrement_quantity_script
+
+    @property
+    def save_documents_script(self) -> AsyncScript:
+        if self._save_documents_script is None:
+            self._save_documents_script = self.redis.register_script(SAVE_DOCUMENTS_SCRIPT)
+        return self._save_documents_script
+
+    @property
+    def update_fields_script(self) -> AsyncScript:
+        if self._update_fields_script is None:
+            self._update_fields_script = self.redis.register_script(UPDATE_FIELDS_SCRIPT)
+        return self._update_fields_script
+
+    @property
+    def publish_changes_script(self) -> AsyncScript:
+        if self._publish_changes_script is None:
+            self._publish_changes_script = self.redis.register_script(PUBLISH_CHANGES_SCRIPT)
+        return self._publish_changes_script
+
+    async def publish_changes(self, pks: list[str], pipe: Pipeline) -> None:
+        """
+        Queue the change stream entries of products on a transaction, after the writes to them.
+        """
+        await self.publish_changes_script(
+            keys=[*(self.key(pk) for pk in pks), PRODUCT_CHANGES_STREAM],
+            args=[PRODUCT_CHANGES_MAXLEN, *pks],
+            client=pipe,
+        )
+
+    @staticmethod
+    def key(pk: str) -> str:
+        """
+        Redis key of the product hash.
+        """
+        return Product.make_primary_key(pk)
+
+    @staticmethod
+    def applied_order_key(order_id: str) -> str:
+        """
+        Redis key of the marker left by `DECREMENT_QUANTITY_SCRIPT` once an order was applied.
+        """
+        return f"fastcart:inventory.AppliedOrder:{order_id}"
+
+    @staticmethod
+    def key_prefix() -> str:
+        """
+        Redis key prefix shared by every product hash.
+        """
+        return Product.make_primary_key("")
+
+    @staticmethod
+    def to_document(product: Product) -> dict:
+        """
+        Serialize a product to the mapping stored with HSET, skipping `None` values like redis-om.
+        """
+        return {k: v for k, v in product.model_dump(mode="json").items() if v is not None}
+
+    @staticmethod
+    def from_document(pk: str, document: dict) -> Product:
+        """
+        Build a product from an HGETALL result.
+        """
+        return Product.model_validate({**document, "pk": pk})
+
+    async def get(self, pk: str) -> Product:
+        """
+        Get a product by its primary key (pk).
+
+        Raises:
+            NotFoundError: If no product exists with that pk.
+        """
+        document = await self.redis.hgetall(self.key(pk))
+        if not document:
+            raise NotFoundError
+        return self.from_document(pk, document)
+
+    async def get_many(self, pks: list[str]) -> list[Product | None]:
+        """
+        Get several products in one pipelined round trip, `None` for the missing ones.
+        """
+        if not pks:
+            return []
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for pk in pks:
+                pipe.hgetall(self.key(pk))
+            documents = await pipe.execute()
+
+        return [self.from_document(pk, document) if document else None for pk, document in zip(pks, documents)]
+
+    async def save(self, product: Product) -> Product:
+        """
+        Create or overwrite a product.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.key(product.pk), mapping=self.to_document(product))
+            await self.publish_changes([product.pk], pipe)  # type: ignore[list-item]
+            await pipe.execute()
+        return product
+
+    async def update(self, pk: str, fields: dict) -> Product:
+        """
+        Write some fields of an existing product and return it as stored after the write.
+
+        Only the given fields are written, so a concurrent stock decrement isn't overwritten by
+        an update that doesn't set `quantity`.
+
+        Raises:
+            NotFoundError: If no product exists with that pk.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            await self.update_fields_script(
+                keys=[self.key(pk)], args=[item for field_value in fields.items() for item in field_value], client=pipe
+            )
+            await self.publish_changes([pk], pipe)
+            flat_document, _ = await pipe.execute()
+
+        if not flat_document:
+            raise NotFoundError
+        return self.from_document(pk, dict(zip(flat_document[::2], flat_document[1::2])))
+
+    async def save_documents(self, documents: list[dict[str, str]]) -> int:
+        """
+        Create or overwrite several products from ready hash mappings (`pk` included) with one
+        script call, returns the number written.
+
+        The mappings travel as a single JSON argument: packing one HSET per product costs more
+        client CPU than validating it, and bulk imports are bound by that.
+        """
+        if not documents:
+            return 0
+
+        pks = [document["pk"] for document in documents]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            await self.save_documents_script(
+                keys=[self.key(pk) for pk in pks], args=[json.dumps(documents)], client=pipe
+            )
+            await self.publish_changes(pks, pipe)
+            saved, _ = await pipe.execute()
+        return saved
+
+    async def delete(self, pk: str) -> Product:
+        """
+        Delete a product and return it, reading and deleting in one transaction.
+
+        Raises:
+            NotFoundError: If no product exists with that pk.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(self.key(pk))
+            pipe.delete(self.key(pk))
+            await self.publish_changes([pk], pipe)
+            document, *_ = await pipe.execute()
+
+        if not document:
+            raise NotFoundError
+        return self.from_document(pk, document)
+
+    async def decrement_quantity(self, pk: str, order_id: str, quantity: int) -> tuple[str, int]:
+        """
+        Atomically take an order's `quantity` units out of a product's stock, once per order.
+
+        Existence check, stock check and decrement run as one Lua script, so concurrent
+        consumers and PUT /inventory/product/{pk} can't interleave with it.
+
+        Args:
+            pk (str): Primary key of the product.
+            order_id (str): Order taking the stock, applying it again returns its first status.
+            quantity (int): Units to take out of stock.
+
+        Returns:
+            tuple[str, int]: `DECREMENT_OK`, `DECREMENT_INSUFFICIENT` (stock left untouched) or
+            `DECREMENT_NOT_FOUND`, and the stock after the call (-1 if not found).
+        """
+        statuses, stock = (await self.decrement_quantities({pk: [(order_id, quantity)]}))[pk]
+        return statuses[0], stock
+
+    async def decrement_quantities(self, orders: dict[str, list[tuple[str, int]]]) -> dict[str, tuple[list[str], int]]:
+        """
+        Apply the orders of several products, one atomic script per product, all in one transaction.
+
+        Orders of a product are checked in the given order against the stock left by the previous
+        ones, and the product hash is written once with the total taken. Orders already applied
+        (within `APPLIED_ORDER_TTL_S`) take nothing and get the status they were given then.
+
+        Args:
+            orders (dict[str, list[tuple[str, int]]]): `(order id, quantity)` per product pk, in arrival order.
+
+        Returns:
+            dict[str, tuple[list[str], int]]: Per product, the status of each order and the stock
+            after the call (-1 if not found).
+        """
+        if not orders:
+            return {}
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for pk, product_orders in orders.items():
+                await self.decrement_quantity_script(
+                    keys=[self.key(pk), *(self.applied_order_key(order_id) for order_id, _ in product_orders)],
+                    args=[APPLIED_ORDER_TTL_S, *(quantity for _, quantity in product_orders)],
+                    client=pipe,
+                )
+            await self.publish_changes(list(orders), pipe)
+            *results, _ = await pipe.execute()
+
+        return {pk: (statuses, int(stock)) for pk, (stock, *statuses) in zip(orders, results)}
+
+    async def all_pks(self) -> AsyncIterator[str]:
+        """
+        Iterate over the primary keys of every product.
+        """
+        key_prefix = self.key_prefix()
+        async for key in self.redis.scan_iter(match=f"{key_prefix}*", _type="HASH"):
+            yield key.removeprefix(key_prefix)
+
+    async def page(self, cursor: int = 0, limit: int = 100) -> tuple[list[Product], int]:
+        """
+        Fetch one page of products using a SCAN cursor and a single pipelined HGETALL batch.
+
+        The page costs one SCAN round trip (more only if the keyspace is sparse and SCAN comes
+        back with fewer than `limit` product keys) plus one pipeline round trip, regardless of
+        catalog size. As with SCAN COUNT, `limit` is a hint: a page can be slightly larger.
+
+        Args:
+            cursor (int): SCAN cursor returned by the previous page, 0 to start from the beginning.
+            limit (int): Number of products wanted in the page.
+
+        Returns:
+            tuple[list[Product], int]: Products and the cursor for the next page
+            (0 once the whole catalog has been walked).
+        """
+        key_prefix = self.key_prefix()
+
+        keys: list[str] = []
+        while True:
+            cursor, batch = await self.redis.scan(cursor, match=f"{key_prefix}*", count=limit, _type="HASH")
+            keys.extend(batch)
+            if cursor == 0 or len(keys) >= limit:
+                break
+
+        # a key can be deleted between SCAN and HGETALL, get_many returns None for those
+        products = [
+            product for product in await self.get_many([key.removeprefix(key_prefix) for key in keys]) if product
+        ]
+        logger.debug(f"Fetched {len(products)} products, next cursor: {cursor}")
+
+        return products, cursor
+
+
+product_repository = ProductRepository()
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+import time
+
+import redis.asyncio
+from dotenv import load_dotenv
+
+from inventory.app.db.redis import get_redis_async_client
+from inventory.app.db.stream_runtime import (
+    ORDER_COMPLETED_SHARDS,
+    STREAM_RATE_REPORT_INTERVAL_S,
+    processing_rate_key,
+    shard_streams,
+)
+
+load_dotenv()
+
+# stream stats are read from Redis at most this often per worker
+STREAM_STATS_CACHE_S = float(os.getenv("STREAM_STATS_CACHE_S", 2))
+
+
+def entry_age_ms(entry_id: str | None) -> int | None:
+    """
+    Age of a stream entry from the millisecond timestamp of its id.
+    """
+    if not entry_id:
+        return None
+    return max(int(time.time() * 1000) - int(entry_id.partition("-")[0]), 0)
+
+
+class StreamMonitor:
+    """
+    Backlog of the consumer groups reading a set of streams, from XINFO / XPENDING.
+
+    Per stream: length and last id. Per group: lag (entries not delivered yet, Redis 7+),
+    pending count, age of the oldest pending entry and summed processing rate. Per consumer:
+    pending count, idle time and the processing rate it reported. Results are cached for
+    `STREAM_STATS_CACHE_S` and concurrent callers share one refresh.
+    """
+
+    def __init__(
+        self, streams: list[str], redis_client: redis.asyncio.Redis | None = None, ttl: float = STREAM_STATS_CACHE_S
+    ) -> None:
+        self.streams = streams
+        self._redis = redis_client
+        self.ttl = ttl
+        self._cached: dict | None = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def redis(self) -> redis.asyncio.Redis:
+        if self._redis is None:
+            self._redis = get_redis_async_client()
+        return self._redis
+
+    async def stats(self) -> dict:
+        async with self._lock:
+            if self._cached is None or time.monotonic() >= self._expires_at:
+                self._cached = {stream: await self.stream_stats(stream) for stream in self.streams}
+                self._expires_at = time.monotonic() + self.ttl
+            return self._cached
+
+    async def stream_stats(self, stream: str) -> dict:
+        try:
+            info = await self.redis.xinfo_stream(stream)
+        except redis.exceptions.ResponseError:
+            return {"length": 0, "last_id": None, "groups": {}}  # * stream not created yet
+
+        groups = {}
+        for group in await self.redis.xinfo_groups(stream):
+            groups[group["name"]] = await self.group_stats(stream, group)
+        return {"length": info["length"], "last_id": info["last-generated-id"], "groups": groups}
+
+    async def group_stats(self, stream: str, group: dict) -> dict:
+        name = group["name"]
+        oldest_pending = (await self.redis.xpending(stream, name))["min"] if group["pending"] else None
+        reports = await self.redis.hgetall(processing_rate_key(stream, name))
+
+        consumers = {}
+        for consumer in await self.redis.xinfo_consumers(stream, name):
+            consumers[consumer["name"]] = {"pending": consumer["pending"], "idle_ms": consumer["idle"], "rate": None}
+        for consumer_name, report in reports.items():
+            report = json.loads(report)
+            # a consumer that stopped reporting isn't processing anything
+            if time.time() - report["reported_at"] <= STREAM_RATE_REPORT_INTERVAL_S * 3 and consumer_name in consumers:
+                consumers[consumer_name]["rate"] = report["rate"]
+
+        return {
+            "lag": group.get("lag"),
+            "pending": group["pending"],
+            "oldest_pending_age_ms": entry_age_ms(oldest_pending),
+            "last_delivered_id": group["last-delivered-id"],
+            "rate": round(sum(consumer["rate"] or 0 for consumer in consumers.values()), 3),
+            "consumers": consumers,
+        }
+
+
+# * the streams inventory consumes
+stream_monitor = StreamMonitor(shard_streams("order_completed", ORDER_COMPLETED_SHARDS))
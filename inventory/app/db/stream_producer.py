@@ -0,0 +1,223 @@
+import asyncio
+import os
+import time
+
+import redis.asyncio
+from dotenv import load_dotenv
+from loguru import logger
+
+from inventory.app.db.redis import get_redis_async_client
+
+load_dotenv()
+
+# * stream producer settings, one producer per process
+# entries buffered at most, publishers wait for room beyond this (backpressure)
+STREAM_PRODUCER_MAX_BUFFER = int(os.getenv("STREAM_PRODUCER_MAX_BUFFER", 10000))
+# entries per pipelined round trip of XADDs
+STREAM_PRODUCER_BATCH_SIZE = int(os.getenv("STREAM_PRODUCER_BATCH_SIZE", 500))
+# how long the first entry of a batch waits for more before the batch is flushed anyway
+STREAM_PRODUCER_LINGER_MS = float(os.getenv("STREAM_PRODUCER_LINGER_MS", 2))
+
+# (stream, fields, future resolved with the entry id)
+PendingEntry = tuple[str, dict, asyncio.Future]
+# queued by `stop`, the flush loop writes the batch it holds and exits when it takes it
+STOP = None
+
+
+class ProducerStats:
+    """
+    Flush counters of a `StreamProducer`: batch sizes, flush latency and backpressure.
+    """
+
+    def __init__(self) -> None:
+        self.flushes = 0
+        self.entries = 0
+        self.failed = 0
+        self.max_batch_size = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.backpressure_waits = 0
+
+    def record_flush(self, batch_size: int, seconds: float, failed: int) -> None:
+        self.flushes += 1
+        self.entries += batch_size
+        self.failed += failed
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.flush_seconds += seconds
+        self.max_flush_seconds = max(self.max_flush_seconds, seconds)
+
+    def as_dict(self) -> dict[str, int | float]:
+        return {
+            "flushes": self.flushes,
+            "entries": self.entries,
+            "failed": self.failed,
+            "avg_batch_size": round(self.entries / self.flushes, 2) if self.flushes else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_flush_ms": round(self.flush_seconds / self.flushes * 1000, 3) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+            "backpressure_waits": self.backpressure_waits,
+        }
+
+
+class StreamProducer:
+    """
+    Async Redis stream producer shared by every publisher of the process.
+
+    `publish` buffers the entry and waits until it is written: a background task drains the
+    buffer into pipelined XADDs, flushing as soon as `batch_size` entries are buffered or the
+    oldest one has waited `linger_ms`. Concurrent publishers thus share round trips on one
+    pooled connection. When the buffer holds `max_buffer` entries, publishers wait for room.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.asyncio.Redis | None = None,
+        max_buffer: int = STREAM_PRODUCER_MAX_BUFFER,
+        batch_size: int = STREAM_PRODUCER_BATCH_SIZE,
+        linger_ms: float = STREAM_PRODUCER_LINGER_MS,
+    ) -> None:
+        """
+        Initialize the producer.
+
+        Args:
+            redis_client (redis.asyncio.Redis | None): Client to publish with, the shared pool by default.
+            max_buffer (int): Max entries buffered before publishers wait.
+            batch_size (int): Max entries per pipelined flush.
+            linger_ms (float): Max time an entry waits for a batch to fill up.
+        """
+        self._redis = redis_client
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.linger_s = linger_ms / 1000
+        self.metrics = ProducerStats()
+        self._buffer: asyncio.Queue[PendingEntry | None] | None = None
+        self._flusher: asyncio.Task | None = None
+
+    @property
+    def redis(self) -> redis.asyncio.Redis:
+        if self._redis is None:
+            self._redis = get_redis_async_client()
+        return self._redis
+
+    async def start(self) -> None:
+        """
+        Start the flush task, called by the app lifespan (and lazily by the first publish elsewhere).
+        """
+        if self._flusher is None:
+            self._buffer = asyncio.Queue(self.max_buffer)
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """
+        Flush what is buffered, then stop the flush task.
+
+        The flush loop may hold a batch it already took from the buffer, so it is stopped with a
+        sentinel queued after the buffered entries rather than cancelled: it writes everything
+        taken before the sentinel, then exits. Entries sent while stopping are flushed here.
+        """
+        if self._flusher is None or self._buffer is None:
+            return
+        if not self._flusher.done():
+            await self._buffer.put(STOP)
+        await self._flusher
+        while not self._buffer.empty():
+            batch: list[PendingEntry] = []
+            self._take_batch(batch)
+            await self._flush(batch)
+        self._flusher = None
+        self._buffer = None
+
+    async def send(self, stream: str, fields: dict) -> asyncio.Future:
+        """
+        Buffer an entry, waiting for room if the buffer is full.
+
+        Returns:
+            asyncio.Future: Resolved with the entry id once written, or with the XADD error.
+        """
+        await self.start()
+        assert self._buffer is not None
+        future = asyncio.get_running_loop().create_future()
+        if self._buffer.full():
+            self.metrics.backpressure_waits += 1
+        await self._buffer.put((stream, fields, future))
+        return future
+
+    async def publish(self, stream: str, fields: dict) -> str:
+        """
+        Add an entry to a stream and wait until it is written.
+
+        Returns:
+            str: ID of the new entry.
+        """
+        return await (await self.send(stream, fields))
+
+    def _take_batch(self, batch: list[PendingEntry]) -> bool:
+        """
+        Move buffered entries into `batch`, up to the batch size.
+
+        Returns:
+            bool: Whether the `STOP` sentinel was taken, entries queued after it are left buffered.
+        """
+        assert self._buffer is not None
+        while len(batch) < self.batch_size and not self._buffer.empty():
+            entry = self._buffer.get_nowait()
+            if entry is STOP:
+                return True
+            batch.append(entry)
+        return False
+
+    async def _flush_loop(self) -> None:
+        assert self._buffer is not None
+        while True:
+            entry = await self._buffer.get()
+            if entry is STOP:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.linger_s
+            stopping = self._take_batch(batch)
+            while not stopping and len(batch) < self.batch_size and (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    entry = await asyncio.wait_for(self._buffer.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if entry is STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+                stopping = self._take_batch(batch)
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: list[PendingEntry]) -> None:
+        """
+        Write a batch with one pipelined round trip and resolve the futures of its entries.
+        """
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for stream, fields, _ in batch:
+                    pipe.xadd(stream, fields, id="*")
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            logger.warning(f"Stream producer flush of {len(batch)} entries failed: {e}")
+            results = [e] * len(batch)
+
+        failed = 0
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                failed += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        self.metrics.record_flush(len(batch), time.perf_counter() - started, failed)
+
+    def stats(self) -> dict[str, int | float]:
+        return {**self.metrics.as_dict(), "buffered": self._buffer.qsize() if self._buffer is not None else 0}
+
+
+stream_producer = StreamProducer()
@@ -0,0 +1,208 @@
+import asyncio
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Iterator
+
+import redis.asyncio
+from dotenv import load_dotenv
+from loguru import logger
+
+from inventory.app.db.redis import get_redis_async_client
+from inventory.app.db.stream_runtime import ORDER_COMPLETED_SHARDS, StreamEntry, shard_streams
+
+load_dotenv()
+
+# * retention settings: consumed entries are archived, then trimmed from Redis
+STREAM_RETENTION_INTERVAL_S = float(os.getenv("STREAM_RETENTION_INTERVAL_S", 60))
+# entries read per XRANGE while archiving
+STREAM_ARCHIVE_BATCH_SIZE = int(os.getenv("STREAM_ARCHIVE_BATCH_SIZE", 1000))
+STREAM_ARCHIVE_DIR = os.getenv("STREAM_ARCHIVE_DIR", "stream_archive")
+# a segment file is closed once it reaches this size, the next pass starts a new one
+STREAM_ARCHIVE_SEGMENT_BYTES = int(os.getenv("STREAM_ARCHIVE_SEGMENT_BYTES", 64 * 1024 * 1024))
+
+
+def parse_stream_id(entry_id: str) -> tuple[int, int]:
+    milliseconds, _, sequence = entry_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+class StreamArchive:
+    """
+    Append-only, gzip compressed archive of stream entries, one directory per stream.
+
+    Every archived range is one gzip member appended to the current segment file
+    (`{first id}.ndjson.gz`, one `[id, fields]` JSON array per line). It is then recorded in
+    `index.ndjson` with its id range and byte offset. A member written without its index line
+    (crash in between) is ignored and archived again by the next pass.
+    """
+
+    def __init__(
+        self, root: str | Path = STREAM_ARCHIVE_DIR, segment_bytes: int = STREAM_ARCHIVE_SEGMENT_BYTES
+    ) -> None:
+        self.root = Path(root)
+        self.segment_bytes = segment_bytes
+
+    def stream_dir(self, stream: str) -> Path:
+        return self.root / stream.replace(":", "_")
+
+    def index(self, stream: str) -> list[dict]:
+        """
+        Archived ranges of a stream, oldest first.
+        """
+        path = self.stream_dir(stream) / "index.ndjson"
+        if not path.exists():
+            return []
+        return [json.loads(line) for line in path.read_text().splitlines() if line]
+
+    def last_archived_id(self, stream: str) -> str | None:
+        index = self.index(stream)
+        return index[-1]["last_id"] if index else None
+
+    def append(self, stream: str, entries: list[StreamEntry]) -> None:
+        """
+        Archive entries newer than everything archived so far, durably, before they get trimmed.
+        """
+        if not entries:
+            return
+        directory = self.stream_dir(stream)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        index = self.index(stream)
+        segment = index[-1]["segment"] if index else None
+        if segment is None or (directory / segment).stat().st_size >= self.segment_bytes:
+            segment = f"{entries[0][0]}.ndjson.gz"
+
+        member = gzip.compress("".join(json.dumps([entry_id, fields]) + "\n" for entry_id, fields in entries).encode())
+        with open(directory / segment, "ab") as file:
+            offset = file.tell()
+            file.write(member)
+            file.flush()
+            os.fsync(file.fileno())
+
+        record = {
+            "segment": segment,
+            "offset": offset,
+            "length": len(member),
+            "first_id": entries[0][0],
+            "last_id": entries[-1][0],
+            "entries": len(entries),
+        }
+        with open(directory / "index.ndjson", "a") as file:
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def replay(self, stream: str, start: str = "0-0", end: str | None = None) -> Iterator[StreamEntry]:
+        """
+        Archived entries of a stream with `start <= id <= end`, in id order.
+        """
+        low = parse_stream_id(start)
+        high = parse_stream_id(end) if end is not None else None
+        directory = self.stream_dir(stream)
+        for record in self.index(stream):
+            if parse_stream_id(record["last_id"]) < low or (
+                high is not None and parse_stream_id(record["first_id"]) > high
+            ):
+                continue
+            with open(directory / record["segment"], "rb") as file:
+                file.seek(record["offset"])
+                member = file.read(record["length"])
+            for line in gzip.decompress(member).decode().splitlines():
+                entry_id, fields = json.loads(line)
+                if low <= parse_stream_id(entry_id) and (high is None or parse_stream_id(entry_id) <= high):
+                    yield entry_id, fields
+
+
+class StreamRetention:
+    """
+    Bounds stream memory to the unprocessed backlog.
+
+    Every pass computes, per stream, the oldest entry some consumer group still needs: the
+    oldest pending entry of a group, or the last entry delivered to it. Everything older has
+    been acknowledged by every group. That range is archived and then trimmed with
+    `XTRIM MINID ~`, which only ever removes entries older than the given id. A stream without
+    consumer groups is left untouched.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.asyncio.Redis,
+        streams: list[str],
+        archive: StreamArchive | None = None,
+        batch_size: int = STREAM_ARCHIVE_BATCH_SIZE,
+    ) -> None:
+        self.redis = redis_client
+        self.streams = streams
+        self.archive = archive or StreamArchive()
+        self.batch_size = batch_size
+
+    async def trim_point(self, stream: str) -> str | None:
+        """
+        Id of the oldest entry still needed by a consumer group, `None` if the stream can't be trimmed.
+        """
+        try:
+            groups = await self.redis.xinfo_groups(stream)
+        except redis.exceptions.ResponseError:
+            return None  # * no such stream
+        if not groups:
+            return None
+
+        floors = []
+        for group in groups:
+            floor = group["last-delivered-id"]
+            if group["pending"]:
+                floor = (await self.redis.xpending(stream, group["name"]))["min"]
+            floors.append(floor)
+        point = min(floors, key=parse_stream_id)
+        return None if point == "0-0" else point
+
+    async def run_once(self, stream: str) -> tuple[int, int]:
+        """
+        Archive then trim the fully acknowledged entries of a stream.
+
+        Returns:
+            tuple[int, int]: Entries archived and entries trimmed.
+        """
+        point = await self.trim_point(stream)
+        if point is None:
+            return 0, 0
+
+        last_archived = await asyncio.to_thread(self.archive.last_archived_id, stream)
+        start = f"({last_archived}" if last_archived else "-"
+        archived = 0
+        while True:
+            entries = await self.redis.xrange(stream, min=start, max=f"({point}", count=self.batch_size)
+            if not entries:
+                break
+            await asyncio.to_thread(self.archive.append, stream, entries)
+            archived += len(entries)
+            start = f"({entries[-1][0]}"
+
+        trimmed = await self.redis.xtrim(stream, minid=point, approximate=True)
+        if archived or trimmed:
+            logger.info(f"Stream '{stream}': archived {archived} entries, trimmed {trimmed} before {point}")
+        return archived, trimmed
+
+    async def run(self) -> None:
+        """
+        Run a retention pass over every stream every `STREAM_RETENTION_INTERVAL_S` until cancelled.
+        """
+        while True:
+            for stream in self.streams:
+                try:
+                    await self.run_once(stream)
+                except Exception as e:
+                    logger.exception(f"Retention pass of stream '{stream}' failed: {e}")
+            await asyncio.sleep(STREAM_RETENTION_INTERVAL_S)
+
+
+def retain():
+    # the streams inventory consumes, trimmed once every group acknowledged them
+    retention = StreamRetention(get_redis_async_client(), shard_streams("order_completed", ORDER_COMPLETED_SHARDS))
+    asyncio.run(retention.run())
+
+
+if __name__ == "__main__":
+    retain()
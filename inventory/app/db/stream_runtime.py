@@ -0,0 +1,395 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import zlib
+from typing import Awaitable, Callable
+
+import redis.asyncio
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+# * consumer runtime settings, shared by every stream consumer of the service
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 100))
+STREAM_BLOCK_MS = int(os.getenv("STREAM_BLOCK_MS", 3000))
+# entries pending for longer than this on any consumer are considered stuck and get reclaimed
+STREAM_RECLAIM_IDLE_MS = int(os.getenv("STREAM_RECLAIM_IDLE_MS", 60000))
+STREAM_RECLAIM_INTERVAL_S = float(os.getenv("STREAM_RECLAIM_INTERVAL_S", 30))
+STREAM_ERROR_BACKOFF_S = float(os.getenv("STREAM_ERROR_BACKOFF_S", 1))
+# every consumer reports its processing rate to Redis this often, read by the stream stats endpoints
+STREAM_RATE_REPORT_INTERVAL_S = float(os.getenv("STREAM_RATE_REPORT_INTERVAL_S", 10))
+# * worker runner defaults: CONSUMER_PROCESSES processes x CONSUMER_WORKERS async workers
+CONSUMER_PROCESSES = int(os.getenv("CONSUMER_PROCESSES", 1))
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", 1))
+# * shards of `order_completed`, published by payment and consumed by inventory, events are sharded by product_id
+ORDER_COMPLETED_SHARDS = int(os.getenv("ORDER_COMPLETED_SHARDS", 1))
+
+# (entry id, fields) as returned by XREADGROUP / XAUTOCLAIM
+StreamEntry = tuple[str, dict]
+# processes a batch and returns the ids that can be acknowledged
+BatchHandler = Callable[[list[StreamEntry]], Awaitable[list[str]]]
+
+
+def processing_rate_key(stream: str, group: str) -> str:
+    """
+    Hash of the processing rate reported by every consumer of a group, by consumer name.
+    """
+    return f"stream_rates:{stream}:{group}"
+
+
+def default_consumer_name() -> str:
+    """
+    Consumer name unique to this process, so a restarted process shows up as a new consumer
+    and the entries left pending by the old one can be reclaimed.
+    """
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class StreamConsumer:
+    """
+    Reusable Redis stream consumer-group runtime.
+
+    - reads up to `batch_size` entries per XREADGROUP
+    - acknowledges the ids returned by the handler with a single XACK per batch
+    - polls adaptively: XREADGROUP returns as soon as entries are available and only blocks
+      (up to `block_ms`) when the stream is drained, there is no fixed sleep between batches
+    - every `reclaim_interval_s`, claims entries idle for more than `reclaim_idle_ms`
+      (left by dead consumers or failed batches) with XAUTOCLAIM and processes them again
+    - ordered (the consumer is the only one of its stream, see `assign_streams`): takes over
+      the entries left pending by the previous owner at startup and, while any entry of its
+      own is pending, retries those (oldest first) instead of reading new ones, so entries are
+      always applied in stream order; there is no idle-time reclaim
+    - every `STREAM_RATE_REPORT_INTERVAL_S`, reports the entries it acknowledged per second
+      to `processing_rate_key(stream, group)`, expiring if the consumer stops reporting
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.asyncio.Redis,
+        stream: str,
+        group: str,
+        handler: BatchHandler,
+        consumer: str | None = None,
+        batch_size: int = STREAM_BATCH_SIZE,
+        block_ms: int = STREAM_BLOCK_MS,
+        reclaim_idle_ms: int = STREAM_RECLAIM_IDLE_MS,
+        reclaim_interval_s: float = STREAM_RECLAIM_INTERVAL_S,
+        ordered: bool = False,
+    ) -> None:
+        """
+        Initialize the consumer.
+
+        Args:
+            redis_client (redis.asyncio.Redis): Client with `decode_responses=True`.
+            stream (str): Stream key.
+            group (str): Consumer group, created (with the stream) if missing.
+            handler (BatchHandler): Processes a batch of entries, returns the ids to acknowledge.
+            consumer (str | None): Consumer name, defaults to `default_consumer_name()`.
+            batch_size (int): Max entries per read and per reclaim.
+            block_ms (int): Max time XREADGROUP blocks when the stream is drained.
+            reclaim_idle_ms (int): Min idle time of a pending entry before it is reclaimed.
+            reclaim_interval_s (float): Time between two reclaim passes.
+            ordered (bool): Apply entries strictly in stream order, the consumer must own the stream.
+        """
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.handler = handler
+        self.consumer = consumer or default_consumer_name()
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.reclaim_idle_ms = reclaim_idle_ms
+        self.reclaim_interval_s = reclaim_interval_s
+        self.ordered = ordered
+        self._next_reclaim = 0.0
+        self._stopped = asyncio.Event()
+        self.processed = 0
+        self._rate_window_start = time.monotonic()
+        self._rate_window_processed = 0
+
+    async def ensure_group(self) -> None:
+        """
+        Create the consumer group (and the stream) if they don't exist yet.
+        """
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info(f"Created group '{self.group}' for stream '{self.stream}'")
+        except redis.exceptions.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+            logger.debug(f"Group '{self.group}' already exists for stream '{self.stream}'")
+
+    async def read_batch(self) -> list[StreamEntry]:
+        """
+        Read the next batch of new entries, blocking only if none are available.
+        """
+        response = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=self.batch_size, block=self.block_ms
+        )
+        if not response:
+            return []
+        return response[0][1]
+
+    async def read_own_pending(self) -> list[StreamEntry]:
+        """
+        Read the oldest entries delivered to this consumer and not acknowledged yet.
+        """
+        response = await self.redis.xreadgroup(self.group, self.consumer, {self.stream: "0"}, count=self.batch_size)
+        if not response:
+            return []
+        return response[0][1]
+
+    async def take_over(self) -> int:
+        """
+        Claim every entry pending on another consumer of the group, whatever its idle time.
+
+        Only for ordered consumers: the stream has a single owner, so those entries were left by a
+        previous owner (a dead or reassigned worker) and must be applied before any new entry.
+        """
+        claimed = 0
+        start_id = "0-0"
+        while True:
+            response = await self.redis.xautoclaim(
+                self.stream, self.group, self.consumer, min_idle_time=0, start_id=start_id, count=self.batch_size
+            )
+            start_id = response[0]
+            claimed += len(response[1])
+            if start_id == "0-0":
+                break
+
+        if claimed:
+            logger.warning(f"Took over {claimed} pending entries of '{self.stream}' from a previous consumer")
+        return claimed
+
+    async def reclaim_batch(self) -> list[StreamEntry]:
+        """
+        Claim entries stuck in the pending entries list for longer than `reclaim_idle_ms`.
+        """
+        entries: list[StreamEntry] = []
+        start_id = "0-0"
+        while len(entries) < self.batch_size:
+            response = await self.redis.xautoclaim(
+                self.stream,
+                self.group,
+                self.consumer,
+                min_idle_time=self.reclaim_idle_ms,
+                start_id=start_id,
+                count=self.batch_size - len(entries),
+            )
+            start_id, claimed = response[0], response[1]
+            entries.extend(claimed)
+            if start_id == "0-0":
+                break
+
+        if entries:
+            logger.warning(f"Reclaimed {len(entries)} stuck entries from '{self.stream}'")
+        return entries
+
+    async def process(self, entries: list[StreamEntry]) -> int:
+        """
+        Hand a batch to the handler and acknowledge what it processed with one XACK.
+
+        Entries deleted from the stream while pending come back from XAUTOCLAIM without
+        fields; they can't be processed and are acknowledged right away.
+        """
+        deleted = [entry_id for entry_id, fields in entries if fields is None]
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields is not None]
+
+        ack_ids = deleted + (await self.handler(entries) if entries else [])
+        if ack_ids:
+            await self.redis.xack(self.stream, self.group, *ack_ids)
+        self.processed += len(ack_ids)
+        return len(ack_ids)
+
+    async def report_rate(self) -> float:
+        """
+        Publish the entries acknowledged per second since the last report.
+        """
+        now = time.monotonic()
+        rate = (self.processed - self._rate_window_processed) / max(now - self._rate_window_start, 1e-9)
+        self._rate_window_start, self._rate_window_processed = now, self.processed
+
+        key = processing_rate_key(self.stream, self.group)
+        report = {"rate": round(rate, 3), "processed": self.processed, "reported_at": time.time()}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, self.consumer, json.dumps(report))
+            pipe.expire(key, int(STREAM_RATE_REPORT_INTERVAL_S * 3) + 1)
+            await pipe.execute()
+        return rate
+
+    async def run_once(self) -> int:
+        """
+        Run one iteration: a reclaim pass when due, then one read. Returns the batch size read.
+
+        An ordered consumer reads its own pending entries first and only reads new ones once
+        they are all acknowledged.
+        """
+        if self.ordered:
+            pending = await self.read_own_pending()
+            if pending:
+                acked = await self.process(pending)
+                logger.info(f"Retried {len(pending)} pending entries of '{self.stream}', acknowledged {acked}")
+                if acked < len(pending):
+                    # * the oldest entry still fails, wait before retrying it rather than moving past it
+                    await asyncio.sleep(STREAM_ERROR_BACKOFF_S)
+                return len(pending)
+        elif time.monotonic() >= self._next_reclaim:
+            self._next_reclaim = time.monotonic() + self.reclaim_interval_s
+            reclaimed = await self.reclaim_batch()
+            if reclaimed:
+                await self.process(reclaimed)
+
+        if time.monotonic() - self._rate_window_start >= STREAM_RATE_REPORT_INTERVAL_S:
+            await self.report_rate()
+
+        entries = await self.read_batch()
+        if entries:
+            acked = await self.process(entries)
+            logger.info(f"Processed batch of {len(entries)} from '{self.stream}', acknowledged {acked}")
+        return len(entries)
+
+    async def run(self) -> None:
+        """
+        Consume the stream until `stop()` is called.
+        """
+        await self.ensure_group()
+        if self.ordered:
+            await self.take_over()
+        logger.info(f"Consumer '{self.consumer}' of group '{self.group}' listening on '{self.stream}'")
+
+        while not self._stopped.is_set():
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.exception(f"Error consuming Redis stream '{self.stream}': {e}")
+                # * back off on errors only, a healthy loop never sleeps
+                await asyncio.sleep(STREAM_ERROR_BACKOFF_S)
+
+    def stop(self) -> None:
+        """
+        Ask the consumer loop to exit after the current iteration.
+        """
+        self._stopped.set()
+
+
+def shard_for_key(partition_key: str, shards: int) -> int:
+    """
+    Stable shard of a partition key (e.g. a product id), identical across processes and services.
+    """
+    return zlib.crc32(partition_key.encode("utf-8")) % shards
+
+
+def shard_stream(stream: str, shard: int, shards: int) -> str:
+    """
+    Key of one shard of a stream; a single shard keeps the plain stream name.
+    """
+    return stream if shards == 1 else f"{stream}:{shard}"
+
+
+def shard_streams(stream: str, shards: int) -> list[str]:
+    """
+    Keys of every shard of a stream.
+    """
+    return [shard_stream(stream, shard, shards) for shard in range(shards)]
+
+
+# builds the consumer of one stream for one worker: (stream, consumer name) -> StreamConsumer
+ConsumerFactory = Callable[[str, str], StreamConsumer]
+
+
+def assign_streams(streams: list[str], worker_index: int, total_workers: int, ordered: bool) -> list[str]:
+    """
+    Streams a worker consumes.
+
+    Ordered: every stream (shard) is owned by exactly one worker, so entries of a shard, and of
+    every partition key hashed to it, are applied in order. Workers beyond the shard count idle.
+    Ownership is static: the shards of a dead process wait (their entries are kept in the stream)
+    until it is restarted, run consumer processes under a supervisor that restarts them. The new
+    owner takes over the entries left pending before reading new ones.
+    Unordered: every worker competes on every stream through the consumer group.
+    """
+    if not ordered:
+        return streams
+    return [stream for shard, stream in enumerate(streams) if shard % total_workers == worker_index]
+
+
+async def run_worker_pool(
+    factory: ConsumerFactory,
+    streams: list[str],
+    ordered: bool,
+    process_index: int = 0,
+    processes: int = 1,
+    workers: int = CONSUMER_WORKERS,
+) -> None:
+    """
+    Run `workers` async workers in this process until SIGINT / SIGTERM.
+
+    Each worker gets a distinct consumer name and one `StreamConsumer` per assigned stream.
+    Every consumer holds a pooled connection while its XREADGROUP blocks, so the Redis pool
+    should be sized above the number of consumers.
+    """
+    total_workers = processes * workers
+    consumers = []
+    for worker in range(workers):
+        worker_index = process_index * workers + worker
+        consumer_name = f"{default_consumer_name()}-w{worker}"
+        for stream in assign_streams(streams, worker_index, total_workers, ordered):
+            consumers.append(factory(stream, consumer_name))
+
+    if not consumers:
+        logger.warning(f"Process {process_index} has no streams assigned, more workers than shards")
+        return
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: [consumer.stop() for consumer in consumers])
+
+    logger.info(f"Process {process_index} running {len(consumers)} consumers across {workers} workers")
+    await asyncio.gather(*(consumer.run() for consumer in consumers))
+
+
+def _run_process(
+    factory: ConsumerFactory, streams: list[str], ordered: bool, process_index: int, processes: int, workers: int
+) -> None:
+    asyncio.run(run_worker_pool(factory, streams, ordered, process_index, processes, workers))
+
+
+def run_workers(
+    factory: ConsumerFactory,
+    streams: list[str],
+    ordered: bool,
+    processes: int = CONSUMER_PROCESSES,
+    workers: int = CONSUMER_WORKERS,
+) -> None:
+    """
+    Start `processes` processes of `workers` async workers each and wait for them to exit.
+
+    `factory` must be a module level function so it can be handed to spawned processes.
+    """
+    if processes == 1:
+        _run_process(factory, streams, ordered, 0, 1, workers)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    children = [
+        context.Process(
+            target=_run_process,
+            args=(factory, streams, ordered, process_index, processes, workers),
+            name=f"consumer-{process_index}",
+        )
+        for process_index in range(processes)
+    ]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        # children got the same SIGINT and stop on their own
+        for child in children:
+            child.join()
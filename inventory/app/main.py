@@ -1,12 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from loguru import logger
 
-from inventory.app.db.redis import CustomJsonCoder, get_redis_cache_client, get_redis_om_client
+from inventory.app.db.l1_cache import L1RedisBackend
+from inventory.app.db.redis import (
+    CustomJsonCoder,
+    close_redis_async_pool,
+    get_redis_cache_client,
+    get_redis_om_client,
+)
+from inventory.app.db.stream_producer import stream_producer
+from inventory.app.middleware.metrics import REGISTRY, CallbackMetric, MetricsMiddleware, metrics_endpoint
 from inventory.app.models.models import Product
 from inventory.app.routes.route import router
+from inventory.app.services.utils import versioned_key_builder
 
 # Create an instance of the FastAPI application
 app = FastAPI()
@@ -16,6 +24,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "DELETE", "OPTIONS"],  # Explicitly allow OPTIONS for preflight checks
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor", "X-Cache-Stale"],  # Pagination cursor and staleness of GET /inventory/products
+)
+
+# * latency / in-flight requests per route, scraped from GET /metrics with the Redis and cache metrics
+app.add_middleware(MetricsMiddleware)
+app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
+
+def cache_lookups() -> dict[tuple[str, ...], float]:
+    backend = getattr(app.state, "cache_backend", None)
+    return backend.lookups() if backend is not None else {}
+
+
+REGISTRY.register(
+    CallbackMetric(
+        "fastapi_cache_lookups_total",
+        "fastapi-cache lookups by layer and result",
+        "counter",
+        ("layer", "result"),
+        cache_lookups,
+    )
 )
 
 # Initialize a variable to store the redis_cache instance
@@ -30,10 +59,18 @@ async def startup_event() -> None:
     # Initialize Redis OM client for data operations
     app.state.redis = get_redis_om_client()
 
-    # Initialize Redis client for caching, set coder for reading from cache
+    # Initialize Redis client for caching (shares the redis.asyncio pool with ProductRepository)
     global redis_cache
     redis_cache = get_redis_cache_client()
-    FastAPICache.init(RedisBackend(redis_cache), prefix="fastapi-cache", coder=CustomJsonCoder)
+    # in-process L1 in front of Redis, evicted across workers over pub/sub
+    app.state.cache_backend = L1RedisBackend(redis_cache)
+    await app.state.cache_backend.start()
+    FastAPICache.init(
+        app.state.cache_backend, prefix="fastapi-cache", coder=CustomJsonCoder, key_builder=versioned_key_builder
+    )
+
+    # * one pipelined stream producer per process for every XADD
+    await stream_producer.start()
 
     # Set model Redis database and prefix in meta
     Product.set_meta_attr(app.state.redis, global_key_prefix="fastcart", model_key_prefix="inventory.Product")
@@ -48,8 +85,11 @@ async def shutdown_event() -> None:
     Event handler for application shutdown.
     """
     app.state.redis.close()
+    await app.state.cache_backend.stop()
+    await stream_producer.stop()
     if redis_cache:
         await redis_cache.close()
+    await close_redis_async_pool()
 
     logger.debug("Redis connection closed during app shutdown")
     logger.info("Application is shutting down...")
@@ -0,0 +1,260 @@
+import bisect
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator
+
+import redis.asyncio
+from redis.asyncio.client import Pipeline
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# * Prometheus text exposition format, scraped from GET /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# upper bounds in seconds, shared by every latency histogram
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+
+def format_labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Metric(ABC):
+    """
+    Base of the metric types: name, help text, label names and the exposition header.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+
+    def header(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+
+    @abstractmethod
+    def render(self) -> Iterator[str]:
+        """
+        Lines of the metric in the exposition format, header included.
+        """
+
+
+class Counter(Metric):
+    """
+    Monotonic counter per label values.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield from self.header()
+        for labels, value in list(self.values.items()):
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge(Counter):
+    """
+    Value that goes up and down, per label values.
+    """
+
+    type = "gauge"
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self.values[labels] = value
+
+    def dec(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+
+class CallbackMetric(Metric):
+    """
+    Counter or gauge read from elsewhere (e.g. cache stats) at scrape time only, costing nothing per request.
+    """
+
+    def __init__(
+        self, name: str, help: str, type: str, labelnames: Labels, collect: Callable[[], dict[Labels, float]]
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.type = type
+        self.collect = collect
+
+    def render(self) -> Iterator[str]:
+        yield from self.header()
+        for labels, value in self.collect().items():
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram(Metric):
+    """
+    Latency histogram per label values. An observation increments one bucket, cumulative
+    bucket counts are only computed when rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Labels = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        # label values -> [count per bucket..., count above the last bucket, sum]
+        self.values: dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def render(self) -> Iterator[str]:
+        yield from self.header()
+        bucket_labels = (*self.labelnames, "le")
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, counts in list(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{format_labels(bucket_labels, (*labels, bound))} {cumulative}"
+            label_text = format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {counts[-1]}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Registry:
+    """
+    Metrics of the process, rendered together in the Prometheus text format.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION: Histogram = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+)
+HTTP_REQUESTS_IN_FLIGHT: Gauge = REGISTRY.register(Gauge("http_requests_in_flight", "HTTP requests being served"))
+REDIS_COMMAND_DURATION: Histogram = REGISTRY.register(
+    Histogram("redis_command_duration_seconds", "Redis command (or pipeline) round trip time", ("command",))
+)
+REDIS_COMMAND_ERRORS: Counter = REGISTRY.register(
+    Counter("redis_command_errors_total", "Redis commands (or pipelines) that raised", ("command",))
+)
+REDIS_BLOCKING_READ_DURATION: Histogram = REGISTRY.register(
+    Histogram(
+        "redis_blocking_read_duration_seconds",
+        "Stream reads with BLOCK, mostly time spent waiting for entries",
+        ("command",),
+    )
+)
+# * with BLOCK these wait up to the block timeout, they would swamp the command round trip times
+BLOCKING_READ_COMMANDS = ("XREAD", "XREADGROUP")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording the latency and status of every HTTP request.
+
+    Requests are labelled with their route template (e.g. `/product/{pk}`), not the raw path,
+    so label cardinality stays bounded; requests that match no route share `unmatched`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.values
+        in_flight[()] = in_flight.get((), 0.0) + 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight[()] -= 1
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_DURATION.observe(elapsed, (scope["method"], path, str(status)))
+
+
+async def metrics_endpoint() -> Response:
+    """
+    GET /metrics: every metric of this worker in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+class InstrumentedPipeline(Pipeline):
+    """
+    Pipeline recording each round trip as one `PIPELINE` (or `MULTI` when transactional) command.
+    """
+
+    async def execute(self, raise_on_error: bool = True):
+        command = "MULTI" if self.is_transaction else "PIPELINE"
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        except Exception:
+            REDIS_COMMAND_ERRORS.inc((command,))
+            raise
+        finally:
+            REDIS_COMMAND_DURATION.observe(time.perf_counter() - started, (command,))
+
+
+class InstrumentedRedis(redis.asyncio.Redis):
+    """
+    redis.asyncio client recording the count and duration of every command it sends.
+
+    Stream reads that block are recorded apart, in `REDIS_BLOCKING_READ_DURATION`.
+    """
+
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        duration = REDIS_COMMAND_DURATION
+        if command in BLOCKING_READ_COMMANDS and b"BLOCK" in args:
+            duration = REDIS_BLOCKING_READ_DURATION
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except Exception:
+            REDIS_COMMAND_ERRORS.inc((command,))
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started, (command,))
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
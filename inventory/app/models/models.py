@@ -74,6 +74,21 @@ class UpdateProduct(BaseModel):
         }
 
 
+# * upper bound on pks per POST /inventory/products/batch-get
+PRODUCTS_BATCH_GET_MAX = 500
+
+
+class ProductBatchGet(BaseModel):
+    pks: list[str] = Field(..., min_length=1, max_length=PRODUCTS_BATCH_GET_MAX)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "pks": ["01JQ7ZB4Q0ZQX8ZKX8Y6ZP8V3M", "01JQ7ZB4Q1A2B3C4D5E6F7G8H9"],
+            }
+        }
+
+
 def _migrate_keys(
     redis_client,
     OLD_PREFIX: str = ":inventory.app.models.models.Product",
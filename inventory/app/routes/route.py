@@ -1,7 +1,21 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi_cache import FastAPICache
+from redis_om.model.model import NotFoundError
 
-from inventory.app.models.models import Product, UpdateProduct
+from inventory.app.db.l1_cache import L1RedisBackend
+from inventory.app.db.stream_monitor import stream_monitor
+from inventory.app.db.stream_producer import stream_producer
+from inventory.app.exceptions.custom_exceptions import CustomNotFoundException
+from inventory.app.models.models import Product, ProductBatchGet, UpdateProduct
+from inventory.app.services.bulk_import import (
+    ImportLineTooLong,
+    InvalidImportHeader,
+    UnsupportedImportFormat,
+    parse_import,
+)
 from inventory.app.services.service import Service
+from inventory.app.services.utils import PRODUCTS_PAGE_LIMIT, PRODUCTS_PAGE_MAX_LIMIT
 
 # Initialize the router with a prefix and tags
 router = APIRouter(prefix="/inventory", tags=["inventory"])
@@ -14,27 +28,62 @@ inventory_service = Service()
 
 
 @router.get("/products", response_model=list[dict[str, str | float | int]])
-async def get_all_products() -> list[dict[str, str | float | int]]:
+async def get_all_products(
+    response: Response,
+    cursor: int = Query(0, ge=0, description="Cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(PRODUCTS_PAGE_LIMIT, ge=1, le=PRODUCTS_PAGE_MAX_LIMIT, description="Products per page"),
+) -> list[dict[str, str | float | int]]:
     """
-    Get all products from the database
+    Get a page of products from the database.
+
+    The cursor for the next page is returned in the `X-Next-Cursor` header, `0` means the last page.
+    `X-Cache-Stale: true` flags a page served from the previous catalog while it is being rebuilt.
     """
-    products = await inventory_service.get_all_products()
+    page = await inventory_service.get_all_products(cursor=cursor, limit=limit)
+    response.headers["X-Next-Cursor"] = str(page["next_cursor"])
+    if page["stale"]:
+        response.headers["X-Cache-Stale"] = "true"
+
+    products = page["products"]
     if isinstance(products, list):
         return list(products)
     raise TypeError("Expected a list of products, but got a non-iterable response.")
 
 
+@router.get("/products/snapshot", response_class=StreamingResponse)
+async def get_products_snapshot() -> StreamingResponse:
+    """
+    Stream the whole catalog, uncached, as NDJSON (one product per line).
+
+    Meant for bootstrapping readers of the product change stream, not for clients.
+    """
+    return StreamingResponse(inventory_service.iter_products_snapshot(), media_type="application/x-ndjson")
+
+
 @router.get("/product/{pk}", response_model=dict[str, str | float | int])
 async def get_product(pk: str) -> dict[str, str | float | int]:
     """
     Get a product by its primary key (pk).
     """
-    product = await inventory_service.get_product_by_pk(pk)
+    try:
+        product = await inventory_service.get_product_by_pk(pk)
+    except NotFoundError:
+        raise CustomNotFoundException(pk)
     if isinstance(product, dict):
         return product
     raise TypeError("Expected a dictionary, but got a different response type.")
 
 
+@router.post("/products/batch-get", response_model=dict[str, list])
+async def get_products(batch: ProductBatchGet) -> dict[str, list]:
+    """
+    Get several products by their primary keys in one call.
+
+    Returns the `products` found, in request order, and the `missing` pks.
+    """
+    return await inventory_service.get_products_by_pks(batch.pks)
+
+
 @router.post("/product", response_model=Product)
 async def add_product(product: Product) -> Product:
     """
@@ -43,6 +92,28 @@ async def add_product(product: Product) -> Product:
     return await inventory_service.add_product(product)
 
 
+@router.post("/products/bulk", response_model=dict)
+async def bulk_add_products(request: Request) -> dict:
+    """
+    Add products in bulk from a streamed NDJSON (`application/x-ndjson`) or CSV (`text/csv`,
+    header line required) request body.
+
+    Returns the number of imported products and, per rejected row, its line number and errors.
+    A line longer than `BULK_IMPORT_MAX_LINE_BYTES` fails the request with a 422, chunks written
+    before it stay imported.
+    """
+    try:
+        rows = parse_import(request.stream(), request.headers.get("content-type", ""))
+        report = await inventory_service.bulk_add_products(rows)
+    except UnsupportedImportFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except InvalidImportHeader as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportLineTooLong as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return report.as_dict()
+
+
 @router.put("/product/{pk}", response_model=UpdateProduct)
 async def update_product(pk: str, update_product: UpdateProduct) -> Product:
     """
@@ -57,3 +128,31 @@ async def delete_product(pk: str) -> dict[str, str | float | int]:
     Delete a product by its primary key (pk).
     """
     return await inventory_service.delete_product_by_pk(pk)
+
+
+@router.get("/cache/stats", response_model=dict[str, int | float])
+async def get_cache_stats() -> dict[str, int | float]:
+    """
+    Hit/miss/eviction counters of this worker's in-process L1 cache.
+    """
+    cache_backend = FastAPICache.get_backend()
+    if isinstance(cache_backend, L1RedisBackend):
+        return cache_backend.stats()
+    return {}
+
+
+@router.get("/stream-producer/stats", response_model=dict[str, int | float])
+async def get_stream_producer_stats() -> dict[str, int | float]:
+    """
+    Batch size, flush latency and backpressure counters of this worker's stream producer.
+    """
+    return stream_producer.stats()
+
+
+@router.get("/streams/stats", response_model=dict)
+async def get_stream_stats() -> dict:
+    """
+    Length, per-group lag, pending entries, oldest pending age and processing rate of the
+    streams inventory consumes (`order_completed`), refreshed every few seconds.
+    """
+    return await stream_monitor.stats()
@@ -1,13 +1,29 @@
 # from fastapi_cache import FastAPICache
+import asyncio
+import contextlib
+import json
+from typing import AsyncIterator
+
 from fastapi_cache.decorator import cache
 from loguru import logger
 
+from inventory.app.db.repository import product_repository
 from inventory.app.models.models import Product, UpdateProduct
+from inventory.app.services.bulk_import import BULK_IMPORT_CHUNK_SIZE, BulkImportReport, ParsedRow, validate_rows
 from inventory.app.services.utils import (
+    PRODUCT_CACHE_EXPIRE,
+    PRODUCTS_PAGE_LIMIT,
+    PRODUCTS_PAGE_MAX_LIMIT,
     clear_cache_by_namespace,
     clear_cache_by_pk,
+    get_products_by_pks,
+    index_catalog_page,
     product_format,
     product_key_builder,
+    product_page,
+    single_flight,
+    stale_while_revalidate,
+    write_through_products,
 )
 
 
@@ -22,14 +38,45 @@ class Service(Product):
         """
         logger.debug("Service initialized")
 
-    @cache(namespace="inventory.products", expire=600)  # Cache for 10 mins
-    async def get_all_products(self) -> list[dict[str, str | float | int]]:
+    @single_flight  # concurrent misses share one loader
+    # Cache for 10 mins, pages are indexed so product updates can patch them in place
+    @stale_while_revalidate(namespace="inventory.products", expire=600, on_store=index_catalog_page)
+    async def get_all_products(
+        self, cursor: int = 0, limit: int = PRODUCTS_PAGE_LIMIT
+    ) -> dict[str, list[dict[str, str | float | int]] | int | bool]:
+        """
+        Get a page of products from the database.
+
+        Each (cursor, limit) pair is cached separately in the `inventory.products` namespace.
+        After an invalidation the previous page is served, flagged `stale`, while it is rebuilt.
+
+        Args:
+            cursor (int): SCAN cursor of the page, 0 for the first page.
+            limit (int): Number of products wanted in the page.
+
+        Returns:
+            dict: `products` in the page, the `next_cursor` (0 when there are no more pages) and
+            `stale` (added by the cache).
         """
-        Get all products from the database
+        # return [result for pk in Product.all_pks() if isinstance((result := await product_format(pk)), dict)]
+        products, next_cursor = await product_page(cursor=cursor, limit=limit)
+        return {"products": products, "next_cursor": next_cursor}
+
+    async def iter_products_snapshot(self) -> AsyncIterator[bytes]:
         """
-        # return Product.all_pks()
-        # return [result for pk in Product.all_pks() if isinstance((result := await self.product_format(pk)), dict)]
-        return [result for pk in Product.all_pks() if isinstance((result := await product_format(pk)), dict)]
+        Stream every product, uncached, as NDJSON lines, one pipelined page of
+        `PRODUCTS_PAGE_MAX_LIMIT` products at a time.
+
+        Used to bootstrap readers of the product change stream: a product changed while the
+        snapshot is being walked may appear twice or with an older state, the stream has the rest.
+        """
+        cursor = 0
+        while True:
+            products, cursor = await product_page(cursor=cursor, limit=PRODUCTS_PAGE_MAX_LIMIT)
+            if products:
+                yield b"".join(json.dumps(product).encode() + b"\n" for product in products)
+            if cursor == 0:
+                return
 
     async def add_product(self, product: Product) -> Product:
         """
@@ -38,14 +85,64 @@ class Service(Product):
         logger.debug(product)
 
         # Save the actual product to Redis
-        product.save()
+        await product_repository.save(product)
 
         # await FastAPICache.clear(namespace="inventory.products")
         await clear_cache_by_namespace(namespace="inventory.products")
 
         return product
 
-    @cache(namespace="inventory.product", key_builder=product_key_builder, expire=600)  # Cache for 10 mins
+    async def bulk_add_products(
+        self, rows: AsyncIterator[ParsedRow], chunk_size: int = BULK_IMPORT_CHUNK_SIZE
+    ) -> BulkImportReport:
+        """
+        Add products from a stream of parsed rows (see `bulk_import.parse_import`).
+
+        Rows are validated and written in chunks of `chunk_size`, so memory stays bounded whatever
+        the size of the import, and the write of a chunk overlaps with parsing the next one. Rows
+        that don't validate are reported and skipped. Caches are invalidated once, at the end.
+        """
+        report = BulkImportReport()
+        chunk: list[ParsedRow] = []
+        writing: asyncio.Task | None = None
+        written = False
+
+        async def flush() -> None:
+            nonlocal writing, written
+            documents = validate_rows(chunk, report)
+            if writing is not None:
+                report.imported += await writing
+                writing = None
+            if documents:
+                writing = asyncio.create_task(product_repository.save_documents(documents))
+                written = True
+
+        try:
+            async for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    await flush()
+                    chunk = []
+            await flush()
+            if writing is not None:
+                report.imported += await writing
+        finally:
+            if writing is not None and not writing.done():
+                # * an aborted import still lets the chunk already sent land, the caches below cover it
+                with contextlib.suppress(Exception):
+                    report.imported += await writing
+            if written:
+                await clear_cache_by_namespace(namespace="inventory.products")
+                if report.overwrites:
+                    await clear_cache_by_namespace(namespace="inventory.product")
+
+        logger.info(f"Bulk import added {report.imported} products, rejected {report.failed} rows")
+        return report
+
+    @single_flight  # concurrent misses share one loader
+    @cache(
+        namespace="inventory.product", key_builder=product_key_builder, expire=PRODUCT_CACHE_EXPIRE
+    )  # Cache for 10 mins
     async def get_product_by_pk(self, pk: str) -> dict[str, str | float | int]:
         """
         Get a product by its primary key (pk).
@@ -55,20 +152,29 @@ class Service(Product):
             return result
         raise TypeError("Expected a dictionary but got a different type.")
 
+    async def get_products_by_pks(self, pks: list[str]) -> dict[str, list]:
+        """
+        Get several products by their primary keys, see `utils.get_products_by_pks`.
+
+        Returns:
+            dict: `products` found, in request order, and the `missing` pks.
+        """
+        products, missing = await get_products_by_pks(pks)
+        return {"products": products, "missing": missing}
+
     async def update_product_by_pk(self, pk: str, update_product: UpdateProduct) -> Product:
         """
         Update a product by its primary key (pk).
-        """
-        product = Product.get(pk)
-        update_data = update_product.model_dump(exclude_unset=True)
 
-        product.update(**update_data)
+        Only the fields present in the request are written, in one atomic script, so the stock
+        taken by orders in the meantime isn't overwritten unless `quantity` is set explicitly.
+        """
+        update_data = update_product.model_dump(mode="json", exclude_unset=True, exclude_none=True)
 
-        product.save()
+        product = await product_repository.update(pk, update_data)
 
-        # await FastAPICache.clear(namespace="inventory.products")
-        await clear_cache_by_pk(pk=pk, namespace="inventory.product")
-        await clear_cache_by_namespace(namespace="inventory.products")
+        # * write-through: the cached product and catalog pages get the new values instead of a miss
+        await write_through_products([product])
 
         return product
 
@@ -76,11 +182,9 @@ class Service(Product):
         """
         Delete a product by its primary key (pk).
         """
-        product = Product.get(pk)
+        product = await product_repository.delete(pk)
         product_dict = product.model_dump()
 
-        Product.delete(product.pk)
-
         # After deleting, clear the cache for this product
         # await FastAPICache.clear(namespace="inventory.products")
         await clear_cache_by_namespace(namespace="inventory.products")
@@ -1,6 +1,4 @@
-from inventory.app.db.redis import get_redis_stream_client
-
-# from payment.app.models.models import Order
+from inventory.app.db.stream_producer import stream_producer
 
 
 class StreamService:
@@ -9,15 +7,14 @@ class StreamService:
     """
 
     @staticmethod
-    def stream_order_refund(obj: dict) -> None:
+    async def stream_order_refund(obj: dict) -> str:
         """
-        Adds a completed order to the Redis stream.
+        Adds an order to refund to the Redis stream, through the shared stream producer.
 
         Args:
-            order (Order): Order object to be added to the stream.
+            obj (dict): Order completed event of the order to refund.
 
         Returns:
-            None
+            str: ID of the refund entry.
         """
-        redis_stream = get_redis_stream_client()
-        redis_stream.xadd(name="refund_order", fields=obj, id="*")
+        return await stream_producer.publish("refund_order", obj)
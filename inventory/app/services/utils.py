@@ -1,15 +1,86 @@
-from typing import Optional
+import asyncio
+import os
+import time
+from functools import partial, wraps
+from typing import Awaitable, Callable, Hashable, Optional, TypeVar
 
-from fastapi_cache import FastAPICache
+from fastapi_cache import FastAPICache, default_key_builder
 from fastapi_cache.backends.redis import RedisBackend
 from loguru import logger
+from redis.commands.core import AsyncScript
+from redis.exceptions import WatchError
 from starlette.requests import Request
 from starlette.responses import Response
 
+from inventory.app.db.l1_cache import L1RedisBackend
+from inventory.app.db.repository import product_repository
 from inventory.app.models.models import Product
 
+T = TypeVar("T")
 
-def product_key_builder(
+# * longest time the catalog keeps being served stale after an invalidation, while it's rebuilt
+CATALOG_MAX_STALE_S = float(os.getenv("CATALOG_MAX_STALE_S", 30))
+
+
+def namespace_version_key(namespace: str) -> str:
+    """
+    Key of the version counter of a cache namespace.
+
+    Args:
+        namespace (str): Full namespace as handed to key builders, i.e. `{prefix}:{namespace}`.
+    """
+    return f"{namespace}:version"
+
+
+def namespace_invalidated_at_key(namespace: str) -> str:
+    """
+    Key holding the wall-clock time of the last invalidation of a cache namespace.
+
+    Args:
+        namespace (str): Full namespace as handed to key builders, i.e. `{prefix}:{namespace}`.
+    """
+    return f"{namespace}:invalidated_at"
+
+
+async def get_namespace_version(namespace: str, fresh: bool = False) -> int:
+    """
+    Current version of a cache namespace, 0 until it is first invalidated.
+
+    Args:
+        namespace (str): Full namespace as handed to key builders, i.e. `{prefix}:{namespace}`.
+        fresh (bool): Read from Redis, bypassing the in-process L1 (used on invalidation paths).
+    """
+    cache_backend = FastAPICache.get_backend()
+    key = namespace_version_key(namespace)
+    if fresh:
+        version = await cache_backend.redis.get(key)  # type: ignore
+    else:
+        version = await cache_backend.get(key)
+        if version is None:
+            # * materialize version 0 so the L1 can hold it, a missing key would be a Redis read every time
+            await cache_backend.redis.set(key, 0, nx=True)  # type: ignore
+    return int(version) if version else 0
+
+
+async def versioned_key_builder(
+    func,
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: tuple,
+    kwargs: dict,
+) -> str:
+    """
+    Default fastapi-cache key builder with the namespace version folded in: `{namespace}:v{version}:{hash}`.
+    """
+    version = await get_namespace_version(namespace)
+    return default_key_builder(
+        func, f"{namespace}:v{version}", request=request, response=response, args=args, kwargs=kwargs
+    )
+
+
+async def product_key_builder(
     func,
     namespace: Optional[str] = "",
     request: Optional[Request] = None,
@@ -24,12 +95,13 @@ def product_key_builder(
     logger.debug(f"key builder Kwargs: {kwargs}")
 
     # Try to find pk in different places
-    pk = kwargs.get("pk")  # Check kwargs
+    pk = kwargs.get("pk") or kwargs.get("kwargs", {}).get("pk")  # Check kwargs
     if not pk and "args" in kwargs and len(kwargs["args"]) > 1:
         pk = kwargs["args"][1]  # Extract from args tuple
 
     if pk:
-        catche_key = f"{namespace}:{pk}"
+        version = await get_namespace_version(namespace or "")
+        catche_key = f"{namespace}:v{version}:{pk}"
         logger.debug(f"Cache key: {catche_key}")
         return catche_key
 
@@ -48,17 +120,31 @@ async def clear_cache_by_namespace(namespace: str) -> None:
         Exception: If an error occurs during the cache clearing process.
 
     Notes:
-        This function uses the FastAPICache library to interact with the cache backend.
-        The cache key is constructed using the prefix and the provided namespace.
+        Cache keys embed the namespace version (see `versioned_key_builder`), so a namespace is
+        invalidated with a single INCR of its version; entries of older versions are never read
+        again and expire through their TTL. Clearing the entire cache still scans and deletes.
     """
     prefix = FastAPICache.get_prefix()
     cache_backend = FastAPICache.get_backend()
 
     if not isinstance(cache_backend, RedisBackend):
-        raise TypeError("Cache backend is not RedisBackend. Pattern clearing only supported for Redis.")
+        raise TypeError("Cache backend is not RedisBackend. Namespace clearing only supported for Redis.")
+
+    if namespace:
+        version_key = namespace_version_key(f"{prefix}:{namespace}")
+        async with cache_backend.redis.pipeline(transaction=True) as pipe:  # type: ignore
+            pipe.incr(version_key)
+            # read by stale_while_revalidate to bound how long the previous version is served
+            pipe.set(namespace_invalidated_at_key(f"{prefix}:{namespace}"), time.time())
+            version, _ = await pipe.execute()
+        if isinstance(cache_backend, L1RedisBackend):
+            # every worker drops its in-memory copy of the old version
+            await cache_backend.invalidate(version_key)
+        logger.debug(f"Cleared cache namespace {namespace}, now at version {version}")
+        return
 
-    # Construct pattern based on prefix and namespace
-    pattern = f"{prefix}:{namespace}*"
+    # Construct pattern based on prefix
+    pattern = f"{prefix}:*"
 
     logger.debug(f"Clearing cache with pattern: {pattern}")
 
@@ -67,6 +153,9 @@ async def clear_cache_by_namespace(namespace: str) -> None:
         logger.debug(f"Deleting cache key: {key}")
         await cache_backend.redis.delete(key)  # type: ignore
 
+    if isinstance(cache_backend, L1RedisBackend):
+        await cache_backend.invalidate_all()
+
 
 async def clear_cache_by_pk(pk: str, namespace: str = "") -> None:
     """
@@ -78,18 +167,187 @@ async def clear_cache_by_pk(pk: str, namespace: str = "") -> None:
     if namespace == "":
         cache_key = f"{prefix}:{pk}"
     else:
-        cache_key = f"{prefix}:{namespace}:{pk}"
+        version = await get_namespace_version(f"{prefix}:{namespace}", fresh=True)
+        cache_key = f"{prefix}:{namespace}:v{version}:{pk}"
 
     logger.debug(f"Clearing cache for key: {cache_key}")
 
     # https://github.com/long2ice/fastapi-cache/blob/main/fastapi_cache/backends/redis.py
+    # L1RedisBackend.clear also evicts the key from every worker's in-process cache
     await cache_backend.clear(key=cache_key)
 
 
-# @cache(namespace="inventory.product", expire=120)  # Cache for 2 mins
-async def product_format(pk: str) -> dict[str, str | float | int]:
-    product = Product.get(pk)
+def single_flight(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Deduplicate concurrent calls of an async method with the same arguments (`self` excluded).
+
+    The first call starts the work as a task, concurrent callers await that same task instead
+    of starting their own. Wrapped around a `@cache` decorated method, concurrent misses on a
+    key run one loader and only that loader writes the cache entry. The task is shielded, so a
+    cancelled caller (e.g. a disconnected client) doesn't cancel it for the others.
+    """
+    in_flight: dict[Hashable, asyncio.Task] = {}
+
+    def _done(key: Hashable, task: asyncio.Task) -> None:
+        in_flight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    @wraps(func)
+    async def inner(*args, **kwargs) -> T:
+        key = (args[1:], frozenset(kwargs.items()))
+        task = in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            in_flight[key] = task
+            task.add_done_callback(partial(_done, key))
+        else:
+            logger.debug(f"Joining in-flight {func.__name__} call for {key}")
+        return await asyncio.shield(task)
+
+    return inner
 
+
+# KEYS[1] stale copy, KEYS[2] first invalidation seen after it was built
+# ARGV[1] encoded copy, ARGV[2] TTL, ARGV[3] time the rebuild started
+# * an invalidation that arrived while the rebuild ran isn't covered by it, its marker is kept
+STORE_STALE_COPY_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+local first_invalidated_at = redis.call('GET', KEYS[2])
+if first_invalidated_at and tonumber(first_invalidated_at) <= tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[2])
+end
+return 1
+"""
+
+
+def stale_while_revalidate(
+    namespace: str,
+    expire: int,
+    max_stale: float = CATALOG_MAX_STALE_S,
+    on_store: Optional[Callable[[str, dict, int], Awaitable[None]]] = None,
+):
+    """
+    Cache an async method returning a dict, serving the previous result while it is rebuilt.
+
+    Fresh entries are stored like `@cache` does, under the versioned key of `namespace`. Every
+    rebuild also stores the result under an unversioned "stale" key. On a miss, the stale copy
+    is returned (with `"stale": True`) when it went stale, through invalidation or expiry, at
+    most `max_stale` seconds ago. The window starts at the first invalidation after the copy was
+    built, later invalidations don't extend it. A single background task rebuilds the entry,
+    serialized across workers with a Redis lock. Past that window, or without a stale copy, the
+    caller rebuilds synchronously. Every result carries a `"stale"` flag.
+
+    Args:
+        namespace (str): Cache namespace, invalidated with `clear_cache_by_namespace`.
+        expire (int): TTL of fresh entries in seconds.
+        max_stale (float): Longest time in seconds a stale result is served.
+        on_store (Optional[Callable[[str, dict, int], Awaitable[None]]]): Called with the key, the
+            result and `expire` after a fresh result is stored, e.g. `index_catalog_page`.
+    """
+
+    def wrapper(func: Callable[..., Awaitable[dict]]) -> Callable[..., Awaitable[dict]]:
+        rebuilding: dict[str, asyncio.Task] = {}
+
+        async def rebuild(key: str, stale_key: str, args: tuple, kwargs: dict) -> dict:
+            # * the result reflects the data as of when it started, an invalidation during the build makes it stale
+            started_at = time.time()
+            result = await func(*args, **kwargs)
+
+            coder = FastAPICache.get_coder()
+            cache_backend = FastAPICache.get_backend()
+            try:
+                await cache_backend.set(key, coder.encode(result), expire)
+                await cache_script(STORE_STALE_COPY_SCRIPT)(
+                    keys=[stale_key, f"{stale_key}:invalidated_at"],
+                    args=[
+                        coder.encode({"built_at": started_at, "value": result}),
+                        expire + int(max_stale),
+                        started_at,
+                    ],
+                )
+                if on_store is not None:
+                    await on_store(key, result, expire)
+            except Exception:
+                logger.exception(f"Error setting cache key '{key}' in backend")
+            return result
+
+        async def rebuild_in_background(key: str, stale_key: str, args: tuple, kwargs: dict) -> None:
+            cache_backend = FastAPICache.get_backend()
+            lock_key = f"{key}:rebuilding"
+            try:
+                # * one rebuild across all workers, the lock expires if the worker dies
+                if await cache_backend.redis.set(lock_key, 1, nx=True, ex=int(max_stale) or 1):  # type: ignore
+                    try:
+                        await rebuild(key, stale_key, args, kwargs)
+                    finally:
+                        await cache_backend.redis.delete(lock_key)  # type: ignore
+            except Exception:
+                logger.exception(f"Background rebuild of '{key}' failed")
+            finally:
+                rebuilding.pop(key, None)
+
+        @wraps(func)
+        async def inner(*args, **kwargs) -> dict:
+            full_namespace = f"{FastAPICache.get_prefix()}:{namespace}"
+            coder = FastAPICache.get_coder()
+            cache_backend = FastAPICache.get_backend()
+
+            key = await versioned_key_builder(func, full_namespace, args=args, kwargs=kwargs)
+            try:
+                cached = await cache_backend.get(key)
+            except Exception:
+                logger.warning(f"Error retrieving cache key '{key}' from backend", exc_info=True)
+                cached = None
+            if cached is not None:
+                return {**coder.decode(cached), "stale": False}
+
+            stale_key = default_key_builder(func, f"{full_namespace}:stale", args=args, kwargs=kwargs)
+            # first invalidation seen after the stale copy was built, later ones don't extend the window
+            first_invalidated_key = f"{stale_key}:invalidated_at"
+            async with cache_backend.redis.pipeline(transaction=False) as pipe:  # type: ignore
+                pipe.get(stale_key)
+                pipe.get(namespace_invalidated_at_key(full_namespace))
+                pipe.get(first_invalidated_key)
+                stale, invalidated_at, first_invalidated_at = await pipe.execute()
+
+            if stale is not None:
+                stale = coder.decode(stale)
+                # stale since the namespace was first invalidated after the build, or since the entry expired
+                built_at = stale["built_at"]
+                invalidated_at = float(invalidated_at or 0)
+                if invalidated_at > built_at:
+                    if first_invalidated_at is None or float(first_invalidated_at) < built_at:
+                        await cache_backend.redis.set(  # type: ignore
+                            first_invalidated_key, invalidated_at, ex=expire + int(max_stale)
+                        )
+                        first_invalidated_at = invalidated_at
+                    stale_since = float(first_invalidated_at)
+                else:
+                    stale_since = built_at + expire
+
+                if time.time() - stale_since <= max_stale:
+                    if key not in rebuilding:
+                        rebuilding[key] = asyncio.create_task(rebuild_in_background(key, stale_key, args, kwargs))
+                    logger.debug(f"Serving stale '{stale_key}' while '{key}' is rebuilt")
+                    return {**stale["value"], "stale": True}
+
+            return {**await rebuild(key, stale_key, args, kwargs), "stale": False}
+
+        return inner
+
+    return wrapper
+
+
+# * default and upper bound for GET /inventory/products page size
+PRODUCTS_PAGE_LIMIT = 100
+PRODUCTS_PAGE_MAX_LIMIT = 1000
+
+
+def format_product(product: Product) -> dict[str, str | float | int]:
+    """
+    Format a product into the dict shape served by the inventory routes.
+    """
     return {
         "id": product.pk if product.pk else "not found",
         "name": product.name,
@@ -97,3 +355,278 @@ async def product_format(pk: str) -> dict[str, str | float | int]:
         "quantity": product.quantity,
         "creation_time": product.creation_time,
     }
+
+
+# @cache(namespace="inventory.product", expire=120)  # Cache for 2 mins
+async def product_format(pk: str) -> dict[str, str | float | int]:
+    product = await product_repository.get(pk)
+
+    return format_product(product)
+
+
+async def product_page(
+    cursor: int = 0, limit: int = PRODUCTS_PAGE_LIMIT
+) -> tuple[list[dict[str, str | float | int]], int]:
+    """
+    Fetch one formatted page of products, see `ProductRepository.page`.
+
+    Args:
+        cursor (int): SCAN cursor returned by the previous page, 0 to start from the beginning.
+        limit (int): Number of products wanted in the page.
+
+    Returns:
+        tuple[list[dict[str, str | float | int]], int]: Formatted products and the cursor for
+        the next page (0 once the whole catalog has been walked).
+    """
+    products, next_cursor = await product_repository.page(cursor=cursor, limit=limit)
+    return [format_product(product) for product in products], next_cursor
+
+
+# * TTL of `inventory.product` entries, shared by `@cache` and the write-through path
+PRODUCT_CACHE_EXPIRE = 600
+
+# KEYS[1] product hash, KEYS[2] product cache entry
+# ARGV[1] encoded entry, ARGV[2] TTL, ARGV[3..5] name, price and quantity it was formatted from
+# * the entry is only written if the hash still holds those values, so a write-through racing
+# with a newer write to the product can't put an outdated entry back; the entry is deleted instead
+WRITE_THROUGH_PRODUCT_SCRIPT = """
+local current = redis.call('HMGET', KEYS[1], 'name', 'price', 'quantity')
+if current[1] == ARGV[3] and tonumber(current[2]) == tonumber(ARGV[4])
+    and tonumber(current[3]) == tonumber(ARGV[5]) then
+    redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+redis.call('DEL', KEYS[2])
+return 0
+"""
+
+# KEYS[1] catalog page index of a namespace version, ARGV[1] page key, ARGV[2] TTL, ARGV[3..] pks in the page
+# * a pk held by more than one cached page is marked '*', such pages can't be patched in place
+INDEX_CATALOG_PAGE_SCRIPT = """
+for i = 3, #ARGV do
+    local current = redis.call('HGET', KEYS[1], ARGV[i])
+    if not current then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[1])
+    elseif current ~= ARGV[1] then
+        redis.call('HSET', KEYS[1], ARGV[i], '*')
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+CATALOG_PATCH_RETRIES = 3
+
+# * registered once per script like `ProductRepository`'s, EVALSHA falling back to EVAL if the script cache was flushed
+_cache_scripts: dict[str, AsyncScript] = {}
+
+
+def cache_script(source: str) -> AsyncScript:
+    """
+    Script on the cache backend's Redis client, registered again only if the backend was replaced.
+    """
+    client = FastAPICache.get_backend().redis  # type: ignore
+    script = _cache_scripts.get(source)
+    if script is None or script.registered_client is not client:
+        script = _cache_scripts[source] = client.register_script(source)
+    return script
+
+
+def catalog_page_index_key(page_key: str) -> str:
+    """
+    Key of the hash mapping product pks to the cached catalog page holding them, one per namespace version.
+
+    Args:
+        page_key (str): Versioned key of a cached page, `{prefix}:{namespace}:v{version}:{hash}`.
+    """
+    return f"{page_key.rsplit(':', 1)[0]}:index"
+
+
+async def index_catalog_page(page_key: str, page: dict, expire: int) -> None:
+    """
+    Record which products a cached catalog page holds, so `patch_catalog_products` can find it.
+    """
+    pks = [product["id"] for product in page["products"]]
+    if not pks:
+        return
+    await cache_script(INDEX_CATALOG_PAGE_SCRIPT)(
+        keys=[catalog_page_index_key(page_key)], args=[page_key, expire, *pks]
+    )
+
+
+def _matches_document(product: dict, document: list) -> bool:
+    name, price, quantity = document
+    return (
+        name == product["name"]
+        and price is not None
+        and float(price) == product["price"]
+        and quantity is not None
+        and int(quantity) == product["quantity"]
+    )
+
+
+async def _patch_catalog_page(page_key: str, products: dict[str, dict]) -> bytes | None:
+    """
+    Replace products in one cached catalog page, keeping its TTL. Returns the new encoded page,
+    `None` if the page is gone, a product changed again since it was formatted, or the page
+    kept changing under us.
+    """
+    coder = FastAPICache.get_coder()
+    cache_backend = FastAPICache.get_backend()
+    product_keys = [product_repository.key(pk) for pk in products]
+
+    async with cache_backend.redis.pipeline(transaction=True) as pipe:  # type: ignore
+        for _ in range(CATALOG_PATCH_RETRIES):
+            try:
+                # * the product hashes are watched too, a newer write must not be overwritten by ours
+                await pipe.watch(page_key, *product_keys)
+                cached = await pipe.get(page_key)
+                if cached is None:
+                    return None
+                for product, product_key in zip(products.values(), product_keys):
+                    if not _matches_document(product, await pipe.hmget(product_key, "name", "price", "quantity")):
+                        return None
+
+                page = coder.decode(cached)
+                page["products"] = [products.get(product["id"], product) for product in page["products"]]
+                encoded = coder.encode(page)
+                pipe.multi()
+                pipe.set(page_key, encoded, keepttl=True)
+                await pipe.execute()
+                return encoded
+            except WatchError:
+                logger.debug(f"Catalog page '{page_key}' changed while patching, retrying")
+    return None
+
+
+async def patch_catalog_products(products: list[dict[str, str | float | int]]) -> bool:
+    """
+    Patch formatted products in place in the cached catalog pages of the current version.
+
+    Returns:
+        bool: False if some product couldn't be patched (not indexed, held by several pages,
+        page expired or contended); the caller should then invalidate the catalog.
+    """
+    prefix = FastAPICache.get_prefix()
+    cache_backend = FastAPICache.get_backend()
+
+    full_namespace = f"{prefix}:inventory.products"
+    version = await get_namespace_version(full_namespace, fresh=True)
+    index_key = f"{full_namespace}:v{version}:index"
+    page_keys = await cache_backend.redis.hmget(index_key, [product["id"] for product in products])  # type: ignore
+
+    pages: dict[str, dict[str, dict]] = {}
+    for product, page_key in zip(products, page_keys):
+        if page_key is None or page_key == "*":
+            return False
+        pages.setdefault(page_key, {})[product["id"]] = product  # type: ignore[index]
+
+    patched: dict[str, bytes | None] = {}
+    for page_key, page_products in pages.items():
+        encoded = await _patch_catalog_page(page_key, page_products)
+        if encoded is None:
+            return False
+        patched[page_key] = encoded
+
+    if isinstance(cache_backend, L1RedisBackend):
+        await cache_backend.publish_writes(patched)
+    return True
+
+
+def product_cache_key(pk: str, version: int) -> str:
+    """
+    Key of the `inventory.product` entry of a product, as built by `product_key_builder`.
+    """
+    return f"{FastAPICache.get_prefix()}:inventory.product:v{version}:{pk}"
+
+
+async def store_product_entries(products: list[Product], version: int) -> dict[str, bytes | None]:
+    """
+    Write the `inventory.product` entries of products with `WRITE_THROUGH_PRODUCT_SCRIPT`, pipelined.
+
+    Returns:
+        dict[str, bytes | None]: Encoded entry by cache key, `None` where the product changed
+        again since it was read and the entry was deleted instead.
+    """
+    coder = FastAPICache.get_coder()
+    cache_backend = FastAPICache.get_backend()
+
+    entries = {product_cache_key(product.pk, version): coder.encode(format_product(product)) for product in products}
+    script = cache_script(WRITE_THROUGH_PRODUCT_SCRIPT)
+    async with cache_backend.redis.pipeline(transaction=False) as pipe:  # type: ignore
+        for product, (cache_key, encoded) in zip(products, entries.items()):
+            await script(
+                keys=[product_repository.key(product.pk), cache_key],
+                args=[encoded, PRODUCT_CACHE_EXPIRE, product.name, product.price, product.quantity],
+                client=pipe,
+            )
+        written = await pipe.execute()
+
+    return {cache_key: encoded if ok else None for (cache_key, encoded), ok in zip(entries.items(), written)}
+
+
+async def write_through_products(products: list[Product]) -> None:
+    """
+    Replace the cache entries of freshly written products instead of deleting them.
+
+    Each `inventory.product` entry is overwritten with the formatted product, unless the product
+    changed again in the meantime (see `WRITE_THROUGH_PRODUCT_SCRIPT`). The products are then
+    patched in the cached catalog pages, the catalog namespace is only invalidated when that
+    isn't possible.
+
+    Args:
+        products (list[Product]): Products as just written to Redis.
+    """
+    if not products:
+        return
+
+    prefix = FastAPICache.get_prefix()
+    cache_backend = FastAPICache.get_backend()
+
+    version = await get_namespace_version(f"{prefix}:inventory.product", fresh=True)
+    entries = await store_product_entries(products, version)
+    if isinstance(cache_backend, L1RedisBackend):
+        await cache_backend.publish_writes(entries, expire=PRODUCT_CACHE_EXPIRE)
+
+    # * an entry that wasn't written means the product changed again, don't patch outdated values in
+    if None in entries.values() or not await patch_catalog_products([format_product(product) for product in products]):
+        await clear_cache_by_namespace(namespace="inventory.products")
+
+
+async def get_products_by_pks(pks: list[str]) -> tuple[list[dict[str, str | float | int]], list[str]]:
+    """
+    Look up several products through the `inventory.product` cache.
+
+    Cached entries are read with one MGET (after the in-process L1), the misses are fetched
+    from Redis with one pipeline and written back to the cache.
+
+    Args:
+        pks (list[str]): Primary keys, duplicates are looked up once.
+
+    Returns:
+        tuple[list[dict[str, str | float | int]], list[str]]: Formatted products found, in the
+        order of `pks`, and the pks that don't exist.
+    """
+    pks = list(dict.fromkeys(pks))
+    prefix = FastAPICache.get_prefix()
+    coder = FastAPICache.get_coder()
+    cache_backend = FastAPICache.get_backend()
+
+    version = await get_namespace_version(f"{prefix}:inventory.product")
+    keys = [product_cache_key(pk, version) for pk in pks]
+    if isinstance(cache_backend, L1RedisBackend):
+        cached = await cache_backend.get_many(keys)
+    else:
+        cached = await cache_backend.redis.mget(keys)  # type: ignore
+
+    found = {pk: coder.decode(value) for pk, value in zip(pks, cached) if value is not None}
+    misses = [pk for pk in pks if pk not in found]
+    if misses:
+        generation = cache_backend.generation if isinstance(cache_backend, L1RedisBackend) else 0
+        products = [product for product in await product_repository.get_many(misses) if product is not None]
+        entries = await store_product_entries(products, version)
+        if isinstance(cache_backend, L1RedisBackend):
+            # * a fill, not a change: other workers' copies are still valid, nothing to publish
+            cache_backend.fill(entries, PRODUCT_CACHE_EXPIRE, generation)
+        found.update((product.pk, format_product(product)) for product in products)  # type: ignore[misc]
+
+    return [found[pk] for pk in pks if pk in found], [pk for pk in pks if pk not in found]
@@ -1,70 +1,61 @@
-import asyncio
-
-import redis
 from loguru import logger
 
-from payment.app.db.postgresql import get_db
-from payment.app.db.redis_stream import get_redis_stream_client
+from payment.app.db.postgresql import async_session_factory
+from payment.app.db.redis_stream import get_redis_async_client
+from payment.app.db.stream_runtime import StreamConsumer, StreamEntry, run_workers
 from payment.app.services.service import OrderService
 
 
-async def consume_order_refund(redis_stream_client: redis.client.Redis, key: str, group: str, block_: int = 3000):
-    """
-    Continuously listens to the Redis stream for refund order events.
+async def consume_order_refund(entries: list[StreamEntry]) -> list[str]:
     """
-    # Product.set_meta_attr(redis_stream_client, global_key_prefix="fastcart", model_key_prefix="inventory.Product")
-    while True:
-        try:
-            # * Read new messages from Redis stream (blocking for 5 sec if no messages)
-            messages = redis_stream_client.xreadgroup(group, key, {key: ">"}, block=block_)
-            logger.info(f"Received messages: {messages}")
-
-            # for stream, message_list in messages:
-            #     for message_id, message_data in message_list:
-            #         logger.info(f"Received order completed event: {message_data}")
-            # Process the message (e.g., update inventory, trigger further workflows)
-
-            if messages != []:
-                for message in messages:
-                    obj = message[1][0][1]
-
-                    async for session in get_db():
-                        order = await OrderService.get_order(int(obj["order_id"]), session)
-
-                        if order:
-                            logger.info(f"Fetched order from sql db: {order}")
+    Marks the orders of a batch of refund events as refunded.
 
-                            order.status = "refunded"
+    The whole batch is applied with one guarded `UPDATE ... RETURNING` in a single transaction
+    (see `OrderService.transition_orders`). If it fails, nothing is acknowledged and the batch
+    is reclaimed and retried; redelivered refunds of already refunded orders are no-ops.
 
-                            await session.commit()
-                            await session.refresh(order)
-
-                            logger.success(f"Order with ID {obj['order_id']} refunded successfully.")
-                        else:
-                            logger.warning(f"Order with ID {obj['order_id']} not found in the database.")
+    Returns:
+        list[str]: IDs of the entries that were handled and can be acknowledged.
+    """
+    ack_ids = []
+    entry_ids: dict[int, list[str]] = {}
+    for entry_id, obj in entries:
+        try:
+            entry_ids.setdefault(int(obj["order_id"]), []).append(entry_id)
+        except (KeyError, ValueError):
+            # * malformed event, retrying won't help
+            logger.error(f"Dropping malformed refund event {entry_id}: {obj}")
+            ack_ids.append(entry_id)
 
-        except Exception as e:
-            logger.exception(f"Error consuming Redis stream: {e}")
+    if entry_ids:
+        async with async_session_factory() as session:
+            orders = await OrderService.transition_orders(list(entry_ids), "completed", "refunded", session)
 
-        await asyncio.sleep(1)  # Prevent busy-waiting
+        refunded = {order.order_id for order in orders}
+        skipped = sorted(set(entry_ids) - refunded)  # type: ignore[operator]
+        logger.success(f"Refunded {len(refunded)} orders from a batch of {len(entries)} refund events.")
+        if skipped:
+            logger.warning(f"Orders not found or not completed, left as is: {skipped}")
+        ack_ids.extend(entry_id for ids in entry_ids.values() for entry_id in ids)
 
+    return ack_ids
 
-# * Initialize Redis OM client for data operations
-redis_stream_client = get_redis_stream_client()
-# logger.debug(f"Redis client used in consumer: {redis_stream_client.connection_pool.connection_kwargs}")
 
 key = "refund_order"
 group = "payment_group"
 
-try:
-    redis_stream_client.xgroup_create(key, group)
-except redis.exceptions.RedisError as e:
-    logger.info(f"Group '{group}' already exists for stream '{key}'. Error: {e}")
+
+def build_consumer(stream: str, consumer: str) -> StreamConsumer:
+    """
+    Consumer of the `refund_order` stream for one worker.
+    """
+    return StreamConsumer(get_redis_async_client(), stream, group, consume_order_refund, consumer=consumer)
 
 
-async def consume():
-    await consume_order_refund(redis_stream_client, key, group)
+def consume():
+    # refunds of different orders are independent, every worker competes on the single stream
+    run_workers(build_consumer, [key], ordered=False)
 
 
 if __name__ == "__main__":
-    asyncio.run(consume())
+    consume()
@@ -0,0 +1,52 @@
+import os
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+load_dotenv()
+
+# * zone the naive ISO strings of the old `created_at` column were written in (datetime.now() of the API host)
+ORDERS_LEGACY_TIMEZONE = os.getenv("ORDERS_LEGACY_TIMEZONE", "UTC")
+
+# indexes replaced by the (status, created_at) / (product_id, created_at) composites
+LEGACY_ORDER_INDEXES = ("ix_order_product_id",)
+
+
+async def migrate_order_created_at(conn: AsyncConnection) -> None:
+    """
+    Bring an `order` table created before `created_at` became a native timestamp up to date.
+
+    Idempotent, runs after `create_all` on every startup: converts the ISO string column to
+    `timestamptz` (reading the strings as `ORDERS_LEGACY_TIMEZONE` local time), creates the
+    composite indexes `create_all` skips on existing tables and drops the index they replace.
+    The conversion rewrites the table under an exclusive lock, plan a maintenance window for
+    large tables.
+    """
+    data_type = (
+        await conn.execute(
+            text(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'order' AND column_name = 'created_at'"
+            )
+        )
+    ).scalar_one_or_none()
+
+    if data_type in ("character varying", "text"):
+        timezone = ZoneInfo(ORDERS_LEGACY_TIMEZONE).key  # * validates the zone before it goes into the DDL
+        logger.warning(f"Converting order.created_at to timestamptz, reading existing values as {timezone}")
+        await conn.execute(
+            text(
+                'ALTER TABLE "order" ALTER COLUMN created_at TYPE timestamptz '
+                f"USING created_at::timestamp AT TIME ZONE '{timezone}'"
+            )
+        )
+
+    await conn.execute(text('CREATE INDEX IF NOT EXISTS ix_order_status_created_at ON "order" (status, created_at)'))
+    await conn.execute(
+        text('CREATE INDEX IF NOT EXISTS ix_order_product_id_created_at ON "order" (product_id, created_at)')
+    )
+    for index in LEGACY_ORDER_INDEXES:
+        await conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
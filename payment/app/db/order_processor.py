@@ -0,0 +1,91 @@
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from loguru import logger
+
+from payment.app.db.redis_stream import get_redis_async_client
+from payment.app.db.stream_runtime import StreamConsumer, StreamEntry, run_workers
+from payment.app.services.process_service import ProcessService
+from payment.app.services.stream_service import ORDER_PROCESSING_STREAM
+
+load_dotenv()
+
+# * orders processed at once per process; each holds a DB session only for its status update
+ORDER_PROCESSING_CONCURRENCY = int(os.getenv("ORDER_PROCESSING_CONCURRENCY", 10))
+
+_slots: asyncio.Semaphore | None = None
+
+
+def processing_slots() -> asyncio.Semaphore:
+    """
+    Process wide limit on concurrent order processing jobs, shared by every worker.
+    """
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(ORDER_PROCESSING_CONCURRENCY)
+    return _slots
+
+
+async def process_order_job(entry_id: str, obj: dict) -> bool:
+    """
+    Runs one order processing job within the concurrency limit.
+
+    Returns:
+        bool: Whether the entry can be acknowledged.
+    """
+    try:
+        order_id = int(obj["order_id"])
+    except (KeyError, ValueError):
+        # * malformed job, retrying won't help
+        logger.error(f"Dropping malformed order processing job {entry_id}: {obj}")
+        return True
+
+    async with processing_slots():
+        try:
+            await ProcessService.process_order(order_id)
+            return True
+        except Exception as e:
+            # * left pending, reclaimed and retried once idle for STREAM_RECLAIM_IDLE_MS
+            logger.exception(f"Error processing order {order_id} ({entry_id}): {e}")
+            return False
+
+
+async def consume_order_processing(entries: list[StreamEntry]) -> list[str]:
+    """
+    Processes a batch of queued orders concurrently, up to `ORDER_PROCESSING_CONCURRENCY` at a time.
+
+    Returns:
+        list[str]: IDs of the entries that were handled and can be acknowledged.
+    """
+    done = await asyncio.gather(*(process_order_job(entry_id, obj) for entry_id, obj in entries))
+    return [entry_id for (entry_id, _), ok in zip(entries, done) if ok]
+
+
+group = "payment_processors"
+
+
+def build_consumer(stream: str, consumer: str) -> StreamConsumer:
+    """
+    Consumer of the `order_processing` stream for one worker.
+
+    A worker reads no more jobs than the process can run at once, so queued orders stay in
+    the stream (and available to other workers) instead of waiting in this one.
+    """
+    return StreamConsumer(
+        get_redis_async_client(),
+        stream,
+        group,
+        consume_order_processing,
+        consumer=consumer,
+        batch_size=ORDER_PROCESSING_CONCURRENCY,
+    )
+
+
+def consume():
+    # orders are independent, every worker competes on the single stream
+    run_workers(build_consumer, [ORDER_PROCESSING_STREAM], ordered=False)
+
+
+if __name__ == "__main__":
+    consume()
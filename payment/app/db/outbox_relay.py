@@ -0,0 +1,144 @@
+import asyncio
+import os
+from datetime import timedelta
+
+import redis.asyncio
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy import ARRAY, BigInteger, any_, bindparam, delete, func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from payment.app.db.postgresql import async_session_factory
+from payment.app.db.redis_stream import get_redis_async_client
+from payment.app.models.models import OrderOutbox
+
+load_dotenv()
+
+# * events published per transaction, with one pipelined round trip of XADDs
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+# wait between polls once the outbox is drained
+OUTBOX_POLL_INTERVAL_S = float(os.getenv("OUTBOX_POLL_INTERVAL_S", 0.2))
+OUTBOX_ERROR_BACKOFF_S = float(os.getenv("OUTBOX_ERROR_BACKOFF_S", 1))
+# published rows are kept this long, then purged
+OUTBOX_RETENTION_S = float(os.getenv("OUTBOX_RETENTION_S", 24 * 3600))
+OUTBOX_PURGE_INTERVAL_S = float(os.getenv("OUTBOX_PURGE_INTERVAL_S", 600))
+
+
+class OutboxRelay:
+    """
+    Publishes the events of the `order_outbox` table to their Redis streams.
+
+    Each batch is claimed with `SELECT ... FOR UPDATE SKIP LOCKED` (several relays, one per
+    payment worker, share the table without publishing a row twice), sent with a single
+    pipelined round trip of XADDs and marked published in the same transaction. A batch that
+    fails to publish is rolled back and retried, and one published just before a failed commit
+    (or a crash) is published again: delivery is at least once. Consumers are idempotent per
+    order, the inventory consumer takes stock once per `order_id` (`DECREMENT_QUANTITY_SCRIPT`)
+    and order transitions skip orders already in the target status. Every entry also carries
+    its `outbox_id`.
+    """
+
+    def __init__(
+        self,
+        session_factory=async_session_factory,
+        redis_client: redis.asyncio.Redis | None = None,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+    ) -> None:
+        self.session_factory = session_factory
+        self._redis = redis_client
+        self.batch_size = batch_size
+        self.published = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def redis(self) -> redis.asyncio.Redis:
+        if self._redis is None:
+            self._redis = get_redis_async_client()
+        return self._redis
+
+    @staticmethod
+    async def claim_batch(session: AsyncSession, limit: int) -> list[OrderOutbox]:
+        """
+        Lock the oldest unpublished events not already locked by another relay.
+        """
+        statement = (
+            select(OrderOutbox)
+            .where(OrderOutbox.published_at.is_(None))  # type: ignore[union-attr]
+            .order_by(OrderOutbox.id)  # type: ignore[arg-type]
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list((await session.exec(statement)).all())
+
+    @staticmethod
+    async def mark_published(session: AsyncSession, ids: list[int]) -> None:
+        await session.execute(
+            update(OrderOutbox)
+            .where(OrderOutbox.id == any_(bindparam("ids", ids, type_=ARRAY(BigInteger))))  # type: ignore[arg-type]
+            .values(published_at=func.now())
+        )
+
+    async def relay_batch(self) -> int:
+        """
+        Publish one batch of events. Returns the number of events published.
+        """
+        async with self.session_factory() as session:
+            events = await self.claim_batch(session, self.batch_size)
+            if not events:
+                return 0
+
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for event in events:
+                    pipe.xadd(event.stream, {**event.payload, "outbox_id": event.id}, id="*")
+                await pipe.execute()
+
+            await self.mark_published(session, [event.id for event in events])  # type: ignore[misc]
+            await session.commit()
+
+        self.published += len(events)
+        return len(events)
+
+    async def purge(self) -> None:
+        """
+        Delete events published more than `OUTBOX_RETENTION_S` ago.
+        """
+        cutoff = func.now() - timedelta(seconds=OUTBOX_RETENTION_S)
+        async with self.session_factory() as session:
+            published_before = OrderOutbox.published_at < cutoff  # type: ignore[operator]
+            await session.execute(delete(OrderOutbox).where(published_before))
+            await session.commit()
+
+    async def run(self) -> None:
+        """
+        Relay events until cancelled, without waiting between batches while there is a backlog.
+        """
+        next_purge = 0.0
+        while True:
+            try:
+                if asyncio.get_running_loop().time() >= next_purge:
+                    next_purge = asyncio.get_running_loop().time() + OUTBOX_PURGE_INTERVAL_S
+                    await self.purge()
+                if await self.relay_batch() < self.batch_size:
+                    await asyncio.sleep(OUTBOX_POLL_INTERVAL_S)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Outbox relay failed, retrying: {e}")
+                await asyncio.sleep(OUTBOX_ERROR_BACKOFF_S)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+outbox_relay = OutboxRelay()
@@ -1,14 +1,19 @@
 import importlib
 import os
 import pkgutil
+import time
 from typing import Annotated, AsyncGenerator
 
 from dotenv import load_dotenv
 from fastapi import Depends
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from payment.app.db.migrations import migrate_order_created_at
+from payment.app.middleware.metrics import REGISTRY, CallbackMetric, Histogram
+
 # from payment.app.models.models import Order
 # * used dynamic import instead
 from payment.app.models import models  # noqa: F401
@@ -28,6 +33,9 @@ POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
 # weirdly .env stores/reads int as str
 POSTGRES_PORT = int(os.getenv("POSTGRES_PORT", 5432))
 POSTGRES_DATABASE = os.getenv("POSTGRES_DATABASE", "postgres")
+# * connections per process: requests and order processing jobs wait for a free one beyond this
+POSTGRES_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", 10))
+POSTGRES_MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW", 5))
 
 # url --> postgresql://{username}:{password}@{host}:{port}/{database}
 
@@ -41,7 +49,44 @@ URL_ASYNC_DATABASE = (
     f"postgresql+asyncpg://{POSTGRES_USERNAME}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DATABASE}"
 )
 
-async_engine = create_async_engine(URL_ASYNC_DATABASE, echo=True)
+DB_POOL_CHECKOUT_WAIT: Histogram = REGISTRY.register(
+    Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the SQLAlchemy pool")
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async engine pool recording how long every checkout waited for a connection (including connecting).
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+async_engine = create_async_engine(
+    URL_ASYNC_DATABASE,
+    echo=True,
+    poolclass=InstrumentedQueuePool,
+    pool_size=POSTGRES_POOL_SIZE,
+    max_overflow=POSTGRES_MAX_OVERFLOW,
+)
+
+
+def pool_connections() -> dict[tuple[str, ...], float]:
+    pool: InstrumentedQueuePool = async_engine.pool  # type: ignore[assignment]
+    return {("checked_out",): pool.checkedout(), ("idle",): pool.checkedin()}
+
+
+REGISTRY.register(
+    CallbackMetric("db_pool_connections", "Connections of the SQLAlchemy pool", "gauge", ("state",), pool_connections)
+)
+
+# * short-lived sessions for work outside a request (order processing jobs, stream consumers)
+async_session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
 
 
 def import_models():
@@ -80,6 +125,8 @@ async def create_db_and_tables() -> None:
     async with async_engine.begin() as conn:
         # Create the database if it doesn't exist
         await conn.run_sync(SQLModel.metadata.create_all)
+        # * tables created by an older version of the models don't get new columns types / indexes from create_all
+        await migrate_order_created_at(conn)
 
 
 def get_session():
@@ -98,7 +145,7 @@ def get_session():
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSession(async_engine) as session:
+    async with async_session_factory() as session:
         yield session
 
 
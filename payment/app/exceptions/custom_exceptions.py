@@ -22,3 +22,52 @@ class CustomNotFoundException(HTTPException):
         }
 
         super().__init__(status_code=404, detail=detail)
+
+
+class InventoryUnavailableException(HTTPException):
+    """
+    Exception raised when the inventory service can't be reached or keeps failing.
+
+    Attributes:
+        reason (str): Last error seen, or why the call wasn't attempted.
+    """
+
+    def __init__(self, reason: str):
+        """
+        Initialize the InventoryUnavailableException with the given reason.
+
+        Args:
+            reason (str): Last error seen, or why the call wasn't attempted.
+        """
+        detail = {
+            "error_message": "inventory service unavailable",
+            "reason": reason,
+        }
+
+        super().__init__(status_code=503, detail=detail)
+
+
+class InvalidStatusTransitionException(HTTPException):
+    """
+    Exception raised when orders are asked to move between two statuses that aren't linked.
+
+    Attributes:
+        from_status (str): Current status of the orders.
+        to_status (str): Requested status.
+    """
+
+    def __init__(self, from_status: str, to_status: str):
+        """
+        Initialize the InvalidStatusTransitionException with the requested transition.
+
+        Args:
+            from_status (str): Current status of the orders.
+            to_status (str): Requested status.
+        """
+        detail = {
+            "error_message": f"orders can't move from '{from_status}' to '{to_status}'",
+            "from_status": from_status,
+            "to_status": to_status,
+        }
+
+        super().__init__(status_code=409, detail=detail)
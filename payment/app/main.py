@@ -2,25 +2,41 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from payment.app.db.outbox_relay import outbox_relay
 from payment.app.db.postgresql import create_db_and_tables
+from payment.app.middleware.metrics import MetricsMiddleware, metrics_endpoint
 from payment.app.routes.CRUD_route import router as crud_router
 from payment.app.routes.route import router
+from payment.app.routes.stats_route import router as stats_router
+from payment.app.services.inventory_client import inventory_client
+from payment.app.services.product_snapshot import product_snapshot
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
-    Lifespan event to initialize the database at startup.
+    Lifespan event to initialize the database, the inventory API client, the product snapshot
+    and the outbox relay at startup.
     """
     await create_db_and_tables()  # Ensures tables are created on startup
-    yield  # No need to keep anything persistent
+    await inventory_client.start()  # * pooled keep-alive connections to the inventory API
+    await product_snapshot.start()  # * loads the catalog, then follows the inventory change stream
+    await outbox_relay.start()  # * publishes committed order events to their streams
+    yield
+    await outbox_relay.stop()
+    await product_snapshot.stop()
+    await inventory_client.aclose()
     # No explicit DB close required because we use per-request sessions
 
 
 app = FastAPI(lifespan=lifespan)
+# * latency / in-flight requests per route, scraped from GET /metrics with the Redis and DB pool metrics
+app.add_middleware(MetricsMiddleware)
+app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
 
 app.include_router(router)  # * main order routes
 app.include_router(crud_router)  # * reference CRUD routes
+app.include_router(stats_router)  # * runtime stats of this worker
 
 
 def main() -> None:
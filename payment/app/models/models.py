@@ -5,6 +5,8 @@ from typing import Optional
 
 import pydantic
 from pydantic import BaseModel
+from sqlalchemy import BigInteger, Column, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, SQLModel
 
 
@@ -13,18 +15,29 @@ class Order(SQLModel, table=True):  # type: ignore
     """
     Represents an order in the system.
     """
+
+    # * (status, created_at) serves time ranges within a status, e.g. pending orders older than
+    # 5 minutes or refunds per day; (product_id, created_at) serves the orders of a product
+    # over time and lookups by product_id alone
+    __table_args__ = (
+        Index("ix_order_status_created_at", "status", "created_at"),
+        Index("ix_order_product_id_created_at", "product_id", "created_at"),
+    )
+
     # * auto-incrementing primary key, handled by SQLModel
     # * using int for simplicity, but can be changed to UUID if needed
     order_id: Optional[int] = Field(default=None, primary_key=True, index=True, description="Unique order ID")
     # id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True, description="Unique order ID")
-    product_id: str = Field(index=True, description="Unique identifier for the product")
+    product_id: str = Field(..., description="Unique identifier for the product")
     price: float = Field(..., description="Price of the product")
     fee_per_unit: float = Field(..., description="Fee for the product")
     total: float = Field(..., description="Total amount for the product")
     order_quantity: int = Field(..., description="Quantity of the product")
     status: str = Field(..., description="Status of the order (e.g., pending, completed)")
-    created_at: str = Field(
-        default_factory=lambda: datetime.datetime.now().isoformat(), description="Timestamp when the order was created"
+    created_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+        description="Timestamp when the order was created",
     )
 
     class Config:
@@ -40,6 +53,34 @@ class Order(SQLModel, table=True):  # type: ignore
         }
 
 
+class OrderOutbox(SQLModel, table=True):  # type: ignore
+    """
+    Represents an event waiting in the transactional outbox.
+
+    Rows are written in the same transaction as the order change they announce and published
+    to their Redis stream by the outbox relay, so an event exists if and only if the change was
+    committed.
+    """
+
+    __tablename__ = "order_outbox"
+    # * the relay only ever reads unpublished rows, oldest first
+    __table_args__ = (Index("ix_order_outbox_unpublished", "id", postgresql_where=Column("published_at").is_(None)),)
+
+    id: Optional[int] = Field(default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True))
+    stream: str = Field(..., description="Redis stream the event is published to")
+    payload: dict = Field(..., sa_column=Column(JSONB, nullable=False), description="Stream entry fields")
+    created_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+        description="Timestamp when the event was written",
+    )
+    published_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+        description="Timestamp when the relay published the event, NULL until then",
+    )
+
+
 class UpdateOrder(SQLModel):
     """
     Represents an update to an existing order.
@@ -101,3 +142,43 @@ class OrderRequest(BaseModel):
             ]
         }
     }
+
+
+class OrderFilter(BaseModel):
+    """
+    Filters of an order listing or export, all optional and combined with AND.
+    """
+
+    status: Optional[str] = pydantic.Field(None, description="Only orders in this status")
+    product_id: Optional[str] = pydantic.Field(None, description="Only orders of this product")
+    created_from: Optional[datetime.datetime] = pydantic.Field(None, description="Only orders created at or after")
+    created_to: Optional[datetime.datetime] = pydantic.Field(None, description="Only orders created before")
+
+
+# * status transitions of an order: processing completes it, inventory refunds it when out of stock
+ORDER_STATUS_TRANSITIONS: dict[str, tuple[str, ...]] = {"pending": ("completed",), "completed": ("refunded",)}
+ORDER_TRANSITION_MAX_ORDERS = 10000
+
+
+class OrderStatusTransition(BaseModel):
+    """
+    Represents a request to move many orders from one status to another.
+    """
+
+    order_ids: list[int] = pydantic.Field(
+        ..., min_length=1, max_length=ORDER_TRANSITION_MAX_ORDERS, description="IDs of the orders to move"
+    )
+    from_status: str = pydantic.Field(..., description="Status the orders must currently be in")
+    to_status: str = pydantic.Field(..., description="Status to move them to")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "order_ids": [1, 2, 3],
+                    "from_status": "completed",
+                    "to_status": "refunded",
+                }
+            ]
+        }
+    }
@@ -3,7 +3,7 @@ from typing import List
 from fastapi import APIRouter, HTTPException
 
 from payment.app.db.postgresql import SessionDep
-from payment.app.models.models import Order, UpdateOrder
+from payment.app.models.models import Order, OrderFilter, UpdateOrder
 from payment.app.services.service import OrderService
 
 router = APIRouter(prefix="/CRUD/orders", tags=["CRUD-Orders"])
@@ -43,17 +43,18 @@ def get_order(order_id: int, session: SessionDep):
 
 
 @router.get("/", response_model=List[Order])
-def get_all_orders(session: SessionDep):
+async def get_all_orders(session: SessionDep):
     """
-    Retrieves all orders.
+    Retrieves the first page of orders.
 
     Args:
         session (Session): Database session.
 
     Returns:
-        List[Order]: List of all orders.
+        List[Order]: First orders by order_id.
     """
-    return OrderService.get_all_orders(session)
+    orders, _ = await OrderService.get_all_orders(session, OrderFilter())
+    return orders
 
 
 @router.put("/{order_id}", response_model=Order)
@@ -1,19 +1,20 @@
-from typing import List
+from typing import Annotated, List
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
 from payment.app.db.postgresql import SessionDep
-from payment.app.models.models import Order, OrderRequest, UpdateOrder
-from payment.app.services.process_service import ProcessService
-from payment.app.services.service import OrderService
+from payment.app.models.models import Order, OrderFilter, OrderRequest, OrderStatusTransition, UpdateOrder
+from payment.app.services.service import ORDERS_PAGE_LIMIT, ORDERS_PAGE_MAX_LIMIT, OrderService
+from payment.app.services.stream_service import StreamService
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
 @router.post("/", response_model=Order)
-async def create_order(order_req: OrderRequest, session: SessionDep, background_tasks: BackgroundTasks):
+async def create_order(order_req: OrderRequest, session: SessionDep):
     """
-    Creates a new order.
+    Creates a new order and, in the same transaction, queues it for processing by the order processing workers.
 
     Args:
         order_req (OrderRequest): Order request details [order id and order quantity].
@@ -22,43 +23,91 @@ async def create_order(order_req: OrderRequest, session: SessionDep, background_
     Returns:
         Order: The newly created order.
     """
-    order = await OrderService.order_request(order_req, session)
+    return await OrderService.order_request(order_req, session)
 
-    background_tasks.add_task(ProcessService.process_order, order, session)
 
-    return order
+@router.get("/", response_model=List[Order])
+async def get_all_orders(
+    response: Response,
+    session: SessionDep,
+    filters: Annotated[OrderFilter, Query()],
+    after: int = Query(0, ge=0, description="Order id from the previous page's X-Next-Cursor header"),
+    limit: int = Query(ORDERS_PAGE_LIMIT, ge=1, le=ORDERS_PAGE_MAX_LIMIT, description="Orders per page"),
+):
+    """
+    Retrieves a page of orders, by ascending order_id.
 
+    The cursor for the next page is returned in the `X-Next-Cursor` header, `0` means the last page.
 
-@router.get("/{order_id}", response_model=Order)
-async def get_order(order_id: int, session: SessionDep):
+    Args:
+        session (Session): Database session.
+        filters (OrderFilter): Status, product and creation time filters.
+        after (int): Cursor of the page.
+        limit (int): Orders per page.
+
+    Returns:
+        List[Order]: Orders of the page.
     """
-    Retrieves an order by order_id.
+    orders, next_after = await OrderService.get_all_orders(session, filters, after=after, limit=limit)
+    response.headers["X-Next-Cursor"] = str(next_after)
+    return orders
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_orders(filters: Annotated[OrderFilter, Query()]) -> StreamingResponse:
+    """
+    Streams every order matching the filters as NDJSON (one order per line), by ascending order_id.
+    """
+    return StreamingResponse(OrderService.iter_orders_export(filters), media_type="application/x-ndjson")
+
+
+@router.post("/transitions", response_model=dict[str, list[int]])
+async def transition_orders(transition: OrderStatusTransition, session: SessionDep):
+    """
+    Moves many orders from one status to another in a single statement.
 
     Args:
-        order_id (int): ID of the order.
+        transition (OrderStatusTransition): Order IDs, their current and their new status.
         session (Session): Database session.
 
     Returns:
-        Order: Found order or raises HTTP 404.
+        dict[str, list[int]]: IDs of the `transitioned` orders and of the `skipped` ones
+        (unknown or not in `from_status`).
+
+    Notes:
+        Completed orders get their `order_completed` outbox event in the same transaction,
+        like `ProcessService.process_order`, so inventory takes their stock.
     """
-    order = await OrderService.get_order(order_id, session)
-    if not order:
-        raise HTTPException(status_code=404, detail=f"Order with id {order_id} not found")
-    return order
+    orders = await OrderService.transition_orders(
+        transition.order_ids, transition.from_status, transition.to_status, session, commit=False
+    )
+    if transition.to_status == "completed":
+        for order in orders:
+            session.add(StreamService.order_completed_event(order))
+    await session.commit()
+    transitioned = {order.order_id for order in orders}
+    return {
+        "transitioned": sorted(transitioned),  # type: ignore[type-var]
+        "skipped": sorted(set(transition.order_ids) - transitioned),  # type: ignore[operator]
+    }
 
 
-@router.get("/", response_model=List[Order])
-async def get_all_orders(session: SessionDep):
+@router.get("/{order_id}", response_model=Order)
+async def get_order(order_id: int, session: SessionDep):
     """
-    Retrieves all orders.
+    Retrieves an order by order_id.
 
     Args:
+        order_id (int): ID of the order.
         session (Session): Database session.
 
     Returns:
-        List[Order]: List of all orders.
+        Order: Found order or raises HTTP 404.
     """
-    return await OrderService.get_all_orders(session)
+    order = await OrderService.get_order(order_id, session)
+    if not order:
+        raise HTTPException(status_code=404, detail=f"Order with id {order_id} not found")
+    return order
 
 
 @router.put("/{order_id}", response_model=Order)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+
+from payment.app.db.stream_monitor import stream_monitor
+
+router = APIRouter(prefix="/payment", tags=["Stats"])
+
+
+@router.get("/streams/stats", response_model=dict)
+async def get_stream_stats() -> dict:
+    """
+    Length, per-group lag, pending entries, oldest pending age and processing rate of the
+    streams payment consumes (`refund_order`, `order_processing`), refreshed every few seconds.
+
+    Returns:
+        dict: Stats by stream, then by consumer group and consumer.
+    """
+    return await stream_monitor.stats()
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator
+
+import httpx
+from dotenv import load_dotenv
+from loguru import logger
+
+from payment.app.exceptions.custom_exceptions import InventoryUnavailableException
+
+load_dotenv()
+
+# * inventory API client settings
+INVENTORY_BASE_URL = os.getenv("INVENTORY_BASE_URL", "http://127.0.0.1:8000")
+INVENTORY_CONNECT_TIMEOUT_S = float(os.getenv("INVENTORY_CONNECT_TIMEOUT_S", 0.5))
+INVENTORY_TIMEOUT_S = float(os.getenv("INVENTORY_TIMEOUT_S", 2))
+INVENTORY_MAX_CONNECTIONS = int(os.getenv("INVENTORY_MAX_CONNECTIONS", 100))
+INVENTORY_MAX_KEEPALIVE = int(os.getenv("INVENTORY_MAX_KEEPALIVE", 20))
+# retries after the first attempt, transport errors and 5xx only
+INVENTORY_RETRIES = int(os.getenv("INVENTORY_RETRIES", 2))
+INVENTORY_RETRY_BACKOFF_S = float(os.getenv("INVENTORY_RETRY_BACKOFF_S", 0.05))
+# * circuit breaker: open after this many failed calls in a row, probe again after the reset time
+INVENTORY_BREAKER_FAILURES = int(os.getenv("INVENTORY_BREAKER_FAILURES", 5))
+INVENTORY_BREAKER_RESET_S = float(os.getenv("INVENTORY_BREAKER_RESET_S", 10))
+# a catalog snapshot is one long streamed response, it only gets a read timeout per chunk
+INVENTORY_SNAPSHOT_TIMEOUT_S = float(os.getenv("INVENTORY_SNAPSHOT_TIMEOUT_S", 30))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    - closed: calls go through, `failure_threshold` failed calls in a row open it
+    - open: calls fail fast until `reset_timeout_s` has passed
+    - half open: a single probe call goes through, its outcome closes or re-opens the breaker
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self, failure_threshold: int = INVENTORY_BREAKER_FAILURES, reset_timeout_s: float = INVENTORY_BREAKER_RESET_S
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go through now; moves an expired open breaker to half open.
+        """
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if (self.state == self.OPEN and now - self.opened_at >= self.reset_timeout_s) or (
+            # the probe never reported back (e.g. cancelled), let another one through
+            self.state == self.HALF_OPEN
+            and now - self.probe_started_at >= self.reset_timeout_s
+        ):
+            self.state = self.HALF_OPEN
+            self.probe_started_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Inventory circuit breaker closed")
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Inventory circuit breaker opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class InventoryClient:
+    """
+    Async client of the inventory API on a shared keep-alive connection pool.
+
+    Calls have tight timeouts and bounded retries (transport errors and 5xx responses), and go
+    through a `CircuitBreaker` so that while inventory is down orders fail fast with a 503
+    instead of piling up on timeouts. `start()` / `aclose()` are called by the payment lifespan.
+    """
+
+    def __init__(
+        self,
+        base_url: str = INVENTORY_BASE_URL,
+        retries: int = INVENTORY_RETRIES,
+        breaker: CircuitBreaker | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        """
+        Initialize the client.
+
+        Args:
+            base_url (str): Inventory API base URL.
+            retries (int): Retries after the first attempt of a call.
+            breaker (CircuitBreaker | None): Breaker to use, a new one by default.
+            transport (httpx.AsyncBaseTransport | None): Transport override, for tests.
+        """
+        self.base_url = base_url
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self.transport = transport
+        self._client: httpx.AsyncClient | None = None
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(INVENTORY_TIMEOUT_S, connect=INVENTORY_CONNECT_TIMEOUT_S),
+                limits=httpx.Limits(
+                    max_connections=INVENTORY_MAX_CONNECTIONS, max_keepalive_connections=INVENTORY_MAX_KEEPALIVE
+                ),
+                transport=self.transport,
+            )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("InventoryClient used before start()")
+        return self._client
+
+    async def _get(self, path: str) -> httpx.Response:
+        """
+        GET through the breaker with bounded retries. 4xx responses are returned as is.
+
+        Raises:
+            InventoryUnavailableException: If the breaker is open or every attempt failed.
+        """
+        if not self.breaker.allow():
+            raise InventoryUnavailableException("circuit open")
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.get(path)
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+
+            logger.warning(f"Inventory GET {path} failed (attempt {attempt + 1}/{self.retries + 1}): {error}")
+            if attempt < self.retries:
+                await asyncio.sleep(INVENTORY_RETRY_BACKOFF_S * 2**attempt)
+
+        self.breaker.record_failure()
+        raise InventoryUnavailableException(error)
+
+    async def get_product(self, pk: str) -> dict | None:
+        """
+        Get a product by its primary key (pk), `None` if inventory doesn't know it.
+        """
+        response = await self._get(f"/inventory/product/{pk}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def iter_products_snapshot(self) -> AsyncIterator[dict]:
+        """
+        Stream the whole catalog from GET /inventory/products/snapshot.
+
+        Not retried nor counted by the breaker: it runs off the request path and its caller
+        (the product snapshot) retries the bootstrap as a whole.
+        """
+        timeout = httpx.Timeout(INVENTORY_SNAPSHOT_TIMEOUT_S, connect=INVENTORY_CONNECT_TIMEOUT_S)
+        async with self.client.stream("GET", "/inventory/products/snapshot", timeout=timeout) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
+
+
+inventory_client = InventoryClient()
@@ -1,39 +1,47 @@
 import asyncio
+import os
 
-from sqlmodel import select
+from dotenv import load_dotenv
+from loguru import logger
 
-from payment.app.db.postgresql import SessionDep
+from payment.app.db.postgresql import async_session_factory
 from payment.app.models.models import Order
+from payment.app.services.service import OrderService
 from payment.app.services.stream_service import StreamService
 
+load_dotenv()
+
+# simulated payment processing time per order
+ORDER_PROCESSING_DELAY_S = float(os.getenv("ORDER_PROCESSING_DELAY_S", 5))
+
 
 class ProcessService:
 
     @staticmethod
-    async def process_order(order: Order, session: SessionDep):
+    async def process_order(order_id: int) -> Order | None:
         """
         Processes an order by updating its status to 'completed'.
 
+        Runs as a job of the order processing queue: the processing time is spent without a
+        database session, the status update gets its own short-lived one. A redelivered job
+        whose order isn't pending anymore is a no-op.
+
         Args:
-            order (Order): Order object to be processed.
-            session (Session): Database session.
+            order_id (int): ID of the order to be processed.
 
         Returns:
-            Order: The processed order with updated status.
+            Order | None: The processed order, `None` if it was deleted or already processed.
         """
-        # Fetch order again from DB to attach it to the session
-        fetched_new_order = (
-            await session.exec(select(Order).where(Order.order_id == order.model_dump()["order_id"]))
-        ).first()
-
-        if not fetched_new_order:
-            raise ValueError("Order not found")  # Handle case where order was deleted
-
-        await asyncio.sleep(5)  # Simulate processing time
-        fetched_new_order.status = "completed"
-        await session.commit()
-        await session.refresh(fetched_new_order)
-        # return fetched_new_order
-
-        # * redis stream
-        StreamService.stream_order_completed(fetched_new_order)
+        await asyncio.sleep(ORDER_PROCESSING_DELAY_S)  # Simulate processing time
+
+        async with async_session_factory() as session:
+            # * a single guarded UPDATE, orders deleted or no longer pending are left alone
+            orders = await OrderService.transition_orders([order_id], "pending", "completed", session, commit=False)
+            if not orders:
+                logger.info(f"Order with ID {order_id} is gone or not pending anymore, skipping.")
+                return None
+
+            # * transactional outbox: the order_completed event commits with the status, the relay publishes it
+            session.add(StreamService.order_completed_event(orders[0]))
+            await session.commit()
+        return orders[0]
@@ -0,0 +1,177 @@
+import asyncio
+import os
+from typing import NamedTuple
+
+import redis.asyncio
+from dotenv import load_dotenv
+from loguru import logger
+
+from payment.app.db.redis_stream import get_redis_async_client
+from payment.app.services.inventory_client import InventoryClient, inventory_client
+
+load_dotenv()
+
+# * must match the inventory service
+PRODUCT_CHANGES_STREAM = os.getenv("PRODUCT_CHANGES_STREAM", "product_changes")
+PRODUCT_SNAPSHOT_BATCH_SIZE = int(os.getenv("PRODUCT_SNAPSHOT_BATCH_SIZE", 1000))
+PRODUCT_SNAPSHOT_BLOCK_MS = int(os.getenv("PRODUCT_SNAPSHOT_BLOCK_MS", 5000))
+# how often the stream is checked for entries trimmed before they were read
+PRODUCT_SNAPSHOT_GAP_CHECK_S = float(os.getenv("PRODUCT_SNAPSHOT_GAP_CHECK_S", 30))
+PRODUCT_SNAPSHOT_RETRY_S = float(os.getenv("PRODUCT_SNAPSHOT_RETRY_S", 2))
+
+
+class ProductState(NamedTuple):
+    """
+    What payment needs of a product, and the change stream entry id it was last updated from.
+    """
+
+    name: str
+    price: float
+    quantity: int
+    version: str
+
+    def as_dict(self, pk: str) -> dict[str, str | float | int]:
+        # same shape as GET /inventory/product/{pk}
+        return {"id": pk, "name": self.name, "price": self.price, "quantity": self.quantity}
+
+
+def parse_stream_id(entry_id: str) -> tuple[int, int]:
+    milliseconds, _, sequence = entry_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+class ProductSnapshot:
+    """
+    In-memory copy of the inventory catalog, kept current by the inventory change stream.
+
+    On start it records the stream position, loads the catalog from the inventory snapshot
+    endpoint, then tails the stream from that position with XREAD (no consumer group, every
+    payment worker keeps its own copy). Entries replayed over the snapshot are harmless: each
+    one carries the full state of its product at that point, and the last one wins. When the
+    stream was trimmed past the last entry read, the snapshot is loaded again.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.asyncio.Redis | None = None,
+        client: InventoryClient = inventory_client,
+        stream: str = PRODUCT_CHANGES_STREAM,
+    ) -> None:
+        self._redis = redis_client
+        self.client = client
+        self.stream = stream
+        self.products: dict[str, ProductState] = {}
+        self.last_id = "0-0"
+        self.ready = False
+        self.bootstraps = 0
+        self.applied = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def redis(self) -> redis.asyncio.Redis:
+        if self._redis is None:
+            self._redis = get_redis_async_client()
+        return self._redis
+
+    def get(self, pk: str) -> ProductState | None:
+        return self.products.get(pk)
+
+    async def get_product(self, pk: str) -> dict | None:
+        """
+        Get a product from the snapshot once loaded, from the inventory API until then.
+        """
+        if not self.ready:
+            return await self.client.get_product(pk)
+        product = self.products.get(pk)
+        return product.as_dict(pk) if product is not None else None
+
+    def apply(self, entry_id: str, fields: dict[str, str]) -> None:
+        """
+        Apply one change stream entry.
+        """
+        if fields.get("op") == "delete":
+            self.products.pop(fields["pk"], None)
+        else:
+            self.products[fields["pk"]] = ProductState(
+                fields["name"], float(fields["price"]), int(fields["quantity"]), entry_id
+            )
+        self.last_id = entry_id
+        self.applied += 1
+
+    async def _stream_info(self) -> dict:
+        try:
+            return await self.redis.xinfo_stream(self.stream)
+        except redis.exceptions.ResponseError:
+            # * the stream doesn't exist yet, nothing was ever published
+            return {}
+
+    async def bootstrap(self) -> None:
+        """
+        Load the catalog from inventory, starting the stream from the position recorded before.
+        """
+        position = (await self._stream_info()).get("last-generated-id") or "0-0"
+        products = {}
+        async for product in self.client.iter_products_snapshot():
+            products[product["id"]] = ProductState(
+                product["name"], float(product["price"]), int(product["quantity"]), position
+            )
+
+        self.products = products
+        self.last_id = position
+        self.ready = True
+        self.bootstraps += 1
+        logger.info(f"Product snapshot loaded {len(products)} products, following '{self.stream}' from {position}")
+
+    async def missed_entries(self) -> bool:
+        """
+        Whether entries newer than the last one read were trimmed from the stream.
+        """
+        info = await self._stream_info()
+        # Redis 7+ reports the newest trimmed id, older versions only the first entry left
+        max_deleted = info.get("max-deleted-entry-id")
+        if max_deleted is not None:
+            return parse_stream_id(max_deleted) > parse_stream_id(self.last_id)
+        first_entry = info.get("first-entry")
+        return bool(first_entry) and parse_stream_id(first_entry[0]) > parse_stream_id(self.last_id)
+
+    async def run(self) -> None:
+        """
+        Bootstrap, then follow the change stream until cancelled.
+        """
+        next_gap_check = 0.0
+        while True:
+            try:
+                loop_time = asyncio.get_running_loop().time()
+                if not self.ready or (loop_time >= next_gap_check and await self.missed_entries()):
+                    if self.ready:
+                        logger.warning(f"'{self.stream}' was trimmed past {self.last_id}, reloading the snapshot")
+                    await self.bootstrap()
+                if loop_time >= next_gap_check:
+                    next_gap_check = loop_time + PRODUCT_SNAPSHOT_GAP_CHECK_S
+
+                response = await self.redis.xread(
+                    {self.stream: self.last_id}, count=PRODUCT_SNAPSHOT_BATCH_SIZE, block=PRODUCT_SNAPSHOT_BLOCK_MS
+                )
+                for entry_id, fields in response[0][1] if response else []:
+                    self.apply(entry_id, fields)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Product snapshot update failed, retrying: {e}")
+                await asyncio.sleep(PRODUCT_SNAPSHOT_RETRY_S)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+product_snapshot = ProductSnapshot()
@@ -1,12 +1,34 @@
-import requests
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from dotenv import load_dotenv
 from fastapi import HTTPException
 
 # from loguru import logger
-from sqlalchemy import Numeric, cast, update
+from sqlalchemy import ARRAY, Integer, Select, any_, bindparam, func, literal_column, update
 from sqlmodel import select
 
-from payment.app.db.postgresql import SessionDep
-from payment.app.models.models import Order, OrderRequest, UpdateOrder
+from payment.app.db.postgresql import SessionDep, async_session_factory
+from payment.app.exceptions.custom_exceptions import CustomNotFoundException, InvalidStatusTransitionException
+from payment.app.models.models import ORDER_STATUS_TRANSITIONS, Order, OrderFilter, OrderRequest, UpdateOrder
+from payment.app.services.product_snapshot import product_snapshot
+from payment.app.services.stream_service import StreamService
+
+load_dotenv()
+
+ORDERS_PAGE_LIMIT = 100
+ORDERS_PAGE_MAX_LIMIT = 1000
+# rows fetched per round trip of the server-side cursor behind the NDJSON export
+ORDERS_EXPORT_CHUNK_SIZE = int(os.getenv("ORDERS_EXPORT_CHUNK_SIZE", 1000))
+
+
+def as_utc(value: datetime) -> datetime:
+    """
+    Timezone-aware datetime for comparisons with `created_at`, naive values are taken as UTC.
+    """
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
 
 
 class OrderService:
@@ -29,14 +51,16 @@ class OrderService:
                    quantity, and status.
 
         Raises:
-            requests.exceptions.RequestException: If there is an issue with the HTTP request
-                                                  to the inventory service.
+            CustomNotFoundException: If the inventory service doesn't know the product.
+            InventoryUnavailableException: If the inventory service is down or its circuit is open.
             KeyError: If the expected keys are missing in the response from the inventory service."""
 
         order_req_dict = order_req.model_dump()
 
-        req = requests.get(f"http://127.0.0.1:8000/inventory/product/{order_req_dict['product_id']}", timeout=10)
-        product = req.json()
+        # * served from the local product snapshot, the inventory API is only called until it's loaded
+        product = await product_snapshot.get_product(order_req_dict["product_id"])
+        if product is None:
+            raise CustomNotFoundException(order_req_dict["product_id"])
 
         # Validate order quantity against product quantity
         if int(order_req_dict["order_quantity"]) > int(product["quantity"]):
@@ -57,21 +81,26 @@ class OrderService:
             status="pending",
         )
 
-        return await OrderService.create_order(order, session)
+        return await OrderService.create_order(order, session, queue_processing=True)
 
     @staticmethod
-    async def create_order(order: Order, session: SessionDep) -> Order:
+    async def create_order(order: Order, session: SessionDep, queue_processing: bool = False) -> Order:
         """
         Creates a new order in the database.
 
         Args:
             order (Order): Order object to be added.
             session (Session): Database session.
+            queue_processing (bool): Also queue the order for the order processing workers, through
+                the outbox in the same transaction, so a committed order is always processed.
 
         Returns:
             Order: The newly created order.
         """
         session.add(order)
+        if queue_processing:
+            await session.flush()  # * assigns the order_id the job refers to
+            session.add(StreamService.order_processing_event(order))
         await session.commit()
         await session.refresh(order)
         return order
@@ -101,22 +130,145 @@ class OrderService:
         # return order
 
     @staticmethod
-    async def get_all_orders(session: SessionDep) -> list[Order]:
+    def filter_orders(filters: OrderFilter) -> list:
+        """
+        WHERE clauses of an order filter.
+        """
+        clauses = []
+        if filters.status is not None:
+            clauses.append(Order.status == filters.status)
+        if filters.product_id is not None:
+            clauses.append(Order.product_id == filters.product_id)
+        if filters.created_from is not None:
+            clauses.append(Order.created_at >= as_utc(filters.created_from))
+        if filters.created_to is not None:
+            clauses.append(Order.created_at < as_utc(filters.created_to))
+        return clauses
+
+    @staticmethod
+    async def get_all_orders(
+        session: SessionDep, filters: OrderFilter, after: int = 0, limit: int = ORDERS_PAGE_LIMIT
+    ) -> tuple[list[Order], int]:
+        """
+        Retrieves one page of orders, by ascending order_id.
+
+        Keyset pagination: the page starts right after the `after` order_id, so every page is a
+        primary key index range scan, however deep into the table it is.
+
+        Args:
+            session (Session): Database session.
+            filters (OrderFilter): Filters of the listing.
+            after (int): Last order_id of the previous page, 0 to start from the beginning.
+            limit (int): Number of orders wanted in the page.
+
+        Returns:
+            tuple[list[Order], int]: The orders and the `after` of the next page (0 once the last page was read).
+        """
+        statement = (
+            select(Order)
+            .where(Order.order_id > after, *OrderService.filter_orders(filters))
+            .order_by(Order.order_id)  # type: ignore[arg-type]
+            .limit(limit)
+        )
+        orders = list((await session.exec(statement)).all())
+        return orders, orders[-1].order_id if len(orders) == limit else 0  # type: ignore[return-value]
+
+    @staticmethod
+    async def iter_orders_export(filters: OrderFilter) -> AsyncIterator[bytes]:
+        """
+        Stream every order matching the filters as NDJSON, one chunk of lines per cursor fetch.
+
+        Rows are read through a server-side cursor `ORDERS_EXPORT_CHUNK_SIZE` at a time as plain
+        tuples (no ORM objects), so memory stays flat whatever the table size. The export owns its
+        session: the request one is closed before a streamed response is sent.
+        """
+        columns = list(Order.__table__.columns)  # type: ignore[attr-defined]
+        names = [column.name for column in columns]
+        statement = (
+            select(*columns)
+            .where(*OrderService.filter_orders(filters))
+            .order_by(Order.order_id)  # type: ignore[arg-type]
+            .execution_options(yield_per=ORDERS_EXPORT_CHUNK_SIZE)
+        )
+
+        async with async_session_factory() as session:
+            result = await session.stream(statement)
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(names, row)), default=datetime.isoformat) + "\n" for row in rows
+                ).encode()
+
+    @staticmethod
+    def stale_orders_statement(status: str, older_than: timedelta, limit: int) -> Select:
+        """
+        Oldest orders in a status created more than `older_than` ago, an `ix_order_status_created_at` range scan.
+        """
+        return (
+            select(Order)
+            .where(Order.status == status, Order.created_at < func.now() - older_than)
+            .order_by(Order.created_at)  # type: ignore[arg-type]
+            .limit(limit)
+        )
+
+    @staticmethod
+    async def get_stale_orders(
+        session: SessionDep, status: str = "pending", older_than: timedelta = timedelta(minutes=5), limit: int = 100
+    ) -> list[Order]:
         """
-        Retrieves all orders from the database.
+        Retrieves orders stuck in a status, e.g. pending orders older than 5 minutes, oldest first.
 
         Args:
             session (Session): Database session.
+            status (str): Status of the orders.
+            older_than (timedelta): Minimum age of the orders.
+            limit (int): Max number of orders returned.
 
         Returns:
-            list[Order]: List of all orders.
+            list[Order]: The oldest matching orders.
         """
-        return list((await session.exec(select(Order))).all())
+        return list((await session.exec(OrderService.stale_orders_statement(status, older_than, limit))).all())
+
+    @staticmethod
+    def orders_per_day_statement(status: str, created_from: datetime, created_to: datetime) -> Select:
+        """
+        Orders per UTC day in a status over a time range, read from `ix_order_status_created_at` only.
+        """
+        # literals rather than bound parameters, so GROUP BY matches the selected expression
+        utc_created_at = func.timezone(literal_column("'UTC'"), Order.created_at)
+        day = func.date_trunc(literal_column("'day'"), utc_created_at).label("day")
+        return (
+            select(day, func.count().label("orders"))
+            .where(
+                Order.status == status, Order.created_at >= as_utc(created_from), Order.created_at < as_utc(created_to)
+            )
+            .group_by(day)
+            .order_by(day)
+        )
+
+    @staticmethod
+    async def count_orders_per_day(
+        session: SessionDep, status: str, created_from: datetime, created_to: datetime
+    ) -> list[dict[str, str | int]]:
+        """
+        Counts the orders in a status per UTC day, e.g. refunds per day.
+
+        Args:
+            session (Session): Database session.
+            status (str): Status of the orders.
+            created_from (datetime): Start of the range, inclusive.
+            created_to (datetime): End of the range, exclusive.
+
+        Returns:
+            list[dict[str, str | int]]: `{"day": "YYYY-MM-DD", "orders": count}` for every day with orders.
+        """
+        statement = OrderService.orders_per_day_statement(status, created_from, created_to)
+        rows = (await session.exec(statement)).all()  # type: ignore[call-overload]
+        return [{"day": day.date().isoformat(), "orders": orders} for day, orders in rows]
 
     @staticmethod
     async def update_order(order_id: int, updated_data: UpdateOrder, session: SessionDep) -> Order | None:
         """
-        Updates an order with new data using `update()` for efficiency.
+        Updates an order with new data in a single `UPDATE ... RETURNING`.
 
         Args:
             order_id (int): ID of the order to update.
@@ -124,33 +276,64 @@ class OrderService:
             session (Session): Database session.
 
         Returns:
-            Order: The updated order.
+            Order | None: The updated order, None if it doesn't exist.
 
         Raises:
-            ValueError: If the order with the given order_id does not exist.
+            ValueError: If no field is provided.
         """
         update_data = updated_data.model_dump(exclude_unset=True)
         if not update_data:
             raise ValueError("No fields provided for update.")
 
-        # Ensure the order exists before updating
-        existing_order = (await session.exec(select(Order).where(Order.order_id == order_id))).first()
-        if not existing_order:
-            raise ValueError(f"Order with id '{order_id}' not found.")
-
-        # Run update query directly
-        stmt = (
-            update(Order)
-            .where(cast(Order.order_id, Numeric) == order_id)
-            .values(**update_data)
-            .returning(Order)  # Return the updated row
-        )
-        _ = await session.execute(stmt)
+        statement = update(Order).where(Order.order_id == order_id).values(**update_data).returning(Order)
+        updated_order = (await session.execute(statement)).scalars().first()
         await session.commit()
+        return updated_order
 
-        updated_order = (await session.exec(select(Order).where(Order.order_id == order_id))).first()
+    @staticmethod
+    async def transition_orders(
+        order_ids: list[int], from_status: str, to_status: str, session: SessionDep, commit: bool = True
+    ) -> list[Order]:
+        """
+        Moves many orders from one status to another with a single guarded statement:
+        `UPDATE ... WHERE order_id = ANY(:ids) AND status = :from_status RETURNING ...`.
 
-        return updated_order
+        Orders that don't exist or aren't in `from_status` (e.g. already moved by a redelivered
+        event) are left untouched and simply not returned.
+
+        Args:
+            order_ids (list[int]): IDs of the orders to move.
+            from_status (str): Status the orders must currently be in.
+            to_status (str): Status to move them to.
+            session (Session): Database session.
+            commit (bool): Commit the session, False to leave it to the caller's transaction.
+
+        Returns:
+            list[Order]: The orders that were moved, with their new status.
+
+        Raises:
+            InvalidStatusTransitionException: If `to_status` can't follow `from_status`.
+        """
+        if to_status not in ORDER_STATUS_TRANSITIONS.get(from_status, ()):
+            raise InvalidStatusTransitionException(from_status, to_status)
+        if not order_ids:
+            return []
+
+        statement = (
+            update(Order)
+            # * one array parameter whatever the number of ids, compared against the primary key index
+            .where(
+                Order.order_id == any_(bindparam("order_ids", order_ids, type_=ARRAY(Integer))),
+                Order.status == from_status,
+            )
+            .values(status=to_status)
+            .returning(Order)
+            .execution_options(synchronize_session=False)
+        )
+        orders = list((await session.execute(statement)).scalars().all())
+        if commit:
+            await session.commit()
+        return orders
 
     @staticmethod
     async def delete_order(order_id: int, session: SessionDep) -> dict | None:
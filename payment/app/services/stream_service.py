@@ -1,5 +1,10 @@
-from payment.app.db.redis_stream import get_redis_stream_client
-from payment.app.models.models import Order
+import os
+
+from payment.app.db.stream_runtime import ORDER_COMPLETED_SHARDS, shard_for_key, shard_stream
+from payment.app.models.models import Order, OrderOutbox
+
+# * queue of orders waiting for processing, consumed by `payment.app.db.order_processor`
+ORDER_PROCESSING_STREAM = os.getenv("ORDER_PROCESSING_STREAM", "order_processing")
 
 
 class StreamService:
@@ -8,15 +13,31 @@ class StreamService:
     """
 
     @staticmethod
-    def stream_order_completed(order: Order) -> None:
+    def order_processing_event(order: Order) -> OrderOutbox:
+        """
+        Builds the outbox event queuing an order for the order processing workers, to be added
+        to the session that creates it.
+
+        Args:
+            order (Order): The new order, flushed so that it has its order_id.
+
+        Returns:
+            OrderOutbox: Job for the `order_processing` stream.
+        """
+        return OrderOutbox(stream=ORDER_PROCESSING_STREAM, payload={"order_id": order.order_id})
+
+    @staticmethod
+    def order_completed_event(order: Order) -> OrderOutbox:
         """
-        Adds a completed order to the Redis stream.
+        Builds the outbox event announcing a completed order, to be added to the session that completes it.
 
         Args:
-            order (Order): Order object to be added to the stream.
+            order (Order): The completed order.
 
         Returns:
-            None
+            OrderOutbox: Event for the `order_completed` shard of the order's product.
         """
-        redis_stream = get_redis_stream_client()
-        redis_stream.xadd(name="order_completed", fields=order.model_dump(), id="*")
+        stream = shard_stream(
+            "order_completed", shard_for_key(order.product_id, ORDER_COMPLETED_SHARDS), ORDER_COMPLETED_SHARDS
+        )
+        return OrderOutbox(stream=stream, payload=order.model_dump(mode="json"))
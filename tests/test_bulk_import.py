@@ -0,0 +1,78 @@
+import unittest
+
+from ulid import ULID
+
+from inventory.app.services.bulk_import import (
+    BulkImportReport,
+    ImportLineTooLong,
+    iter_lines,
+    new_pks,
+    parse_import,
+    validate_rows,
+)
+
+
+async def body(data: bytes, chunk_size: int = 7):
+    # small chunks so lines are split across them, like a streamed upload
+    while data:
+        yield data[:chunk_size]
+        data = data[chunk_size:]
+
+
+class TestBulkImport(unittest.IsolatedAsyncioTestCase):
+    async def test_ndjson_rows_are_validated_with_line_numbers(self) -> None:
+        """
+        Test that valid NDJSON rows are serialized and invalid ones reported with their line.
+        """
+        data = b'{"name": "a", "price": 1.5, "quantity": 2}\n\nnot json\n{"name": "b", "price": "x", "quantity": 1}\n'
+        rows = [row async for row in parse_import(body(data), "application/x-ndjson")]
+        report = BulkImportReport()
+        documents = validate_rows(rows, report)
+
+        self.assertEqual(len(documents), 1)
+        self.assertEqual(documents[0]["price"], "1.5")
+        self.assertEqual(documents[0]["quantity"], "2")
+        self.assertEqual(len(documents[0]["pk"]), 26)
+        self.assertEqual([error["row"] for error in report.as_dict()["errors"]], [3, 4])
+        self.assertEqual(report.as_dict()["errors"][1]["errors"][0]["field"], "price")
+
+    async def test_csv_rows_use_the_header(self) -> None:
+        """
+        Test that CSV rows are mapped through the header, keeping quoted commas and given pks.
+        """
+        data = b'pk,name,price,quantity\nPK1,"a, b",2.25,7\nPK2,c,1\n'
+        rows = [row async for row in parse_import(body(data), "text/csv; charset=utf-8")]
+        report = BulkImportReport()
+        documents = validate_rows(rows, report)
+
+        self.assertEqual([document["name"] for document in documents], ["a, b"])
+        self.assertEqual(documents[0]["pk"], "PK1")
+        self.assertTrue(report.overwrites)
+        self.assertEqual(report.failed, 1)
+
+    async def test_oversized_lines_are_rejected(self) -> None:
+        """
+        Test that a line over the cap is rejected as soon as it is buffered, newline or not.
+        """
+        lines = [line async for line in iter_lines(body(b"a" * 8 + b"\n" + b"b" * 8), max_line_bytes=8)]
+        self.assertEqual(lines, [(1, b"a" * 8), (2, b"b" * 8)])
+
+        with self.assertRaisesRegex(ImportLineTooLong, "line 2"):
+            async for _ in iter_lines(body(b"a\n" + b"b" * 9 + b"\n"), max_line_bytes=8):
+                pass
+
+        unterminated = body(b"b" * 1000, chunk_size=4)
+        with self.assertRaisesRegex(ImportLineTooLong, "line 1"):
+            async for _ in iter_lines(unterminated, max_line_bytes=8):
+                pass
+        # * rejected without reading the rest of the body
+        self.assertEqual(len([chunk async for chunk in unterminated]), 247)
+
+    def test_new_pks_are_ulids(self) -> None:
+        """
+        Test that generated pks round-trip through the ULID parser and are unique.
+        """
+        pks = new_pks(100)
+
+        self.assertEqual(len(set(pks)), 100)
+        self.assertTrue(all(str(ULID.from_str(pk)) == pk for pk in pks))
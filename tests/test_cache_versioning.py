@@ -0,0 +1,72 @@
+import unittest
+
+from fakeredis import FakeAsyncRedis
+from fastapi_cache import FastAPICache
+from fastapi_cache.decorator import cache
+
+from inventory.app.db.l1_cache import L1RedisBackend
+from inventory.app.services.utils import (
+    clear_cache_by_namespace,
+    clear_cache_by_pk,
+    product_key_builder,
+    versioned_key_builder,
+)
+
+
+class TestCacheVersioning(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.redis = FakeAsyncRedis(decode_responses=True)
+        # init is a no-op once initialized, e.g. by importing the inventory consumer
+        FastAPICache.reset()
+        FastAPICache.init(L1RedisBackend(self.redis), prefix="test")
+        self.addCleanup(FastAPICache.reset)
+        self.calls = 0
+
+        @cache(namespace="inventory.products", key_builder=versioned_key_builder, expire=600)
+        async def get_products(limit: int) -> dict:
+            self.calls += 1
+            return {"limit": limit, "build": self.calls}
+
+        @cache(namespace="inventory.product", key_builder=product_key_builder, expire=600)
+        async def get_product(pk: str) -> dict:
+            self.calls += 1
+            return {"pk": pk, "build": self.calls}
+
+        self.get_products = get_products
+        self.get_product = get_product
+
+    async def test_namespace_invalidation_bumps_the_key_version(self) -> None:
+        """
+        Test that invalidating a namespace moves its keys to the next version, so entries of the previous
+        version are never read again (even from the in-process L1) and other namespaces are untouched.
+        """
+        self.assertEqual(await self.get_products(limit=10), {"limit": 10, "build": 1})
+        self.assertEqual(await self.get_product(pk="p1"), {"pk": "p1", "build": 2})
+        self.assertEqual(await self.get_products(limit=10), {"limit": 10, "build": 1})
+        old_keys = set(await self.redis.keys("test:inventory.products:v0:*"))
+
+        await clear_cache_by_namespace("inventory.products")
+
+        self.assertEqual(await self.get_products(limit=10), {"limit": 10, "build": 3})
+        self.assertEqual(await self.get_product(pk="p1"), {"pk": "p1", "build": 2})
+        self.assertEqual(await self.redis.get("test:inventory.products:version"), "1")
+        self.assertEqual(len(await self.redis.keys("test:inventory.products:v1:*")), 1)
+        # * old entries aren't deleted, they expire through their TTL
+        self.assertEqual(set(await self.redis.keys("test:inventory.products:v0:*")), old_keys)
+
+    async def test_clear_by_pk_uses_the_current_version(self) -> None:
+        """
+        Test that clearing a product entry targets the key of the current namespace version.
+        """
+        await clear_cache_by_namespace("inventory.product")
+        await self.get_product(pk="p1")
+        self.assertTrue(await self.redis.exists("test:inventory.product:v1:p1"))
+
+        await clear_cache_by_pk("p1", namespace="inventory.product")
+
+        self.assertFalse(await self.redis.exists("test:inventory.product:v1:p1"))
+        self.assertEqual(await self.get_product(pk="p1"), {"pk": "p1", "build": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
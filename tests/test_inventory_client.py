@@ -0,0 +1,83 @@
+import unittest
+
+import httpx
+
+from payment.app.exceptions.custom_exceptions import InventoryUnavailableException
+from payment.app.services.inventory_client import CircuitBreaker, InventoryClient
+
+
+class Inventory:
+    """
+    Fake inventory API answering with a queue of status codes, 200 once exhausted.
+    """
+
+    def __init__(self, *statuses: int) -> None:
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status == 0:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(status, json={"id": request.url.path.rsplit("/", 1)[-1], "quantity": 3})
+
+
+class TestInventoryClient(unittest.IsolatedAsyncioTestCase):
+    async def make_client(self, inventory: Inventory, breaker: CircuitBreaker | None = None) -> InventoryClient:
+        client = InventoryClient(base_url="http://inventory", breaker=breaker, transport=httpx.MockTransport(inventory))
+        await client.start()
+        self.addAsyncCleanup(client.aclose)
+        return client
+
+    async def test_transient_errors_are_retried(self) -> None:
+        """
+        Test that connection errors and 5xx responses are retried within the retry budget.
+        """
+        inventory = Inventory(0, 503)
+        client = await self.make_client(inventory)
+
+        product = await client.get_product("pk1")
+
+        self.assertEqual(product, {"id": "pk1", "quantity": 3})
+        self.assertEqual(inventory.calls, 3)
+
+    async def test_unknown_product_is_not_a_failure(self) -> None:
+        """
+        Test that a 404 returns None without retrying or counting against the breaker.
+        """
+        inventory = Inventory(404)
+        breaker = CircuitBreaker(failure_threshold=1)
+        client = await self.make_client(inventory, breaker)
+
+        self.assertIsNone(await client.get_product("missing"))
+        self.assertEqual(inventory.calls, 1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_breaker_fails_fast_once_open(self) -> None:
+        """
+        Test that the breaker opens after consecutive failed calls and then skips the network.
+        """
+        inventory = Inventory(*[500] * 6)
+        client = await self.make_client(inventory, CircuitBreaker(failure_threshold=2, reset_timeout_s=60))
+
+        for _ in range(3):
+            with self.assertRaises(InventoryUnavailableException):
+                await client.get_product("pk1")
+
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(inventory.calls, 6)  # the third call never left the process
+
+    async def test_breaker_closes_after_successful_probe(self) -> None:
+        """
+        Test that once the reset timeout passed, a successful probe closes the breaker.
+        """
+        inventory = Inventory(500, 500, 500)
+        client = await self.make_client(inventory, CircuitBreaker(failure_threshold=1, reset_timeout_s=0))
+
+        with self.assertRaises(InventoryUnavailableException):
+            await client.get_product("pk1")
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+        self.assertIsNotNone(await client.get_product("pk1"))
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
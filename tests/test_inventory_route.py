@@ -1,8 +1,22 @@
+import asyncio
 import unittest
+from unittest import mock
 
+import httpx
+from fakeredis import FakeAsyncRedis, FakeServer
 from fastapi.testclient import TestClient
+from fastapi_cache import FastAPICache
 
+from inventory.app.db.l1_cache import L1RedisBackend
+from inventory.app.db.redis import CustomJsonCoder
+from inventory.app.db.repository import ProductRepository
 from inventory.app.main import app
+from inventory.app.models.models import PRODUCTS_BATCH_GET_MAX
+from inventory.app.routes.route import inventory_service
+from inventory.app.services import service, utils
+from inventory.app.services.bulk_import import BULK_IMPORT_MAX_LINE_BYTES, parse_import
+from inventory.app.services.utils import product_cache_key, versioned_key_builder
+from tests.test_bulk_import import body
 
 # from httpx import ASGITransport
 
@@ -25,3 +39,184 @@ class TestRouter(unittest.TestCase):
         response = self.client.get("/group/")
         self.assertEqual(response.status_code, 404)
         self.assertDictEqual(response.json(), {"detail": "Not Found"})
+
+    def test_products_page_limit_validation(self) -> None:
+        """
+        Test that out of range page sizes are rejected before touching Redis.
+        """
+        response = self.client.get("/inventory/products", params={"limit": 0})
+        self.assertEqual(response.status_code, 422)
+
+        response = self.client.get("/inventory/products", params={"cursor": -1})
+        self.assertEqual(response.status_code, 422)
+
+    def test_bulk_import_rejects_unsupported_content_type(self) -> None:
+        """
+        Test that a bulk import body that is neither NDJSON nor CSV is rejected before touching Redis.
+        """
+        response = self.client.post(
+            "/inventory/products/bulk", content=b"<products/>", headers={"Content-Type": "application/xml"}
+        )
+        self.assertEqual(response.status_code, 415)
+
+    def test_bulk_import_rejects_oversized_lines(self) -> None:
+        """
+        Test that a bulk import line over the length cap is rejected with a 422.
+        """
+        response = self.client.post(
+            "/inventory/products/bulk",
+            content=b"x" * (BULK_IMPORT_MAX_LINE_BYTES + 1),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("line 1", response.json()["detail"])
+
+    def test_batch_get_requires_pks(self) -> None:
+        """
+        Test that a batch lookup without pks, or with too many, is rejected before touching Redis.
+        """
+        response = self.client.post("/inventory/products/batch-get", json={"pks": []})
+        self.assertEqual(response.status_code, 422)
+
+        pks = [str(pk) for pk in range(PRODUCTS_BATCH_GET_MAX + 1)]
+        response = self.client.post("/inventory/products/batch-get", json={"pks": pks})
+        self.assertEqual(response.status_code, 422)
+
+
+class TestCatalogRoutes(unittest.IsolatedAsyncioTestCase):
+    """
+    Routes run against a fake Redis holding both the products and the cache.
+    """
+
+    async def asyncSetUp(self) -> None:
+        self.redis = FakeAsyncRedis(decode_responses=True)
+        self.repository = ProductRepository(self.redis)
+        self.init_cache(self.redis)
+        self.addCleanup(FastAPICache.reset)
+        for module in (service, utils):
+            patch = mock.patch.object(module, "product_repository", self.repository)
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://test")
+        self.addAsyncCleanup(self.client.aclose)
+
+    @staticmethod
+    def init_cache(redis: FakeAsyncRedis) -> None:
+        # init is a no-op once initialized, e.g. by importing the inventory consumer
+        FastAPICache.reset()
+        FastAPICache.init(
+            L1RedisBackend(redis), prefix="test", coder=CustomJsonCoder, key_builder=versioned_key_builder
+        )
+
+    async def all_pks(self) -> list[str]:
+        return [pk async for pk in self.repository.all_pks()]
+
+    async def seed(self, count: int) -> list[str]:
+        pks = [f"p{i:03}" for i in range(count)]
+        for pk in pks:
+            await self.redis.hset(self.repository.key(pk), mapping={"name": pk, "price": 2, "quantity": 5})
+        return pks
+
+    async def test_pages_walk_the_whole_catalog_once(self) -> None:
+        """
+        Test that following X-Next-Cursor until 0 returns every product exactly once.
+        """
+        # * cache on its own server: fakeredis maps SCAN cursors through the current key count, so cache keys
+        # written between pages would shift them (real Redis cursors survive a growing keyspace)
+        self.init_cache(FakeAsyncRedis(server=FakeServer(), decode_responses=True))
+        pks = await self.seed(250)
+        # * keys SCAN must skip: non-hash keys under the product prefix and other models
+        await self.redis.set(f"{self.repository.key_prefix()}not-a-hash", 1)
+        await self.redis.hset("fastcart:inventory.Other:1", mapping={"name": "x"})
+
+        seen: list[str] = []
+        cursor, pages = "0", 0
+        while True:
+            response = await self.client.get("/inventory/products", params={"cursor": cursor, "limit": 40})
+            self.assertEqual(response.status_code, 200)
+            seen.extend(product["id"] for product in response.json())
+            cursor, pages = response.headers["X-Next-Cursor"], pages + 1
+            if cursor == "0":
+                break
+
+        self.assertEqual(sorted(seen), pks)
+        self.assertGreater(pages, 1)
+
+    async def test_batch_get_mixes_cached_uncached_and_unknown_pks(self) -> None:
+        """
+        Test that a batch lookup serves cached products from the cache, fetches the others, writes
+        them back, and returns the found products in request order along with the missing pks.
+        """
+        await self.seed(3)
+        await self.client.post("/inventory/products/batch-get", json={"pks": ["p001"]})
+        # * changed behind the cache's back, the cached copy is what gets served
+        await self.redis.hset(self.repository.key("p001"), "quantity", 1)
+        self.assertFalse(await self.redis.exists(product_cache_key("p000", 0)))
+
+        response = await self.client.post(
+            "/inventory/products/batch-get", json={"pks": ["p002", "unknown", "p001", "p000", "p002"]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        products = response.json()["products"]
+        self.assertEqual(
+            [(product["id"], product["quantity"]) for product in products],
+            [
+                ("p002", 5),
+                ("p001", 5),
+                ("p000", 5),
+            ],
+        )
+        self.assertEqual(response.json()["missing"], ["unknown"])
+        for pk in ("p000", "p002"):
+            self.assertEqual(CustomJsonCoder.decode(await self.redis.get(product_cache_key(pk, 0)))["id"], pk)
+        self.assertFalse(await self.redis.exists(product_cache_key("unknown", 0)))
+
+    async def test_bulk_import_writes_valid_rows_and_invalidates_the_catalog(self) -> None:
+        """
+        Test that a bulk import stores the valid rows in chunks, with generated pks where missing,
+        reports the invalid ones, and invalidates the cached catalog (and products, on overwrites).
+        """
+        await self.seed(1)
+        self.assertEqual(len((await self.client.get("/inventory/products")).json()), 1)
+        save_documents = mock.AsyncMock(side_effect=self.repository.save_documents)
+        ndjson = (
+            b'{"name": "a", "price": 1.5, "quantity": 2}\n'
+            b'{"name": "b", "price": "x", "quantity": 1}\n'
+            b'{"name": "c", "price": 3, "quantity": 4}\n'
+            b'{"name": "d", "price": 4, "quantity": 5}\n'
+        )
+
+        with mock.patch.object(self.repository, "save_documents", save_documents):
+            report = await inventory_service.bulk_add_products(
+                parse_import(body(ndjson), "application/x-ndjson"), chunk_size=2
+            )
+
+        self.assertEqual([len(call.args[0]) for call in save_documents.await_args_list], [1, 2])
+        self.assertEqual(report.as_dict()["imported"], 3)
+        self.assertEqual([error["row"] for error in report.as_dict()["errors"]], [2])
+        self.assertEqual(await self.redis.get("test:inventory.products:version"), "1")
+        # * the previous page is served while it is rebuilt
+        self.assertEqual((await self.client.get("/inventory/products")).headers["X-Cache-Stale"], "true")
+        await asyncio.sleep(0.05)
+        self.assertEqual(len((await self.client.get("/inventory/products")).json()), 4)
+        stored = {product.name: product for product in await self.repository.get_many(await self.all_pks())}
+        self.assertEqual(sorted(stored), ["a", "c", "d", "p000"])
+        self.assertEqual((stored["a"].price, stored["a"].quantity, len(stored["a"].pk)), (1.5, 2, 26))
+
+        response = await self.client.post(
+            "/inventory/products/bulk",
+            content=b"pk,name,price,quantity\np000,renamed,9,1\n,missing pk and price,,1\n",
+            headers={"Content-Type": "text/csv"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.json()[key] for key in ("imported", "failed", "errors_truncated")},
+            {"imported": 1, "failed": 1, "errors_truncated": False},
+        )
+        self.assertEqual(response.json()["errors"][0]["row"], 3)
+        product = await self.repository.get("p000")
+        self.assertEqual((product.name, product.price, product.quantity), ("renamed", 9.0, 1))
+        self.assertEqual(await self.redis.get("test:inventory.products:version"), "2")
+        self.assertEqual(await self.redis.get("test:inventory.product:version"), "1")
@@ -0,0 +1,34 @@
+import time
+import unittest
+
+from inventory.app.db.l1_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self) -> None:
+        """
+        Test that the entry count limit evicts the least recently used entry.
+        """
+        cache = LRUCache(max_entries=2, max_bytes=1024, ttl=60)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+        cache.get("a")
+        cache.set("c", b"3")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a")[1], b"1")  # type: ignore[index]
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_byte_limit_and_ttl(self) -> None:
+        """
+        Test that the byte size limit evicts entries and that expired entries miss.
+        """
+        cache = LRUCache(max_entries=10, max_bytes=4, ttl=60)
+        cache.set("a", b"12")
+        cache.set("b", b"345")
+        self.assertIsNone(cache.get("a"))
+
+        cache.set("c", b"6", ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual(cache.stats()["expirations"], 1)
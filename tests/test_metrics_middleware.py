@@ -0,0 +1,133 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+
+from fakeredis import FakeAsyncRedis
+from fastapi.testclient import TestClient
+
+from inventory.app.main import app
+from inventory.app.middleware.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    REDIS_BLOCKING_READ_DURATION,
+    REDIS_COMMAND_DURATION,
+    Histogram,
+    InstrumentedRedis,
+    Metric,
+    MetricsMiddleware,
+)
+
+# * budget of the instrumentation per request
+MAX_OVERHEAD_S = 50e-6
+ROUTE = SimpleNamespace(path="/inventory/product/{pk}")
+
+
+async def bare_app(scope, receive, send) -> None:
+    scope["route"] = ROUTE
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive() -> dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message: dict) -> None:
+    pass
+
+
+async def time_requests(asgi_app, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        await asgi_app({"type": "http", "method": "GET", "path": "/inventory/product/1"}, receive, send)
+    return time.perf_counter() - started
+
+
+class TestMetricsMiddleware(unittest.TestCase):
+    def test_overhead_per_request(self) -> None:
+        """
+        Test that the middleware adds less than 50µs per request (best of several rounds, to ignore noise).
+        """
+        requests = 5000
+        instrumented = MetricsMiddleware(bare_app)
+
+        async def overhead() -> float:
+            bare = min([await time_requests(bare_app, requests) for _ in range(5)])
+            wrapped = min([await time_requests(instrumented, requests) for _ in range(5)])
+            return (wrapped - bare) / requests
+
+        self.assertLess(asyncio.run(overhead()), MAX_OVERHEAD_S)
+        self.assertEqual(sum(HTTP_REQUEST_DURATION.values[("GET", ROUTE.path, "200")][:-1]), 5 * requests)
+        self.assertEqual(HTTP_REQUESTS_IN_FLIGHT.values[()], 0)
+
+    def test_histogram_render(self) -> None:
+        """
+        Test that bucket counts are cumulative and labels are escaped in the exposition format.
+        """
+        histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, ('/a"b',))
+
+        lines = list(histogram.render())
+
+        self.assertEqual(lines[:2], ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"])
+        self.assertEqual(
+            lines[2:],
+            [
+                'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+                'latency_seconds_bucket{route="/a\\"b",le="1.0"} 3',
+                'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+                'latency_seconds_sum{route="/a\\"b"} 6.05',
+                'latency_seconds_count{route="/a\\"b"} 4',
+            ],
+        )
+
+    def test_metric_types_must_render(self) -> None:
+        """
+        Test that the metric base class can't be used without a `render`.
+        """
+        with self.assertRaises(TypeError):
+            Metric("untyped", "No render")  # type: ignore[abstract]
+
+    def test_blocking_stream_reads_are_recorded_apart(self) -> None:
+        """
+        Test that XREADGROUP with BLOCK doesn't land in the command latency histogram.
+        """
+
+        def count(histogram: Histogram, command: str) -> int:
+            return sum(histogram.values.get((command,), [0, 0.0])[:-1])
+
+        async def read() -> None:
+            client = InstrumentedRedis(connection_pool=FakeAsyncRedis(decode_responses=True).connection_pool)
+            await client.xgroup_create("metrics_stream", "group", id="0", mkstream=True)
+            await client.xreadgroup("group", "consumer", {"metrics_stream": ">"}, count=1)
+            await client.xreadgroup("group", "consumer", {"metrics_stream": ">"}, count=1, block=20)
+
+        commands, blocking = count(REDIS_COMMAND_DURATION, "XREADGROUP"), count(
+            REDIS_BLOCKING_READ_DURATION, "XREADGROUP"
+        )
+        asyncio.run(read())
+
+        self.assertEqual(count(REDIS_COMMAND_DURATION, "XREADGROUP") - commands, 1)
+        self.assertEqual(count(REDIS_BLOCKING_READ_DURATION, "XREADGROUP") - blocking, 1)
+
+    def test_metrics_endpoint_labels_route_templates(self) -> None:
+        """
+        Test that GET /metrics serves the text format with requests labelled by route template.
+        """
+        client = TestClient(app)
+        client.get("/inventory/products", params={"limit": 0})
+        client.get("/no/such/route")
+
+        response = client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('route="/inventory/products",status="422"', response.text)
+        self.assertIn('route="unmatched",status="404"', response.text)
+        self.assertIn("# TYPE fastapi_cache_lookups_total counter", response.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+
+from fakeredis import FakeAsyncRedis
+
+from inventory.app.db import consumer
+from inventory.app.db.consumer import consume_order_completed
+from inventory.app.db.repository import ProductRepository
+
+
+def order_event(order_id: int, product_id: str, quantity: int) -> dict:
+    return {"order_id": str(order_id), "product_id": product_id, "order_quantity": str(quantity)}
+
+
+class TestOrderCompletedConsumer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = ProductRepository(FakeAsyncRedis(decode_responses=True))
+        await self.repository.redis.hset(self.repository.key("p1"), mapping={"name": "a", "price": 2, "quantity": 10})
+        await self.repository.redis.hset(self.repository.key("p2"), mapping={"name": "b", "price": 2, "quantity": 1})
+        self.refunds = mock.AsyncMock()
+        self.write_through = mock.AsyncMock()
+        self.patches = [
+            mock.patch.object(consumer, "product_repository", self.repository),
+            mock.patch.object(consumer.StreamService, "stream_order_refund", self.refunds),
+            mock.patch.object(consumer, "write_through_products", self.write_through),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    async def asyncTearDown(self) -> None:
+        for patch in self.patches:
+            patch.stop()
+
+    async def stock(self, pk: str) -> int:
+        return int(await self.repository.redis.hget(self.repository.key(pk), "quantity"))  # type: ignore[arg-type]
+
+    async def test_orders_of_a_product_are_coalesced(self) -> None:
+        """
+        Test that orders of a product are checked in order against the remaining stock and written once.
+        """
+        entries = [
+            ("1-0", order_event(1, "p1", 4)),
+            ("2-0", order_event(2, "p2", 2)),
+            ("3-0", order_event(3, "p1", 5)),
+            ("4-0", order_event(4, "p1", 3)),
+            ("5-0", order_event(5, "missing", 1)),
+            ("6-0", {"product_id": "p1"}),
+        ]
+
+        ack_ids = await consume_order_completed(entries)
+
+        self.assertEqual(sorted(ack_ids), ["1-0", "2-0", "3-0", "4-0", "5-0", "6-0"])
+        self.assertEqual((await self.stock("p1"), await self.stock("p2")), (1, 1))
+        refunded = sorted(call.args[0]["order_id"] for call in self.refunds.await_args_list)
+        self.assertEqual(refunded, ["2", "4", "5"])
+        self.assertEqual([product.pk for product in self.write_through.await_args.args[0]], ["p1"])  # type: ignore
+
+    async def test_redelivery_after_failed_write_through_does_not_decrement_twice(self) -> None:
+        """
+        Test that a failing cache write-through still acknowledges the batch, and that the same
+        orders delivered again (reclaimed, or republished under new entry ids) take no stock.
+        """
+        self.write_through.side_effect = ConnectionError("cache unavailable")
+        entries = [("1-0", order_event(1, "p1", 4)), ("2-0", order_event(2, "p2", 2))]
+
+        self.assertEqual(sorted(await consume_order_completed(entries)), ["1-0", "2-0"])
+        self.assertEqual(sorted(await consume_order_completed(entries)), ["1-0", "2-0"])
+        republished = [("9-0", order_event(1, "p1", 4))]
+        self.assertEqual(await consume_order_completed(republished), ["9-0"])
+
+        self.assertEqual((await self.stock("p1"), await self.stock("p2")), (6, 1))
+        # * an order refunded the first time is refunded again, payment ignores already refunded orders
+        self.assertEqual([call.args[0]["order_id"] for call in self.refunds.await_args_list], ["2", "2"])
+
+    async def test_outbox_duplicates_in_one_batch_take_stock_once(self) -> None:
+        """
+        Test that an event the outbox relay published twice (same order, new outbox entry) is applied once,
+        even when both copies land in the same batch.
+        """
+        entries = [
+            ("1-0", {**order_event(1, "p1", 4), "outbox_id": "1"}),
+            ("2-0", {**order_event(1, "p1", 4), "outbox_id": "1"}),
+        ]
+
+        self.assertEqual(sorted(await consume_order_completed(entries)), ["1-0", "2-0"])
+        self.assertEqual(await self.stock("p1"), 6)
+        self.refunds.assert_not_awaited()
+
+    async def test_non_positive_quantities_are_dropped(self) -> None:
+        """
+        Test that orders of zero or negative quantity are acknowledged as malformed without touching the stock.
+        """
+        entries = [("1-0", order_event(1, "p1", 0)), ("2-0", order_event(2, "p1", -3))]
+
+        self.assertEqual(sorted(await consume_order_completed(entries)), ["1-0", "2-0"])
+        self.assertEqual(await self.stock("p1"), 10)
+        self.assertFalse(await self.repository.redis.exists(self.repository.applied_order_key("1")))
+        self.refunds.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    unittest.main()
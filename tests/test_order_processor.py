@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from payment.app.db import order_processor
+from payment.app.db.order_processor import consume_order_processing
+from payment.app.models.models import Order, OrderOutbox
+from payment.app.services.service import OrderService
+from payment.app.services.stream_service import ORDER_PROCESSING_STREAM
+
+
+class RecordingSession:
+    """
+    Fake session recording what is added, and when it is flushed and committed.
+    """
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, object]] = []
+
+    def add(self, obj: object) -> None:
+        self.calls.append(("add", obj))
+
+    async def flush(self) -> None:
+        for _, obj in self.calls:
+            if isinstance(obj, Order):
+                obj.order_id = 7
+        self.calls.append(("flush", None))
+
+    async def commit(self) -> None:
+        self.calls.append(("commit", None))
+
+    async def refresh(self, obj: object) -> None:
+        pass
+
+
+class TestOrderProcessor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        # the semaphore is created lazily on the running loop, one per test
+        order_processor._slots = None
+        self.addCleanup(setattr, order_processor, "_slots", None)
+
+    async def test_jobs_run_within_the_concurrency_limit(self) -> None:
+        """
+        Test that no more than ORDER_PROCESSING_CONCURRENCY orders are processed at once.
+        """
+        running = peak = 0
+
+        async def process_order(order_id: int) -> None:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        entries = [(f"{i}-0", {"order_id": str(i)}) for i in range(10)]
+        with mock.patch.object(order_processor, "ORDER_PROCESSING_CONCURRENCY", 3), mock.patch(
+            "payment.app.services.process_service.ProcessService.process_order", side_effect=process_order
+        ):
+            ack_ids = await consume_order_processing(entries)
+
+        self.assertEqual(ack_ids, [entry_id for entry_id, _ in entries])
+        self.assertEqual(peak, 3)
+
+    async def test_failed_jobs_stay_pending(self) -> None:
+        """
+        Test that failed jobs aren't acknowledged while malformed ones are dropped.
+        """
+
+        async def process_order(order_id: int) -> None:
+            if order_id == 2:
+                raise ConnectionError("database unavailable")
+
+        entries = [("1-0", {"order_id": "1"}), ("2-0", {"order_id": "2"}), ("3-0", {"order_id": "x"})]
+        with mock.patch("payment.app.services.process_service.ProcessService.process_order", side_effect=process_order):
+            ack_ids = await consume_order_processing(entries)
+
+        self.assertEqual(ack_ids, ["1-0", "3-0"])
+
+    async def test_new_order_is_queued_in_its_transaction(self) -> None:
+        """
+        Test that the processing job of a new order is written to the outbox before the order is committed.
+        """
+        session = RecordingSession()
+        order = Order(product_id="p1", price=10, fee_per_unit=2, total=12, order_quantity=1, status="pending")
+
+        await OrderService.create_order(order, session, queue_processing=True)  # type: ignore[arg-type]
+
+        self.assertEqual([call for call, _ in session.calls], ["add", "flush", "add", "commit"])
+        event = session.calls[2][1]
+        assert isinstance(event, OrderOutbox)
+        self.assertEqual((event.stream, event.payload), (ORDER_PROCESSING_STREAM, {"order_id": 7}))
+
+
+if __name__ == "__main__":
+    unittest.main()
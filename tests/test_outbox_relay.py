@@ -0,0 +1,98 @@
+import unittest
+from unittest import mock
+
+from payment.app.db.outbox_relay import OutboxRelay
+from payment.app.models.models import OrderOutbox
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.commits = 0
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+
+class FakePipeline:
+    """
+    Fake redis.asyncio pipeline recording queued XADDs, optionally failing on execute.
+    """
+
+    def __init__(self, redis: "FakeRedis") -> None:
+        self.redis = redis
+        self.queued: list[tuple[str, dict]] = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    def xadd(self, name: str, fields: dict, id: str = "*") -> None:
+        self.queued.append((name, fields))
+
+    async def execute(self) -> list[str]:
+        if self.redis.fail:
+            raise ConnectionError("redis unavailable")
+        self.redis.round_trips += 1
+        self.redis.entries.extend(self.queued)
+        return [f"{i}-0" for i in range(len(self.queued))]
+
+
+class FakeRedis:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.round_trips = 0
+        self.entries: list[tuple[str, dict]] = []
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+
+def outbox_events(count: int) -> list[OrderOutbox]:
+    return [OrderOutbox(id=i, stream="order_completed", payload={"order_id": i}) for i in range(1, count + 1)]
+
+
+class TestOutboxRelay(unittest.IsolatedAsyncioTestCase):
+    async def test_batch_is_published_in_one_round_trip(self) -> None:
+        """
+        Test that a batch becomes one pipelined round trip of XADDs and is then marked published.
+        """
+        session, redis = FakeSession(), FakeRedis()
+        relay = OutboxRelay(session_factory=lambda: session, redis_client=redis, batch_size=3)  # type: ignore[arg-type]
+
+        with mock.patch.object(
+            OutboxRelay, "claim_batch", mock.AsyncMock(return_value=outbox_events(3))
+        ), mock.patch.object(OutboxRelay, "mark_published", mock.AsyncMock()) as mark_published:
+            self.assertEqual(await relay.relay_batch(), 3)
+
+        self.assertEqual(redis.round_trips, 1)
+        self.assertEqual(redis.entries[0], ("order_completed", {"order_id": 1, "outbox_id": 1}))
+        self.assertEqual(mark_published.await_args.args[1], [1, 2, 3])  # type: ignore[union-attr]
+        self.assertEqual(session.commits, 1)
+
+    async def test_failed_publish_leaves_events_unpublished(self) -> None:
+        """
+        Test that events are not marked published (nor committed) when the XADDs fail.
+        """
+        session, redis = FakeSession(), FakeRedis(fail=True)
+        relay = OutboxRelay(session_factory=lambda: session, redis_client=redis)  # type: ignore[arg-type]
+
+        with mock.patch.object(
+            OutboxRelay, "claim_batch", mock.AsyncMock(return_value=outbox_events(2))
+        ), mock.patch.object(OutboxRelay, "mark_published", mock.AsyncMock()) as mark_published:
+            with self.assertRaises(ConnectionError):
+                await relay.relay_batch()
+
+        mark_published.assert_not_awaited()
+        self.assertEqual(session.commits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
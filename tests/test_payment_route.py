@@ -0,0 +1,100 @@
+import datetime
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from payment.app.db.postgresql import get_db
+from payment.app.main import app
+from payment.app.models.models import Order, OrderFilter, OrderOutbox
+from payment.app.services.service import OrderService
+from tests.test_order_processor import RecordingSession
+
+
+class TestOrdersRouter(unittest.TestCase):
+    client: TestClient
+
+    @classmethod
+    def setup_class(cls) -> None:
+        """
+        Setup the test client, without the lifespan (no database needed).
+        """
+        cls.client = TestClient(app)
+
+    def test_orders_page_validation(self) -> None:
+        """
+        Test that out of range page parameters are rejected before touching the database.
+        """
+        response = self.client.get("/orders/", params={"limit": 0})
+        self.assertEqual(response.status_code, 422)
+
+        response = self.client.get("/orders/", params={"after": -1})
+        self.assertEqual(response.status_code, 422)
+
+        response = self.client.get("/orders/export", params={"created_from": "yesterday"})
+        self.assertEqual(response.status_code, 422)
+
+    def test_order_filters(self) -> None:
+        """
+        Test that only the given filters become WHERE clauses.
+        """
+        self.assertEqual(OrderService.filter_orders(OrderFilter()), [])
+
+        clauses = OrderService.filter_orders(
+            OrderFilter(status="pending", created_from=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+        )
+        sql = [str(clause.compile(dialect=postgresql.dialect())) for clause in clauses]
+        self.assertEqual(sql, ['"order".status = %(status_1)s', '"order".created_at >= %(created_at_1)s'])
+
+    def test_transition_validation(self) -> None:
+        """
+        Test that empty batches and transitions between unlinked statuses are rejected before touching the database.
+        """
+        response = self.client.post(
+            "/orders/transitions", json={"order_ids": [], "from_status": "pending", "to_status": "completed"}
+        )
+        self.assertEqual(response.status_code, 422)
+
+        response = self.client.post(
+            "/orders/transitions", json={"order_ids": [1, 2], "from_status": "pending", "to_status": "refunded"}
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["detail"]["to_status"], "refunded")
+
+    def test_completed_transitions_write_outbox_events(self) -> None:
+        """
+        Test that orders completed through the endpoint get their order_completed event in the same commit.
+        """
+        orders = [
+            Order(
+                order_id=order_id,
+                product_id="p1",
+                price=2,
+                fee_per_unit=0.4,
+                total=2.4,
+                order_quantity=1,
+                status="completed",
+            )
+            for order_id in (1, 3)
+        ]
+        session = RecordingSession()
+        transition = mock.AsyncMock(return_value=orders)
+        app.dependency_overrides[get_db] = lambda: session
+        self.addCleanup(app.dependency_overrides.clear)
+
+        with mock.patch.object(OrderService, "transition_orders", transition):
+            response = self.client.post(
+                "/orders/transitions", json={"order_ids": [1, 2, 3], "from_status": "pending", "to_status": "completed"}
+            )
+
+        self.assertEqual(response.json(), {"transitioned": [1, 3], "skipped": [2]})
+        self.assertFalse(transition.await_args.kwargs["commit"])  # type: ignore[union-attr]
+        events = [obj for call, obj in session.calls if call == "add"]
+        self.assertEqual([event.payload["order_id"] for event in events], [1, 3])  # type: ignore[attr-defined]
+        self.assertTrue(all(isinstance(event, OrderOutbox) for event in events))
+        self.assertEqual(session.calls[-1], ("commit", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from unittest import mock
+
+from fakeredis import FakeAsyncRedis
+from redis_om.model.model import NotFoundError
+
+from inventory.app.db.repository import (
+    DECREMENT_INSUFFICIENT,
+    DECREMENT_NOT_FOUND,
+    DECREMENT_OK,
+    PRODUCT_CHANGES_STREAM,
+    ProductRepository,
+)
+from inventory.app.models.models import UpdateProduct
+from inventory.app.routes.route import inventory_service
+from inventory.app.services import service
+
+
+class TestProductRepository(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.repository = ProductRepository(FakeAsyncRedis(decode_responses=True))
+        await self.repository.redis.hset(self.repository.key("p1"), mapping={"name": "a", "price": 2, "quantity": 5})
+
+    async def test_decrement_statuses(self) -> None:
+        """
+        Test that orders are checked against the stock left by the previous ones and that
+        refused or unknown orders leave the stock untouched.
+        """
+        self.assertEqual(await self.repository.decrement_quantity("p1", "1", 3), (DECREMENT_OK, 2))
+        self.assertEqual(await self.repository.decrement_quantity("p1", "2", 3), (DECREMENT_INSUFFICIENT, 2))
+        self.assertEqual(await self.repository.decrement_quantity("p1", "3", 2), (DECREMENT_OK, 0))
+        self.assertEqual(await self.repository.decrement_quantity("missing", "4", 1), (DECREMENT_NOT_FOUND, -1))
+        self.assertFalse(await self.repository.redis.exists(self.repository.key("missing")))
+
+        results = await self.repository.decrement_quantities({"p1": [("1", 3), ("5", 1)]})
+        self.assertEqual(results, {"p1": ([DECREMENT_OK, DECREMENT_INSUFFICIENT], 0)})
+
+    async def test_update_keeps_concurrent_decrement(self) -> None:
+        """
+        Test that an update without `quantity` doesn't write back the stock it never read, and
+        that every write is published to the change stream.
+        """
+        await self.repository.decrement_quantity("p1", "1", 2)
+
+        product = await self.repository.update("p1", {"name": "b", "price": 3.5})
+
+        self.assertEqual((product.name, product.price, product.quantity), ("b", 3.5, 3))
+        stored = await self.repository.get("p1")
+        self.assertEqual((stored.name, stored.quantity), ("b", 3))
+        changes = await self.repository.redis.xrange(PRODUCT_CHANGES_STREAM)
+        self.assertEqual(changes[-1][1]["quantity"], "3")
+
+        with self.assertRaises(NotFoundError):
+            await self.repository.update("missing", {"name": "b"})
+        self.assertFalse(await self.repository.redis.exists(self.repository.key("missing")))
+
+    async def test_put_writes_only_the_fields_it_received(self) -> None:
+        """
+        Test that PUT /inventory/product/{pk} only sends the fields set in the request.
+        """
+        update = mock.AsyncMock(side_effect=self.repository.update)
+
+        with mock.patch.object(service, "product_repository", mock.Mock(update=update)), mock.patch.object(
+            service, "write_through_products", mock.AsyncMock()
+        ):
+            product = await inventory_service.update_product_by_pk("p1", UpdateProduct(price=4))
+
+        update.assert_awaited_once_with("p1", {"price": 4.0})
+        self.assertEqual((product.price, product.quantity), (4.0, 5))
+
+    async def test_page_skips_products_deleted_after_the_scan(self) -> None:
+        """
+        Test that a key deleted between SCAN and the pipelined HGETALL is left out of the page.
+        """
+        await self.repository.redis.hset(self.repository.key("p2"), mapping={"name": "b", "price": 2, "quantity": 1})
+        scan = self.repository.redis.scan
+
+        async def scan_then_delete(*args, **kwargs):
+            result = await scan(*args, **kwargs)
+            await self.repository.redis.delete(self.repository.key("p2"))
+            return result
+
+        with mock.patch.object(self.repository.redis, "scan", scan_then_delete):
+            products, cursor = await self.repository.page(limit=10)
+
+        self.assertEqual(([product.pk for product in products], cursor), (["p1"], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
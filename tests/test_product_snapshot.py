@@ -0,0 +1,81 @@
+import json
+import unittest
+
+import httpx
+
+from payment.app.services.inventory_client import InventoryClient
+from payment.app.services.product_snapshot import ProductSnapshot
+
+
+class StreamInfo:
+    """
+    Fake Redis answering XINFO STREAM with fixed stream info.
+    """
+
+    def __init__(self, **info: str) -> None:
+        self.info = info
+
+    async def xinfo_stream(self, stream: str) -> dict:
+        return self.info
+
+
+def inventory_snapshot(request: httpx.Request) -> httpx.Response:
+    products = [{"id": "pk1", "name": "shirt", "price": 10.0, "quantity": 4}]
+    if request.url.path == "/inventory/products/snapshot":
+        return httpx.Response(200, text="\n".join(json.dumps(product) for product in products))
+    return httpx.Response(200, json={"id": "pk2", "name": "hat", "price": 5.0, "quantity": 1})
+
+
+class TestProductSnapshot(unittest.IsolatedAsyncioTestCase):
+    async def make_snapshot(self, **info: str) -> ProductSnapshot:
+        client = InventoryClient(base_url="http://inventory", transport=httpx.MockTransport(inventory_snapshot))
+        await client.start()
+        self.addAsyncCleanup(client.aclose)
+        return ProductSnapshot(redis_client=StreamInfo(**info), client=client)  # type: ignore[arg-type]
+
+    async def test_bootstrap_starts_from_the_recorded_stream_position(self) -> None:
+        """
+        Test that the snapshot is loaded from inventory and follows the stream from before the load.
+        """
+        snapshot = await self.make_snapshot(**{"last-generated-id": "5-0"})
+
+        self.assertEqual(await snapshot.get_product("pk2"), {"id": "pk2", "name": "hat", "price": 5.0, "quantity": 1})
+        await snapshot.bootstrap()
+
+        self.assertTrue(snapshot.ready)
+        self.assertEqual(snapshot.last_id, "5-0")
+        self.assertEqual(
+            await snapshot.get_product("pk1"), {"id": "pk1", "name": "shirt", "price": 10.0, "quantity": 4}
+        )
+        self.assertIsNone(await snapshot.get_product("pk2"))
+
+    async def test_changes_are_applied_in_stream_order(self) -> None:
+        """
+        Test that upserts and deletes from the change stream replace the loaded state.
+        """
+        snapshot = await self.make_snapshot(**{"last-generated-id": "5-0"})
+        await snapshot.bootstrap()
+
+        snapshot.apply("6-0", {"op": "upsert", "pk": "pk1", "name": "shirt", "price": "10.0", "quantity": "2"})
+        snapshot.apply("7-0", {"op": "upsert", "pk": "pk3", "name": "sock", "price": "1.5", "quantity": "9"})
+        snapshot.apply("8-0", {"op": "delete", "pk": "pk3"})
+
+        self.assertEqual(snapshot.get("pk1").quantity, 2)  # type: ignore[union-attr]
+        self.assertEqual(snapshot.get("pk1").version, "6-0")  # type: ignore[union-attr]
+        self.assertIsNone(snapshot.get("pk3"))
+        self.assertEqual(snapshot.last_id, "8-0")
+
+    async def test_trimmed_entries_are_detected(self) -> None:
+        """
+        Test that entries trimmed from the stream before they were read require a new bootstrap.
+        """
+        snapshot = await self.make_snapshot(**{"max-deleted-entry-id": "9-0"})
+        snapshot.last_id = "8-0"
+        self.assertTrue(await snapshot.missed_entries())
+
+        snapshot.last_id = "9-0"
+        self.assertFalse(await snapshot.missed_entries())
+
+
+if __name__ == "__main__":
+    unittest.main()
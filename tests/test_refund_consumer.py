@@ -0,0 +1,52 @@
+import contextlib
+import unittest
+from unittest import mock
+
+from payment.app.db import consumer
+from payment.app.db.consumer import consume_order_refund
+from payment.app.models.models import Order
+
+
+def refunded_order(order_id: int) -> Order:
+    return Order(
+        order_id=order_id, product_id="p1", price=10, fee_per_unit=2, total=12, order_quantity=1, status="refunded"
+    )
+
+
+@contextlib.asynccontextmanager
+async def fake_session():
+    yield object()
+
+
+class TestRefundConsumer(unittest.IsolatedAsyncioTestCase):
+    async def test_batch_is_refunded_with_one_transition(self) -> None:
+        """
+        Test that a whole batch becomes a single status transition and every entry is acknowledged.
+        """
+        entries = [("1-0", {"order_id": "1"}), ("2-0", {"order_id": "2"}), ("3-0", {"order_id": "1"}), ("4-0", {})]
+        transition = mock.AsyncMock(return_value=[refunded_order(1)])
+
+        with mock.patch.object(consumer, "async_session_factory", fake_session), mock.patch.object(
+            consumer.OrderService, "transition_orders", transition
+        ):
+            ack_ids = await consume_order_refund(entries)
+
+        transition.assert_awaited_once()
+        self.assertEqual(transition.await_args.args[:3], ([1, 2], "completed", "refunded"))  # type: ignore[union-attr]
+        self.assertEqual(sorted(ack_ids), ["1-0", "2-0", "3-0", "4-0"])
+
+    async def test_failed_batch_is_not_acknowledged(self) -> None:
+        """
+        Test that a failing transaction leaves the batch pending for a retry.
+        """
+        transition = mock.AsyncMock(side_effect=ConnectionError("database unavailable"))
+
+        with mock.patch.object(consumer, "async_session_factory", fake_session), mock.patch.object(
+            consumer.OrderService, "transition_orders", transition
+        ):
+            with self.assertRaises(ConnectionError):
+                await consume_order_refund([("1-0", {"order_id": "1"})])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import asyncio
+import unittest
+
+from inventory.app.services.utils import single_flight
+
+
+class Loader:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    @single_flight
+    async def load(self, pk: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return f"product {pk}"
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_loader(self) -> None:
+        """
+        Test that concurrent calls with the same arguments run the loader once.
+        """
+        loader = Loader()
+        results = await asyncio.gather(*(loader.load("a") for _ in range(20)), loader.load("b"))
+
+        self.assertEqual(loader.calls, 2)
+        self.assertEqual(results[0], "product a")
+        self.assertEqual(results[-1], "product b")
+
+    async def test_sequential_calls_load_again(self) -> None:
+        """
+        Test that a finished call isn't reused by later ones.
+        """
+        loader = Loader()
+        await loader.load("a")
+        await loader.load("a")
+
+        self.assertEqual(loader.calls, 2)
@@ -0,0 +1,100 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from fakeredis import FakeAsyncRedis
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+
+from inventory.app.db.redis import CustomJsonCoder
+from inventory.app.services.utils import clear_cache_by_namespace, stale_while_revalidate
+
+
+class Catalog:
+    def __init__(self) -> None:
+        self.builds = 0
+        self.failing = False
+        # set to hold builds until it is set
+        self.gate: asyncio.Event | None = None
+
+    @stale_while_revalidate(namespace="catalog", expire=600, max_stale=30)
+    async def page(self, cursor: int) -> dict:
+        if self.failing:
+            raise ConnectionError("redis unavailable")
+        self.builds += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return {"build": self.builds}
+
+
+class TestStaleWhileRevalidate(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        # init is a no-op once initialized, e.g. by importing the inventory consumer
+        FastAPICache.reset()
+        FastAPICache.init(RedisBackend(FakeAsyncRedis(decode_responses=True)), prefix="test", coder=CustomJsonCoder)
+        self.addCleanup(FastAPICache.reset)
+        self.now = time.time()
+        clock = mock.patch.object(time, "time", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    async def invalidate_at(self, offset: float) -> None:
+        self.now += offset
+        await clear_cache_by_namespace("catalog")
+
+    async def test_serves_previous_result_while_rebuilding(self) -> None:
+        """
+        Test that an invalidated entry is served stale once and rebuilt in the background.
+        """
+        catalog = Catalog()
+        self.assertEqual(await catalog.page(0), {"build": 1, "stale": False})
+
+        await self.invalidate_at(1)
+        self.assertEqual(await catalog.page(0), {"build": 1, "stale": True})
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(await catalog.page(0), {"build": 2, "stale": False})
+
+    async def test_later_writes_do_not_extend_the_stale_window(self) -> None:
+        """
+        Test that, with the rebuild failing, the stale copy stops being served `max_stale` seconds
+        after the first invalidation, however many writes follow it.
+        """
+        catalog = Catalog()
+        await catalog.page(0)
+        catalog.failing = True
+
+        await self.invalidate_at(1)
+        self.assertTrue((await catalog.page(0))["stale"])
+        for _ in range(3):
+            await self.invalidate_at(10)
+            self.assertTrue((await catalog.page(0))["stale"])
+            await asyncio.sleep(0.01)
+        # * 31s after the first invalidation, 1s after the last one
+        await self.invalidate_at(1)
+
+        with self.assertRaises(ConnectionError):
+            await catalog.page(0)
+
+    async def test_invalidation_during_rebuild_leaves_the_result_stale(self) -> None:
+        """
+        Test that a result built across an invalidation counts as stale from that invalidation, so
+        it isn't served past `max_stale` seconds after it.
+        """
+        catalog = Catalog()
+        catalog.gate = asyncio.Event()
+        build = asyncio.create_task(catalog.page(0))
+        await asyncio.sleep(0.01)
+
+        await self.invalidate_at(1)
+        catalog.gate.set()
+        self.assertEqual(await build, {"build": 1, "stale": False})
+        catalog.gate = None
+
+        self.now += 31
+        self.assertEqual(await catalog.page(0), {"build": 2, "stale": False})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import time
+import unittest
+
+from payment.app.db.stream_monitor import StreamMonitor
+from payment.app.db.stream_runtime import processing_rate_key
+
+
+class FakeStreams:
+    """
+    Fake Redis answering the XINFO / XPENDING / HGETALL calls of the monitor for one group.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        now = time.time()
+        self.reports = {
+            "w1": json.dumps({"rate": 12.5, "processed": 100, "reported_at": now}),
+            "w2": json.dumps({"rate": 40.0, "processed": 900, "reported_at": now - 3600}),
+        }
+
+    async def xinfo_stream(self, stream: str) -> dict:
+        self.calls += 1
+        return {"length": 42, "last-generated-id": "2000-0"}
+
+    async def xinfo_groups(self, stream: str) -> list[dict]:
+        return [{"name": "payment_group", "pending": 3, "last-delivered-id": "1900-0", "lag": 7}]
+
+    async def xpending(self, stream: str, group: str) -> dict:
+        return {"pending": 3, "min": "1000-0"}
+
+    async def xinfo_consumers(self, stream: str, group: str) -> list[dict]:
+        return [{"name": "w1", "pending": 3, "idle": 15}, {"name": "w2", "pending": 0, "idle": 3600000}]
+
+    async def hgetall(self, key: str) -> dict:
+        return self.reports if key == processing_rate_key("refund_order", "payment_group") else {}
+
+
+class TestStreamMonitor(unittest.IsolatedAsyncioTestCase):
+    async def test_group_backlog_and_rates(self) -> None:
+        """
+        Test that lag, pending and rates are reported per group and per consumer, ignoring stale rate reports.
+        """
+        redis = FakeStreams()
+        monitor = StreamMonitor(["refund_order"], redis, ttl=60)  # type: ignore[arg-type]
+
+        group = (await monitor.stats())["refund_order"]["groups"]["payment_group"]
+
+        self.assertEqual((group["lag"], group["pending"]), (7, 3))
+        self.assertGreater(group["oldest_pending_age_ms"], 0)
+        self.assertEqual(group["consumers"]["w1"], {"pending": 3, "idle_ms": 15, "rate": 12.5})
+        self.assertIsNone(group["consumers"]["w2"]["rate"])
+        self.assertEqual(group["rate"], 12.5)
+
+        await monitor.stats()
+        self.assertEqual(redis.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+
+from inventory.app.db.stream_producer import StreamProducer
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis") -> None:
+        self.redis = redis
+        self.queued: list[tuple[str, dict]] = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    def xadd(self, name: str, fields: dict, id: str = "*") -> None:
+        self.queued.append((name, fields))
+
+    async def execute(self, raise_on_error: bool = True) -> list:
+        await asyncio.sleep(self.redis.latency_s)
+        self.redis.batches.append(len(self.queued))
+        return [ValueError("bad entry") if fields.get("bad") else f"{i}-0" for i, (_, fields) in enumerate(self.queued)]
+
+
+class FakeRedis:
+    """
+    Fake redis.asyncio client recording the size of every pipelined flush.
+    """
+
+    def __init__(self, latency_s: float = 0.0) -> None:
+        self.latency_s = latency_s
+        self.batches: list[int] = []
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+
+class TestStreamProducer(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_publishes_share_flushes(self) -> None:
+        """
+        Test that concurrent publishes are written in pipelined batches capped at the batch size.
+        """
+        redis = FakeRedis()
+        producer = StreamProducer(redis, batch_size=10, linger_ms=20)  # type: ignore[arg-type]
+        self.addAsyncCleanup(producer.stop)
+
+        ids = await asyncio.gather(*(producer.publish("refund_order", {"order_id": i}) for i in range(25)))
+
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(sum(redis.batches), 25)
+        self.assertEqual(max(redis.batches), 10)
+        self.assertLessEqual(len(redis.batches), 4)
+        self.assertEqual(producer.stats()["entries"], 25)
+
+    async def test_failed_entry_fails_only_its_publisher(self) -> None:
+        """
+        Test that an XADD error is raised to the publisher of that entry alone.
+        """
+        producer = StreamProducer(FakeRedis(), linger_ms=5)  # type: ignore[arg-type]
+        self.addAsyncCleanup(producer.stop)
+
+        results = await asyncio.gather(
+            producer.publish("refund_order", {"order_id": 1}),
+            producer.publish("refund_order", {"bad": 1}),
+            return_exceptions=True,
+        )
+
+        self.assertIsInstance(results[0], str)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(producer.stats()["failed"], 1)
+
+    async def test_full_buffer_applies_backpressure(self) -> None:
+        """
+        Test that publishers wait for room once the buffer is full.
+        """
+        producer = StreamProducer(FakeRedis(latency_s=0.01), max_buffer=2, batch_size=1)  # type: ignore[arg-type]
+        self.addAsyncCleanup(producer.stop)
+
+        await asyncio.gather(*(producer.publish("refund_order", {"order_id": i}) for i in range(6)))
+
+        self.assertGreater(producer.stats()["backpressure_waits"], 0)
+        self.assertEqual(producer.stats()["buffered"], 0)
+
+    async def test_stop_flushes_the_batch_being_lingered(self) -> None:
+        """
+        Test that stopping while the flush loop holds a batch writes it and resolves every future.
+        """
+        redis = FakeRedis()
+        producer = StreamProducer(redis, batch_size=10, linger_ms=60_000)  # type: ignore[arg-type]
+        futures = [await producer.send("refund_order", {"order_id": i}) for i in range(3)]
+        # * let the flush loop take the entries and wait for the batch to fill up
+        await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(producer.stop(), 1)
+
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual([future.result() for future in futures], ["0-0", "1-0", "2-0"])
+        self.assertEqual(redis.batches, [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+
+from inventory.app.db.stream_retention import StreamArchive, StreamRetention
+
+
+class FakeGroups:
+    """
+    Fake Redis answering XINFO GROUPS / XPENDING for one stream.
+    """
+
+    def __init__(self, groups: list[dict], oldest_pending: dict[str, str]) -> None:
+        self.groups = groups
+        self.oldest_pending = oldest_pending
+
+    async def xinfo_groups(self, stream: str) -> list[dict]:
+        return self.groups
+
+    async def xpending(self, stream: str, group: str) -> dict:
+        return {"pending": 1, "min": self.oldest_pending[group]}
+
+
+class TestStreamArchive(unittest.TestCase):
+    def test_replay_reads_archived_ranges(self) -> None:
+        """
+        Test that archived entries are replayed in order and filtered by id range, across segments.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            archive = StreamArchive(root, segment_bytes=1)
+            archive.append("order_completed:0", [("1-0", {"order_id": "1"}), ("2-0", {"order_id": "2"})])
+            archive.append("order_completed:0", [("3-0", {"order_id": "3"})])
+
+            self.assertEqual(len({record["segment"] for record in archive.index("order_completed:0")}), 2)
+            self.assertEqual(archive.last_archived_id("order_completed:0"), "3-0")
+            self.assertEqual([entry_id for entry_id, _ in archive.replay("order_completed:0")], ["1-0", "2-0", "3-0"])
+            self.assertEqual(list(archive.replay("order_completed:0", "2-0", "2-0")), [("2-0", {"order_id": "2"})])
+
+
+class TestStreamRetention(unittest.IsolatedAsyncioTestCase):
+    async def test_trim_point_keeps_what_any_group_needs(self) -> None:
+        """
+        Test that the trim point is the oldest pending or undelivered entry over every group.
+        """
+        redis = FakeGroups(
+            [
+                {"name": "inventory_group", "pending": 2, "last-delivered-id": "9-0"},
+                {"name": "audit", "pending": 0, "last-delivered-id": "7-0"},
+            ],
+            {"inventory_group": "5-0"},
+        )
+        retention = StreamRetention(redis, ["order_completed"])  # type: ignore[arg-type]
+        self.assertEqual(await retention.trim_point("order_completed"), "5-0")
+
+        redis.groups[0]["pending"] = 0
+        self.assertEqual(await retention.trim_point("order_completed"), "7-0")
+
+        redis.groups = []
+        self.assertIsNone(await retention.trim_point("order_completed"))
+
+
+if __name__ == "__main__":
+    unittest.main()
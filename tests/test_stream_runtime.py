@@ -0,0 +1,133 @@
+import unittest
+from unittest import mock
+
+from fakeredis import FakeAsyncRedis
+
+from inventory.app.db import stream_runtime
+from inventory.app.db.stream_runtime import (
+    StreamConsumer,
+    StreamEntry,
+    assign_streams,
+    shard_for_key,
+    shard_stream,
+    shard_streams,
+)
+
+
+class TestStreamSharding(unittest.TestCase):
+    def test_single_shard_keeps_stream_name(self) -> None:
+        """
+        Test that an unsharded stream keeps its original key.
+        """
+        self.assertEqual(shard_streams("order_completed", 1), ["order_completed"])
+        self.assertEqual(shard_stream("order_completed", 3, 4), "order_completed:3")
+
+    def test_shard_for_key_is_stable(self) -> None:
+        """
+        Test that a partition key always maps to the same shard.
+        """
+        shard = shard_for_key("01JQM7NFFE8CZ1H0HS7T8R3YW0", 8)
+        self.assertEqual(shard, shard_for_key("01JQM7NFFE8CZ1H0HS7T8R3YW0", 8))
+        self.assertTrue(0 <= shard < 8)
+
+    def test_ordered_assignment_gives_each_shard_one_worker(self) -> None:
+        """
+        Test that ordered workers split the shards without overlap.
+        """
+        streams = shard_streams("order_completed", 8)
+        assigned = [assign_streams(streams, worker, 3, ordered=True) for worker in range(3)]
+
+        self.assertEqual(sorted(stream for owned in assigned for stream in owned), sorted(streams))
+        self.assertEqual(assign_streams(streams, 1, 3, ordered=False), streams)
+
+
+class RecordingHandler:
+    """
+    Batch handler recording the entries it gets, failing the entries listed in `failures` once each.
+    """
+
+    def __init__(self, *failures: str) -> None:
+        self.failures = set(failures)
+        self.handled: list[str] = []
+
+    async def __call__(self, entries: list[StreamEntry]) -> list[str]:
+        ack_ids = []
+        for entry_id, fields in entries:
+            self.handled.append(fields["n"])
+            if fields["n"] in self.failures:
+                self.failures.discard(fields["n"])
+            else:
+                ack_ids.append(entry_id)
+        return ack_ids
+
+
+class TestStreamConsumer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.redis = FakeAsyncRedis(decode_responses=True)
+        patch = mock.patch.object(stream_runtime, "STREAM_ERROR_BACKOFF_S", 0)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def consumer(self, handler: RecordingHandler, name: str, **kwargs) -> StreamConsumer:
+        return StreamConsumer(self.redis, "events", "group", handler, consumer=name, block_ms=1, **kwargs)
+
+    async def add(self, *numbers: str) -> None:
+        for n in numbers:
+            await self.redis.xadd("events", {"n": n})
+
+    async def test_failed_entries_stay_pending_and_are_reclaimed(self) -> None:
+        """
+        Test that only the ids returned by the handler are acknowledged and that another
+        consumer reclaims the rest once idle.
+        """
+        first = self.consumer(RecordingHandler("2"), "c1")
+        await first.ensure_group()
+        await self.add("1", "2", "3")
+
+        self.assertEqual(await first.run_once(), 3)
+        self.assertEqual((await self.redis.xpending("events", "group"))["pending"], 1)
+
+        handler = RecordingHandler()
+        second = self.consumer(handler, "c2", reclaim_idle_ms=0)
+        await second.run_once()
+
+        self.assertEqual(handler.handled, ["2"])
+        self.assertEqual((await self.redis.xpending("events", "group"))["pending"], 0)
+        self.assertEqual(first.processed + second.processed, 3)
+
+    async def test_ordered_consumer_retries_before_reading_further(self) -> None:
+        """
+        Test that an ordered consumer retries a failed entry before any later entry of the stream.
+        """
+        handler = RecordingHandler("1")
+        consumer = self.consumer(handler, "c1", batch_size=1, ordered=True)
+        await consumer.ensure_group()
+        await self.add("1", "2")
+
+        for _ in range(3):
+            await consumer.run_once()
+
+        self.assertEqual(handler.handled, ["1", "1", "2"])
+        self.assertEqual((await self.redis.xpending("events", "group"))["pending"], 0)
+
+    async def test_ordered_consumer_takes_over_previous_owner(self) -> None:
+        """
+        Test that a new owner of a stream applies the entries its predecessor left pending first.
+        """
+        previous = self.consumer(RecordingHandler("1", "2"), "old", ordered=True)
+        await previous.ensure_group()
+        await self.add("1", "2")
+        await previous.run_once()
+        await self.add("3")
+
+        handler = RecordingHandler()
+        owner = self.consumer(handler, "new", ordered=True)
+        self.assertEqual(await owner.take_over(), 2)
+        await owner.run_once()
+        await owner.run_once()
+
+        self.assertEqual(handler.handled, ["1", "2", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from fakeredis import FakeAsyncRedis
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+
+from inventory.app.db.redis import CustomJsonCoder
+from inventory.app.db.repository import ProductRepository
+from inventory.app.models.models import Product
+from inventory.app.services.utils import (
+    WRITE_THROUGH_PRODUCT_SCRIPT,
+    cache_script,
+    format_product,
+    index_catalog_page,
+    product_cache_key,
+    store_product_entries,
+    write_through_products,
+)
+
+PAGE_KEY = "test:inventory.products:v0:page"
+
+
+class TestWriteThrough(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.redis = FakeAsyncRedis(decode_responses=True)
+        # init is a no-op once initialized, e.g. by importing the inventory consumer
+        FastAPICache.reset()
+        FastAPICache.init(RedisBackend(self.redis), prefix="test", coder=CustomJsonCoder)
+        self.addCleanup(FastAPICache.reset)
+        self.products = [Product(pk=pk, name=pk, price=2, quantity=5) for pk in ("p1", "p2")]
+        for product in self.products:
+            await self.redis.hset(ProductRepository.key(product.pk), mapping=ProductRepository.to_document(product))
+
+    async def cache_page(self) -> None:
+        page = {"products": [format_product(product) for product in self.products], "next_cursor": 0}
+        await self.redis.set(PAGE_KEY, CustomJsonCoder.encode(page), ex=600)
+        await index_catalog_page(PAGE_KEY, page, 600)
+
+    async def test_entry_is_deleted_when_product_changed_again(self) -> None:
+        """
+        Test that an entry is only written if the product hash still holds the written values.
+        """
+        await self.redis.hset(ProductRepository.key("p2"), "quantity", 4)
+
+        entries = await store_product_entries(self.products, version=0)
+
+        self.assertIsNotNone(entries[product_cache_key("p1", 0)])
+        self.assertIsNone(entries[product_cache_key("p2", 0)])
+        self.assertIsNotNone(await self.redis.get(product_cache_key("p1", 0)))
+        self.assertIsNone(await self.redis.get(product_cache_key("p2", 0)))
+
+    async def test_catalog_pages_are_patched_in_place(self) -> None:
+        """
+        Test that a written product replaces its copy in the cached catalog page, keeping the namespace version.
+        """
+        await self.cache_page()
+        self.products[0].quantity = 3
+        await self.redis.hset(ProductRepository.key("p1"), "quantity", 3)
+
+        await write_through_products([self.products[0]])
+
+        page = CustomJsonCoder.decode(await self.redis.get(PAGE_KEY))
+        self.assertEqual([product["quantity"] for product in page["products"]], [3, 5])
+        self.assertIsNone(await self.redis.get("test:inventory.products:version"))
+
+    async def test_catalog_is_invalidated_when_product_changed_again(self) -> None:
+        """
+        Test that outdated values are never patched in: the catalog namespace is invalidated instead.
+        """
+        await self.cache_page()
+        await self.redis.hset(ProductRepository.key("p1"), "quantity", 1)
+        self.products[0].quantity = 3
+
+        await write_through_products([self.products[0]])
+
+        self.assertEqual(await self.redis.get("test:inventory.products:version"), "1")
+
+    async def test_scripts_are_registered_once(self) -> None:
+        """
+        Test that a cache script is registered once per cache client.
+        """
+        self.assertIs(cache_script(WRITE_THROUGH_PRODUCT_SCRIPT), cache_script(WRITE_THROUGH_PRODUCT_SCRIPT))
+
+
+if __name__ == "__main__":
+    unittest.main()